@@ -1,38 +1,60 @@
 import tkinter as tk
-import random
 import json
+import itertools
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from snake_engine import SnakeEngine, INITIAL_MAP_SIZE_N, MIN_MAP_SIZE_N, MAX_MAP_SIZE_N, MAX_HUGE_MAP_SIZE_N, DEATH_SELF, DIRECTION_CODES, NO_CELL
+from snake_replay import ReplayRecorder
+from snake_timing import TickClock, MOVE_SPEEDS
+from snake_profiler import TickProfiler, profiled_engine
+from snake_autopilot import Autopilot
+from snake_input import InputQueue
+from snake_storage import BackgroundWriter, Leaderboard, LEADERBOARD_FILE, NO_LEVEL, atomic_write
+from snake_style import SEGMENT_SIZE, BACKGROUND_COLOR, SEGMENT_BORDER_COLOR, WALL_COLOR, SNAKE_COLOR_PALETTES, grid_color_hex
+from snake_level import LevelCache, LevelError, LEVELS_DIR, LEVEL_EXTENSION, list_levels
 
 # Game Constants
 # WIDTH = 500  # Removed
 # HEIGHT = 500 # Removed
-INITIAL_MAP_SIZE_N = 25 # Default number of segments for width and height
-SEGMENT_SIZE = 20  # Size of each snake segment and food
-GAME_SPEED = 150   # Milliseconds between game updates (lower is faster)
+# With early_tick_enabled (settings.json), a turn pressed at least this long before the
+# next tick is due runs that tick at once; mostly helps at the Slow speed
+EARLY_TICK_MIN_MS = 40
+# With smooth movement on, the head and tail slide between cells at about this frame interval
+# (~60 fps), independent of the logic tick; see render_frame
+RENDER_FRAME_MS = 16
+
+# Boards bigger than this many cells per side are shown through a scrolling viewport
+# that follows the head, with a minimap of the whole board in the corner
+VIEWPORT_SIZE_N = MAX_MAP_SIZE_N
+VIEWPORT_MARGIN_N = VIEWPORT_SIZE_N // 4 # Recenter when the head gets this close to the viewport edge
+MINIMAP_MAX_PX = 120
+MINIMAP_BORDER_COLOR = "white"
 
 # Colors
-BACKGROUND_COLOR = "black"
 # SNAKE_COLOR = "green" # Obsolete, defined in palettes
 # FOOD_COLOR = "red" # Obsolete, defined in palettes
 GAME_OVER_TEXT_COLOR = "white"
-HIGH_SCORE_FILE = "highscore.txt"
+HIGH_SCORE_FILE = "highscore.txt" # Old single high score, imported into the leaderboard once
 SETTINGS_FILE = "settings.json"
+REPLAY_FILE = "last_replay.snkr" # Replay of the most recent game
+NO_LEVEL_LABEL = "None" # Menu entry for the empty board
+TK_CALLS_POLL_MS = 20 # How often the Tk thread collects results from the writer and level index threads
 
-SNAKE_COLOR_PALETTES = {
-    "Green": {"body": "#00FF00", "head": "#00AA00", "food": "#FF0000"},
-    "Blue": {"body": "#0000FF", "head": "#0000AA", "food": "#FF0000"},
-    "Purple": {"body": "#800080", "head": "#500050", "food": "#FF0000"},
-    "Pink": {"body": "#FFC0CB", "head": "#FF80A0", "food": "#FF0000"},
-    "Red": {"body": "#FF0000", "head": "#AA0000", "food": "#00FF00"},
-}
-
-MOVE_SPEEDS = {
-    "Slow": 250,
-    "Normal": GAME_SPEED, # Use the existing constant
-    "Fast": 75,
-}
+# Profiling (opt-in: set SNAKE_PROFILE=1 or press F3 in game to show the overlay)
+PROFILE_ENV_VAR = "SNAKE_PROFILE"
+PROFILE_JSON_FILE = "profile.json"
+PROFILE_CSV_FILE = "profile.csv"
+PROFILE_OVERLAY_REFRESH_TICKS = 10
 
 class SnakeGame:
     def __init__(self, master, map_size_n=INITIAL_MAP_SIZE_N): # map_size_n will be set by menu
+        init_start = time.perf_counter()
         self.master = master
         
         # Initialize default settings values FIRST
@@ -40,7 +62,11 @@ class SnakeGame:
         self.current_snake_color_name = "Green"
         self.current_speed_name = "Normal"
         self.screen_wrapping_enabled = True
+        self.autopilot_enabled = False
+        self.early_tick_enabled = False
+        self.smooth_movement_enabled = False
         self.grid_brightness = 0
+        self.level_name = NO_LEVEL # File name (without extension) of the level in LEVELS_DIR
 
         # Load settings from file, potentially overwriting defaults
         self.load_settings()
@@ -62,55 +88,94 @@ class SnakeGame:
 
         self.canvas = None # Will be created by show_menu / start_game_from_menu
         
-        # Game state variables (not part of saved settings)
-        self.snake_segments = []
-        self.food_coords = (0, 0)
-        self.direction = "Right"
-        self.new_direction = "Right"
-        self.score = 0
+        # Game state lives in the engine (created per game in start_game)
+        self.engine = None
+        self.replay_recorder = None
+        self.autopilot = None # Autopilot steering the running game, when enabled in the menu
+        self.level = None # Level of the running game, None for the empty board
+        self.level_cache = LevelCache() # Keeps recently played levels open, so switching between them is instant
+        self.level_waiters = {} # Level being indexed on a worker thread -> callbacks to run once it is ready
+        self.input_queue = InputQueue() # Turns pressed but not yet applied, one per tick
+        self.game_loop_after_id = None # Pending game_loop callback, cancelled by early ticks
+        self.tick_clock = None # Schedules game_loop on absolute deadlines (see snake_timing)
+        self.profiling_enabled = bool(os.environ.get(PROFILE_ENV_VAR))
+        self.profiler = None # TickProfiler for the running game when profiling is enabled
+        self.profile_overlay_visible = False
+        self.profile_overlay_item = None
         self.game_over_flag = False
+
+        # Persistent canvas items for the running game, updated incrementally by draw_game
+        self.segment_items = None # deque of (border_id, fill_id), tail first; None forces a full redraw
+        self.food_item = None
+        self.drawn_moves = 0 # engine.moves at the last draw
+        self.drawn_food_coords = None
+
+        # Smooth movement: between ticks render_frame slides the head out of the previous
+        # head cell and a spare "tail" segment out of the freed tail cell (boards that fit the window only)
+        self.smooth_movement = False # Enabled for the running game
+        self.render_after_id = None # Pending render_frame callback
+        self.tail_items = None # (border_id, fill_id) of the sliding tail
+        self.rendered_fraction = None # Tick fraction the moving items were last placed at
+
+        # Scrolling viewport for boards larger than VIEWPORT_SIZE_N (see draw_viewport)
+        self.scrolling_viewport = False
+        self.viewport_n = INITIAL_MAP_SIZE_N # Cells visible per side
+        self.camera_x = self.camera_y = 0 # Board cell shown at the viewport's top-left corner
+        self.visible_items = None # Cell -> (border_id, fill_id) for snake cells inside the viewport
+        self.drawn_head_cell = None
+        self.viewport_changes = [] # (new_head, freed_tail) per move since the last draw
+        self.minimap_image = None
+        self.minimap_item = None
+        self.minimap_frame_item = None
+        self.minimap_block = 1 # Board cells per minimap pixel, per side
+        self.minimap_counts = None # Snake segments per minimap pixel
+        self.minimap_food_pixel = None
+
+        # Cached grid layer: the lines survive canvas clears and are only rebuilt
+        # when the board size changes (brightness changes just recolor them)
+        self.grid_size = None # (width, height) the current grid_line items were built for
+        self.grid_color_hex = None
         
         # Tkinter variables for menu - initialized AFTER settings are loaded/defaulted
         self.selected_color_var = tk.StringVar(master)
         self.selected_speed_var = tk.StringVar(master)
         self.wrapping_var = tk.BooleanVar(master)
+        self.autopilot_var = tk.BooleanVar(master)
+        self.smooth_movement_var = tk.BooleanVar(master)
+        self.early_tick_var = tk.BooleanVar(master)
         self.grid_brightness_scale_var = tk.IntVar(master)
+        self.selected_level_var = tk.StringVar(master)
 
         # These .set() calls for Tkinter variables will be done in show_menu()
         # using the now-finalized instance variables.
         
         self.menu_active = True
-        self.high_score = self.load_high_score()
-        
-        # Menu widgets (references initialized to None)
+        # Saves run on a background thread, so the menu and game loop never wait for the disk
+        self.writer = BackgroundWriter()
+        # The leaderboard is opened and queried on the writer thread only (see open_leaderboard)
+        self.leaderboard = None
+        self.leaderboard_opened = False
+        self.job_keys = itertools.count() # Writer keys for jobs that post_to_tk, which are never coalesced
+        # Results of background work, as (func, args) to run on the Tk thread (see post_to_tk)
+        self.tk_calls = queue.Queue()
+        self.tk_calls_expected = 0 # Posts not yet run; poll_tk_calls is scheduled while there are any
+        self.tk_calls_after_id = None
+        self.high_score = None
+
+        # Menu widgets, built once by build_menu() and shown / hidden as a frame over the canvas
+        self.menu_frame = None
+        self.highscore_label = None
         self.map_size_entry = None
-        self.color_label = None # For "Snake Color:"
-        self.color_option_menu = None # For color selection
-        self.speed_label = None # For "Game Speed:"
-        self.speed_option_menu = None # For speed selection
-        self.wrapping_checkbutton = None # For Screen Wrapping
-        self.grid_brightness_label = None # For "Grid Brightness:"
-        self.grid_brightness_slider = None # For grid brightness Scale
-        self.start_button = None
-        self.exit_button = None
-        self.map_label = None
-        self.title_text_id = None
-        self.highscore_text_id = None
-        self.map_label_window_id = None
-        self.map_entry_window_id = None
-        self.color_label_window_id = None # Canvas ID for color label
-        self.color_option_menu_window_id = None # Canvas ID for color option menu
-        self.speed_label_window_id = None # Canvas ID for speed label
-        self.speed_option_menu_window_id = None # Canvas ID for speed option menu
-        self.wrapping_checkbutton_window_id = None # Canvas ID for wrapping Checkbutton
-        self.grid_brightness_label_window_id = None # Canvas ID for grid label
-        self.grid_brightness_slider_window_id = None # Canvas ID for grid slider
-        self.start_button_window_id = None
-        self.exit_button_window_id = None
+        self.level_option_menu = None
+        self.level_names = None # Level names offered by level_option_menu
+        self.window_size = None # (width, height) the window was last centered for
 
         # Key bindings are context-dependent (menu vs game)
         # Initial call to show menu
         self.show_menu() # __init__ ends by showing the menu
+        self.menu_ready_ms = (time.perf_counter() - init_start) * 1000 # Cold start to interactive menu
+        if self.profiling_enabled:
+            print(f"Info: Menu ready {self.menu_ready_ms:.1f} ms after SnakeGame() was created")
 
     def load_settings(self):
         try:
@@ -120,7 +185,7 @@ class SnakeGame:
             # Validate and apply settings, falling back to defaults if necessary
             # Map Size
             map_size = settings.get("map_size_n", self.map_size_n)
-            if isinstance(map_size, int) and 10 <= map_size <= 50:
+            if isinstance(map_size, int) and MIN_MAP_SIZE_N <= map_size <= MAX_HUGE_MAP_SIZE_N:
                 self.map_size_n = map_size
             else:
                 print(f"Warning: Invalid map_size_n '{map_size}' in settings. Using default {self.map_size_n}.")
@@ -154,6 +219,30 @@ class SnakeGame:
                 print(f"Warning: Invalid screen_wrapping_enabled '{wrapping_enabled}' in settings. Using default {self.screen_wrapping_enabled}.")
                 self.screen_wrapping_enabled = True # Default
 
+            # Autopilot
+            autopilot_enabled = settings.get("autopilot_enabled", self.autopilot_enabled)
+            if isinstance(autopilot_enabled, bool):
+                self.autopilot_enabled = autopilot_enabled
+            else:
+                print(f"Warning: Invalid autopilot_enabled '{autopilot_enabled}' in settings. Using default {self.autopilot_enabled}.")
+                self.autopilot_enabled = False # Default
+
+            # Early ticks on key presses
+            early_tick_enabled = settings.get("early_tick_enabled", self.early_tick_enabled)
+            if isinstance(early_tick_enabled, bool):
+                self.early_tick_enabled = early_tick_enabled
+            else:
+                print(f"Warning: Invalid early_tick_enabled '{early_tick_enabled}' in settings. Using default {self.early_tick_enabled}.")
+                self.early_tick_enabled = False # Default
+
+            # Smooth movement between ticks
+            smooth_movement_enabled = settings.get("smooth_movement_enabled", self.smooth_movement_enabled)
+            if isinstance(smooth_movement_enabled, bool):
+                self.smooth_movement_enabled = smooth_movement_enabled
+            else:
+                print(f"Warning: Invalid smooth_movement_enabled '{smooth_movement_enabled}' in settings. Using default {self.smooth_movement_enabled}.")
+                self.smooth_movement_enabled = False # Default
+
             # Grid Brightness
             grid_brightness = settings.get("grid_brightness", self.grid_brightness)
             if isinstance(grid_brightness, int) and 0 <= grid_brightness <= 100:
@@ -162,6 +251,14 @@ class SnakeGame:
                 print(f"Warning: Invalid grid_brightness '{grid_brightness}' in settings. Using default {self.grid_brightness}.")
                 self.grid_brightness = 0 # Default
 
+            # Level
+            level_name = settings.get("level_name", self.level_name)
+            if isinstance(level_name, str):
+                self.level_name = level_name
+            else:
+                print(f"Warning: Invalid level_name '{level_name}' in settings. Using no level.")
+                self.level_name = NO_LEVEL # Default
+
 
         except (FileNotFoundError, json.JSONDecodeError, IOError) as e:
             print(f"Info: Settings file '{SETTINGS_FILE}' not found or invalid. Using default settings. ({e})")
@@ -181,36 +278,101 @@ class SnakeGame:
             "snake_color_name": self.current_snake_color_name,
             "speed_name": self.current_speed_name,
             "screen_wrapping_enabled": self.screen_wrapping_enabled,
+            "autopilot_enabled": self.autopilot_enabled,
+            "early_tick_enabled": self.early_tick_enabled,
+            "smooth_movement_enabled": self.smooth_movement_enabled,
             "grid_brightness": self.grid_brightness,
+            "level_name": self.level_name,
         }
-        try:
-            with open(SETTINGS_FILE, "w") as f:
-                json.dump(settings_to_save, f, indent=4)
-        except IOError:
-            print(f"Warning: Could not save settings to {SETTINGS_FILE}")
+        data = json.dumps(settings_to_save, indent=4)
+        # Keyed by file, so saves queued in quick succession only write the latest settings
+        self.writer.submit(SETTINGS_FILE, lambda: atomic_write(SETTINGS_FILE, data), f"settings to {SETTINGS_FILE}")
 
 
+    def open_leaderboard(self):
+        """Opens the leaderboard (and imports the old high score) on first use. Writer thread only."""
+        if not self.leaderboard_opened:
+            self.leaderboard_opened = True
+            try:
+                # No writer: this already runs on it, so runs are inserted right away rather than queued again
+                self.leaderboard = Leaderboard(LEADERBOARD_FILE, legacy_high_score_file=HIGH_SCORE_FILE)
+            except sqlite3.Error as e:
+                print(f"Warning: Could not open leaderboard {LEADERBOARD_FILE}, scores won't be kept ({e})")
+        return self.leaderboard
+
+    def expect_tk_call(self):
+        """Tk thread, before starting background work that will post_to_tk once: polls until the result is in."""
+        self.tk_calls_expected += 1
+        if self.tk_calls_after_id is None:
+            self.tk_calls_after_id = self.master.after(TK_CALLS_POLL_MS, self.poll_tk_calls)
+
+    def post_to_tk(self, func, *args):
+        """Has the Tk thread run func(*args). Called from the writer and level index threads, which must not touch Tk."""
+        self.tk_calls.put((func, args))
+
+    def poll_tk_calls(self):
+        self.tk_calls_after_id = None
+        while True:
+            try:
+                func, args = self.tk_calls.get_nowait()
+            except queue.Empty:
+                break
+            self.tk_calls_expected -= 1
+            func(*args)
+        if self.tk_calls_expected > 0 and self.tk_calls_after_id is None:
+            self.tk_calls_after_id = self.master.after(TK_CALLS_POLL_MS, self.poll_tk_calls)
+
     def load_high_score(self):
-        try:
-            with open(HIGH_SCORE_FILE, "r") as f:
-                score = int(f.read())
-                return score
-        except (FileNotFoundError, ValueError):
-            return 0
-            
+        """Queries the best score over every recorded run on the writer thread; show_high_score displays it."""
+        def query():
+            best = 0
+            try:
+                leaderboard = self.open_leaderboard()
+                if leaderboard is not None:
+                    best = leaderboard.best_score()
+            finally:
+                self.post_to_tk(self.show_high_score, best)
+        self.expect_tk_call()
+        self.writer.submit(("high score", next(self.job_keys)), query, f"high score query on {LEADERBOARD_FILE}")
+
+    def show_high_score(self, best):
+        self.high_score = max(best, self.high_score or 0)
+        if self.menu_active and self.highscore_label is not None:
+            self.highscore_label.config(text=f"High Score: {self.high_score}")
+
     def save_high_score(self):
-        if self.score > self.high_score:
-            self.high_score = self.score
+        """Records the finished run on the writer thread, then shows the best scores on the game over screen."""
+        score = self.engine.score
+        setting = (self.map_size_n, self.current_speed_name, self.screen_wrapping_enabled,
+                   self.level.name if self.level is not None else NO_LEVEL)
+        ticks, seed = self.engine.ticks, self.engine.seed
+
+        def record():
+            best = board_best = score
             try:
-                with open(HIGH_SCORE_FILE, "w") as f:
-                    f.write(str(self.high_score))
-            except IOError:
-                # Silently ignore if saving fails, or log to console
-                print(f"Warning: Could not save high score to {HIGH_SCORE_FILE}")
+                leaderboard = self.open_leaderboard()
+                if leaderboard is not None:
+                    # Queried before the run is written, hence the max()
+                    best = max(score, leaderboard.best_score())
+                    board_best = max(score, leaderboard.best_score(*setting))
+                    map_size_n, speed_name, wrapping, level_name = setting
+                    leaderboard.record_run(map_size_n, speed_name, wrapping, score, ticks, seed, level_name)
+            finally:
+                self.post_to_tk(self.show_game_over_high_score, best, board_best)
+        self.expect_tk_call()
+        self.writer.submit(("finished run", next(self.job_keys)), record, f"run to {LEADERBOARD_FILE}")
+
+    def show_game_over_high_score(self, best, board_best):
+        self.show_high_score(best)
+        if self.game_over_flag and not self.menu_active:
+            self.canvas.itemconfig("game_over_high_score", text=f"High Score: {self.high_score} (this board: {board_best})")
 
     def center_window(self):
-        """Centers the game window on the screen."""
-        self.master.update_idletasks() # Ensure dimensions are calculated
+        """Centers the game window on the screen, unless it is already centered at this size."""
+        if self.window_size == (self.width, self.height):
+            return
+        self.window_size = (self.width, self.height)
+        # The size comes from self.width/height, so there's no need to wait for Tk's layout (update_idletasks)
         screen_width = self.master.winfo_screenwidth()
         screen_height = self.master.winfo_screenheight()
         x_coordinate = int((screen_width / 2) - (self.width / 2))
@@ -233,7 +395,8 @@ class SnakeGame:
             self.canvas.config(width=self.width, height=self.height, bg=BACKGROUND_COLOR)
         
         self.center_window() # Center based on menu dimensions
-        self.canvas.delete(tk.ALL) # Clear previous drawings (game or menu)
+        self.canvas.delete("!grid_line") # Clear previous drawings (game or menu), keep the cached grid
+        self.canvas.itemconfig("grid_line", state="hidden")
         self.master.title("Snake Game - Menu")
 
         # Unbind any game-specific keys, or keys from game over screen
@@ -241,106 +404,160 @@ class SnakeGame:
         self.master.unbind("<KeyPress-r>") 
         self.master.unbind("<KeyPress-R>")
 
-        # Menu Title
-        self.title_text_id = self.canvas.create_text(
-            self.width / 2, self.height / 2 - 150, # Adjusted Y
-            text="Snake Game",
-            fill=GAME_OVER_TEXT_COLOR, font=("Arial", 30, "bold"), anchor="center"
-        )
-        # High Score
-        self.highscore_text_id = self.canvas.create_text(
-            self.width / 2, self.height / 2 - 100, # Adjusted Y
-            text=f"High Score: {self.high_score}",
-            fill=GAME_OVER_TEXT_COLOR, font=("Arial", 16), anchor="center"
-        )
+        if self.menu_frame is None:
+            self.build_menu()
+
+        # Refresh the persistent widgets from the current settings
+        self.map_size_entry.delete(0, tk.END)
+        self.map_size_entry.insert(0, str(self.map_size_n))
+        self.selected_color_var.set(self.current_snake_color_name)
+        self.selected_speed_var.set(self.current_speed_name)
+        self.wrapping_var.set(self.screen_wrapping_enabled)
+        self.autopilot_var.set(self.autopilot_enabled)
+        self.smooth_movement_var.set(self.smooth_movement_enabled)
+        self.early_tick_var.set(self.early_tick_enabled)
+        self.grid_brightness_scale_var.set(self.grid_brightness)
+        self.refresh_level_menu()
+        self.selected_level_var.set(self.level_name if self.level_name in self.level_names else NO_LEVEL_LABEL)
+        if self.high_score is None:
+            self.highscore_label.config(text="High Score: ...")
+            self.load_high_score() # Shown when the writer thread has it
+        else:
+            self.highscore_label.config(text=f"High Score: {self.high_score}")
+
+        self.menu_frame.place(relx=0.5, rely=0.5, anchor="center")
+        self.canvas.focus_set() # For any potential menu key bindings, though not used yet
+
+    def build_menu(self):
+        """Creates the menu widgets once, in a frame that show_menu places over the canvas."""
+        label_options = {"bg": BACKGROUND_COLOR, "fg": "white", "font": ("Arial", 10)}
+        checkbutton_options = {"bg": BACKGROUND_COLOR, "fg": "white", "font": ("Arial", 10),
+                               "selectcolor": BACKGROUND_COLOR, "activebackground": BACKGROUND_COLOR,
+                               "activeforeground": "white", "highlightthickness": 0, "borderwidth": 0}
+        frame = self.menu_frame = tk.Frame(self.master, bg=BACKGROUND_COLOR)
+
+        # Menu Title and High Score
+        tk.Label(frame, text="Snake Game", bg=BACKGROUND_COLOR, fg=GAME_OVER_TEXT_COLOR,
+                 font=("Arial", 30, "bold")).grid(row=0, column=0, columnspan=2, pady=(0, 10))
+        self.highscore_label = tk.Label(frame, bg=BACKGROUND_COLOR, fg=GAME_OVER_TEXT_COLOR, font=("Arial", 16))
+        self.highscore_label.grid(row=1, column=0, columnspan=2, pady=(0, 20))
 
         # Map Size Entry
-        self.map_label = tk.Label(self.master, text="Map Size (10-50):", bg=BACKGROUND_COLOR, fg="white", font=("Arial", 10))
-        self.map_size_entry = tk.Entry(self.master, font=("Arial", 10), width=5)
-        self.map_size_entry.insert(0, str(self.map_size_n)) # Use current map_size_n
-        
-        self.map_label_window_id = self.canvas.create_window(self.width / 2 - 70, self.height / 2 - 50, anchor="e", window=self.map_label) # Adjusted Y and X
-        self.map_entry_window_id = self.canvas.create_window(self.width / 2 - 60, self.height / 2 - 50, anchor="w", window=self.map_size_entry) # Adjusted Y and X
+        tk.Label(frame, text=f"Map Size ({MIN_MAP_SIZE_N}-{MAX_HUGE_MAP_SIZE_N}):", **label_options).grid(row=2, column=0, sticky="e", pady=8)
+        self.map_size_entry = tk.Entry(frame, font=("Arial", 10), width=5)
+        self.map_size_entry.grid(row=2, column=1, sticky="w", padx=10)
 
-        # Snake Color Selection
-        self.color_label = tk.Label(self.master, text="Snake Color:", bg=BACKGROUND_COLOR, fg="white", font=("Arial", 10))
-        self.selected_color_var.set(self.current_snake_color_name) # Initialize OptionMenu with current color
-        color_options = list(SNAKE_COLOR_PALETTES.keys())
-        self.color_option_menu = tk.OptionMenu(self.master, self.selected_color_var, *color_options)
-        self.color_option_menu.config(font=("Arial", 8), width=7)
+        # Level Selection, filled in by refresh_level_menu
+        tk.Label(frame, text="Level:", **label_options).grid(row=3, column=0, sticky="e", pady=8)
+        self.selected_level_var.trace_add("write", self.on_level_selected)
 
-        self.color_label_window_id = self.canvas.create_window(self.width / 2 - 70, self.height / 2 - 10, anchor="e", window=self.color_label) # Adjusted Y
-        self.color_option_menu_window_id = self.canvas.create_window(self.width / 2 - 60, self.height / 2 - 10, anchor="w", window=self.color_option_menu) # Adjusted Y
+        # Snake Color Selection
+        tk.Label(frame, text="Snake Color:", **label_options).grid(row=4, column=0, sticky="e", pady=8)
+        color_option_menu = tk.OptionMenu(frame, self.selected_color_var, *SNAKE_COLOR_PALETTES.keys())
+        color_option_menu.config(font=("Arial", 8), width=7)
+        color_option_menu.grid(row=4, column=1, sticky="w", padx=10)
 
         # Game Speed Selection
-        self.speed_label = tk.Label(self.master, text="Game Speed:", bg=BACKGROUND_COLOR, fg="white", font=("Arial", 10))
-        self.selected_speed_var.set(self.current_speed_name) # Initialize OptionMenu
-        speed_options = list(MOVE_SPEEDS.keys())
-        self.speed_option_menu = tk.OptionMenu(self.master, self.selected_speed_var, *speed_options)
-        self.speed_option_menu.config(font=("Arial", 8), width=7)
-
-        self.speed_label_window_id = self.canvas.create_window(self.width / 2 - 70, self.height / 2 + 30, anchor="e", window=self.speed_label) # New Y
-        self.speed_option_menu_window_id = self.canvas.create_window(self.width / 2 - 60, self.height / 2 + 30, anchor="w", window=self.speed_option_menu) # New Y
-
-        # Screen Wrapping Checkbutton
-        self.wrapping_var.set(self.screen_wrapping_enabled) # Initialize Checkbutton state
-        self.wrapping_checkbutton = tk.Checkbutton(self.master, text="Screen Wrapping", variable=self.wrapping_var,
-                                                   bg=BACKGROUND_COLOR, fg="white", font=("Arial", 10),
-                                                   selectcolor=BACKGROUND_COLOR, activebackground=BACKGROUND_COLOR,
-                                                   activeforeground="white", highlightthickness=0, borderwidth=0)
-        self.wrapping_checkbutton_window_id = self.canvas.create_window(self.width / 2, self.height / 2 + 70, anchor="center", window=self.wrapping_checkbutton) # New Y
+        tk.Label(frame, text="Game Speed:", **label_options).grid(row=5, column=0, sticky="e", pady=8)
+        speed_option_menu = tk.OptionMenu(frame, self.selected_speed_var, *MOVE_SPEEDS.keys())
+        speed_option_menu.config(font=("Arial", 8), width=7)
+        speed_option_menu.grid(row=5, column=1, sticky="w", padx=10)
+
+        # Screen Wrapping and Autopilot Checkbuttons, side by side
+        tk.Checkbutton(frame, text="Screen Wrapping", variable=self.wrapping_var, **checkbutton_options).grid(row=6, column=0, sticky="e", pady=8)
+        tk.Checkbutton(frame, text="Autopilot", variable=self.autopilot_var, **checkbutton_options).grid(row=6, column=1, sticky="w", padx=10)
+
+        # Smooth Movement and Early Ticks Checkbuttons, side by side
+        tk.Checkbutton(frame, text="Smooth Movement", variable=self.smooth_movement_var, **checkbutton_options).grid(row=7, column=0, sticky="e", pady=8)
+        tk.Checkbutton(frame, text="Early Ticks", variable=self.early_tick_var, **checkbutton_options).grid(row=7, column=1, sticky="w", padx=10)
 
         # Grid Brightness Slider
-        self.grid_brightness_label = tk.Label(self.master, text="Grid Brightness:", bg=BACKGROUND_COLOR, fg="white", font=("Arial", 10))
-        self.grid_brightness_scale_var.set(self.grid_brightness) # Initialize Slider
-        self.grid_brightness_slider = tk.Scale(self.master, from_=0, to=100, orient=tk.HORIZONTAL,
-                                               variable=self.grid_brightness_scale_var,
-                                               bg=BACKGROUND_COLOR, fg="white", troughcolor="grey",
-                                               highlightthickness=0, length=100, font=("Arial", 8))
-        self.grid_brightness_label_window_id = self.canvas.create_window(self.width / 2 - 55, self.height / 2 + 110, anchor="e", window=self.grid_brightness_label) # New Y
-        self.grid_brightness_slider_window_id = self.canvas.create_window(self.width / 2 - 50, self.height / 2 + 110, anchor="w", window=self.grid_brightness_slider) # New Y
-
-        # Start Game Button
-        self.start_button = tk.Button(self.master, text="Start Game", command=self.start_game_from_menu, font=("Arial", 14), bg="grey", fg="white")
-        self.start_button_window_id = self.canvas.create_window(self.width / 2, self.height / 2 + 160, anchor="center", window=self.start_button) # Adjusted Y for more spacing
-
-        # Exit Button
-        self.exit_button = tk.Button(self.master, text="Exit", command=self.master.destroy, font=("Arial", 14), bg="grey", fg="white")
-        self.exit_button_window_id = self.canvas.create_window(self.width / 2, self.height / 2 + 210, anchor="center", window=self.exit_button) # Adjusted Y for more spacing
-        
-        self.canvas.focus_set() # For any potential menu key bindings, though not used yet
+        tk.Label(frame, text="Grid Brightness:", **label_options).grid(row=8, column=0, sticky="e", pady=8)
+        tk.Scale(frame, from_=0, to=100, orient=tk.HORIZONTAL, variable=self.grid_brightness_scale_var,
+                 bg=BACKGROUND_COLOR, fg="white", troughcolor="grey",
+                 highlightthickness=0, length=100, font=("Arial", 8)).grid(row=8, column=1, sticky="w", padx=10)
+
+        # Start Game and Exit Buttons
+        tk.Button(frame, text="Start Game", command=self.start_game_from_menu, font=("Arial", 14),
+                  bg="grey", fg="white").grid(row=9, column=0, columnspan=2, pady=(20, 10))
+        tk.Button(frame, text="Exit", command=self.master.destroy, font=("Arial", 14),
+                  bg="grey", fg="white").grid(row=10, column=0, columnspan=2)
+
+    def refresh_level_menu(self):
+        """Offers the levels currently in LEVELS_DIR, rebuilding the option menu only if they changed."""
+        level_names = [os.path.splitext(os.path.basename(path))[0] for path in list_levels(LEVELS_DIR)]
+        if level_names == self.level_names:
+            return
+        self.level_names = level_names
+        if self.level_option_menu is not None:
+            self.level_option_menu.destroy()
+        self.level_option_menu = tk.OptionMenu(self.menu_frame, self.selected_level_var, NO_LEVEL_LABEL, *level_names)
+        self.level_option_menu.config(font=("Arial", 8), width=7)
+        self.level_option_menu.grid(row=3, column=1, sticky="w", padx=10)
+
+    def level_path(self, level_name):
+        return os.path.join(LEVELS_DIR, level_name + LEVEL_EXTENSION)
+
+    def load_level(self, level_name):
+        """The level with this name, through the level cache. None for no level or one that cannot be opened."""
+        if level_name == NO_LEVEL:
+            return None
+        try:
+            level = self.level_cache.get(self.level_path(level_name))
+        except (LevelError, OSError) as e:
+            print(f"Warning: Could not open level '{level_name}', playing without it ({e})")
+            return None
+        return level
+
+    def level_ready(self, level):
+        """True once the level's free-cell index (and, if it fits the window, its wall runs) is built."""
+        return level.free_index is not None and (level.map_size_n > VIEWPORT_SIZE_N or level.runs is not None)
+
+    def index_level(self, level, on_ready=None):
+        """Builds the level's index on a worker thread, then runs on_ready on the Tk thread.
+
+        The index is O(cells): seconds on the biggest boards, which must not freeze the menu.
+        """
+        waiters = self.level_waiters.get(level)
+        if waiters is None:
+            waiters = self.level_waiters[level] = []
+            self.expect_tk_call()
+            threading.Thread(target=self.build_level_index, args=(level,), name="snake-level-index", daemon=True).start()
+        if on_ready is not None and on_ready not in waiters:
+            waiters.append(on_ready)
+
+    def build_level_index(self, level):
+        """Worker thread: the index is kept with the cached level, so this runs once per level."""
+        level.free_cell_index()
+        if level.map_size_n <= VIEWPORT_SIZE_N:
+            level.wall_runs()
+        self.post_to_tk(self.level_indexed, level)
+
+    def level_indexed(self, level):
+        for on_ready in self.level_waiters.pop(level, ()):
+            on_ready()
+
+    def on_level_selected(self, *args):
+        """Opens the level picked in the menu and indexes it in the background, so Start Game finds it ready."""
+        name = self.selected_level_var.get()
+        if name and name != NO_LEVEL_LABEL:
+            level = self.load_level(name)
+            if level is not None and not self.level_ready(level):
+                self.index_level(level)
 
     def clear_menu_widgets(self):
-        # Destroy Tkinter widgets
-        if self.map_label: self.map_label.destroy()
-        if self.map_size_entry: self.map_size_entry.destroy()
-        if self.color_label: self.color_label.destroy()
-        if self.color_option_menu: self.color_option_menu.destroy()
-        if self.speed_label: self.speed_label.destroy()
-        if self.speed_option_menu: self.speed_option_menu.destroy()
-        if self.wrapping_checkbutton: self.wrapping_checkbutton.destroy()
-        if self.grid_brightness_label: self.grid_brightness_label.destroy()
-        if self.grid_brightness_slider: self.grid_brightness_slider.destroy()
-        if self.start_button: self.start_button.destroy()
-        if self.exit_button: self.exit_button.destroy()
-        
-        # Nullify references
-        self.map_label = self.map_size_entry = self.start_button = self.exit_button = None
-        self.color_label = self.color_option_menu = None
-        self.speed_label = self.speed_option_menu = None
-        self.wrapping_checkbutton = None
-        self.grid_brightness_label = self.grid_brightness_slider = None
-        
-        # Canvas items created with create_text, create_window are cleared by canvas.delete(ALL)
-        # but if we stored their IDs, we could delete them individually too.
-        # For now, relying on canvas.delete(ALL) before drawing game or new menu.
+        """Hides the menu; its widgets are kept for the next show_menu()."""
+        if self.menu_frame is not None:
+            self.menu_frame.place_forget()
 
     def start_game_from_menu(self):
+        if not self.menu_active:
+            return # A level finished indexing after the game had already started
         # Get and validate map size
         try:
             n = int(self.map_size_entry.get())
-            if not (10 <= n <= 50):
-                print(f"Invalid map size: {n}. Must be between 10 and 50. Using default {self.map_size_n}.")
+            if not (MIN_MAP_SIZE_N <= n <= MAX_HUGE_MAP_SIZE_N):
+                print(f"Invalid map size: {n}. Must be between {MIN_MAP_SIZE_N} and {MAX_HUGE_MAP_SIZE_N}. Using default {self.map_size_n}.")
                 n = self.map_size_n # Revert to current if invalid, or default if first time
             else:
                 self.map_size_n = n # Update if valid
@@ -348,8 +565,23 @@ class SnakeGame:
             print(f"Invalid map size input. Using current map size {self.map_size_n}.")
             n = self.map_size_n # Revert to current if invalid input
 
-        self.width = self.map_size_n * SEGMENT_SIZE
-        self.height = self.map_size_n * SEGMENT_SIZE
+        # Get selected level; a level brings its own board size
+        selected_level = self.selected_level_var.get()
+        self.level_name = NO_LEVEL if selected_level == NO_LEVEL_LABEL else selected_level
+        self.level = self.load_level(self.level_name)
+        if self.level is not None and not self.level_ready(self.level):
+            # Start once the worker thread has indexed it; the menu stays responsive meanwhile
+            self.highscore_label.config(text=f"Loading {self.level_name}...")
+            self.index_level(self.level, self.start_game_from_menu)
+            return
+        if self.level is not None:
+            self.map_size_n = self.level.map_size_n
+
+        # The window shows at most VIEWPORT_SIZE_N cells per side; bigger boards scroll
+        self.scrolling_viewport = self.map_size_n > VIEWPORT_SIZE_N
+        self.viewport_n = min(self.map_size_n, VIEWPORT_SIZE_N)
+        self.width = self.viewport_n * SEGMENT_SIZE
+        self.height = self.viewport_n * SEGMENT_SIZE
 
         # Get selected color and update game settings
         selected_color = self.selected_color_var.get()
@@ -366,13 +598,22 @@ class SnakeGame:
         # Get screen wrapping setting
         self.screen_wrapping_enabled = self.wrapping_var.get()
 
+        # Get autopilot setting
+        self.autopilot_enabled = self.autopilot_var.get()
+
+        # Get smooth movement setting
+        self.smooth_movement_enabled = self.smooth_movement_var.get()
+
+        # Get early tick setting
+        self.early_tick_enabled = self.early_tick_var.get()
+
         # Get grid brightness setting
         self.grid_brightness = self.grid_brightness_scale_var.get()
 
         # Save all settings
         self.save_settings()
         
-        self.clear_menu_widgets() # Remove menu widgets
+        self.clear_menu_widgets() # Hide menu widgets
         
         self.canvas.config(width=self.width, height=self.height)
         self.center_window() # Recenter for new game dimensions
@@ -382,175 +623,492 @@ class SnakeGame:
         self.start_game() # Proceed to game setup
 
     def start_game(self): # Modified to be called from menu
-        self.canvas.delete(tk.ALL) # Clear menu elements or previous game
+        self.canvas.delete("!grid_line") # Clear menu elements or previous game, keep the cached grid
         self.game_over_flag = False
-        self.score = 0
-        self.master.title(f"Simple Snake Game - Score: {self.score}")
-        self.direction = "Right"
-        self.new_direction = "Right"
-
-        mid_x_segment = self.width // (2 * SEGMENT_SIZE)
-        mid_y_segment = self.height // (2 * SEGMENT_SIZE)
-        start_x_head = mid_x_segment * SEGMENT_SIZE
-        start_y_head = mid_y_segment * SEGMENT_SIZE
-
-        self.snake_segments = [
-            (start_x_head - 2 * SEGMENT_SIZE, start_y_head),
-            (start_x_head - SEGMENT_SIZE, start_y_head),
-            (start_x_head, start_y_head)
-        ]
-        self.create_food()
+        self.engine = SnakeEngine(self.map_size_n, self.screen_wrapping_enabled, level=self.level)
+        self.replay_recorder = ReplayRecorder(self.engine, self.current_speed_ms)
+        self.autopilot = Autopilot(self.engine) if self.autopilot_enabled else None
+        self.master.title(f"Simple Snake Game - Score: {self.engine.score}")
+        self.draw_grid() # Static for the whole game, shown (or rebuilt) once
+        if not self.scrolling_viewport:
+            self.draw_walls() # Scrolling boards draw the visible walls in redraw_viewport
+        self.segment_items = None # First draw_game builds the snake and food items
+        self.food_item = None
+        self.visible_items = None
+        self.viewport_changes = []
+        self.tail_items = None
+        self.rendered_fraction = None
+        # Scrolling boards redraw the viewport on camera moves and keep moving in whole cells
+        self.smooth_movement = self.smooth_movement_enabled and not self.scrolling_viewport
+        if self.scrolling_viewport:
+            self.create_minimap()
+        self.tick_clock = TickClock(self.current_speed_ms)
+        self.tick_clock.start()
+        self.input_queue.clear()
+        self.input_queue.reset_stats()
+        self.profile_overlay_item = None
+        self.profiler = None
+        if self.profiling_enabled:
+            self.start_profiler()
         self.game_loop() # Start the game's update cycle
+        if self.render_after_id is not None:
+            self.master.after_cancel(self.render_after_id)
+            self.render_after_id = None
+        if self.smooth_movement:
+            self.render_after_id = self.master.after(RENDER_FRAME_MS, self.render_frame)
 
     def create_food(self):
         """Places food randomly on the canvas, not on the snake."""
-        while True:
-            x = random.randrange(0, self.width // SEGMENT_SIZE) * SEGMENT_SIZE
-            y = random.randrange(0, self.height // SEGMENT_SIZE) * SEGMENT_SIZE
-            self.food_coords = (x, y)
-            if self.food_coords not in self.snake_segments:
-                break
+        self.engine.create_food()
 
     def draw_grid(self):
-        if self.grid_brightness > 0:
-            rgb_val = int(255 * (self.grid_brightness / 100.0))
-            grid_color_hex = f"#{rgb_val:02x}{rgb_val:02x}{rgb_val:02x}"
+        """Shows the grid layer below everything else, rebuilding it only when needed."""
+        if self.grid_brightness <= 0:
+            self.canvas.itemconfig("grid_line", state="hidden")
+            return
+
+        grid_color = grid_color_hex(self.grid_brightness)
+
+        if self.grid_size != (self.width, self.height):
+            self.canvas.delete("grid_line")
 
             # Draw vertical lines
             for x in range(0, self.width, SEGMENT_SIZE):
-                self.canvas.create_line(x, 0, x, self.height, fill=grid_color_hex, width=1, tags="grid_line")
-            
+                self.canvas.create_line(x, 0, x, self.height, fill=grid_color, width=1, tags="grid_line")
+
             # Draw horizontal lines
             for y in range(0, self.height, SEGMENT_SIZE):
-                self.canvas.create_line(0, y, self.width, y, fill=grid_color_hex, width=1, tags="grid_line")
+                self.canvas.create_line(0, y, self.width, y, fill=grid_color, width=1, tags="grid_line")
 
-    def draw_game(self):
-        self.canvas.delete(tk.ALL) # Clear previous frame
-        self.draw_grid() # Draw grid first
+            self.grid_size = (self.width, self.height)
+        elif self.grid_color_hex != grid_color:
+            self.canvas.itemconfig("grid_line", fill=grid_color)
 
-        # Draw food
-        self.canvas.create_rectangle(
-            self.food_coords[0], self.food_coords[1],
-            self.food_coords[0] + SEGMENT_SIZE, self.food_coords[1] + SEGMENT_SIZE,
+        self.grid_color_hex = grid_color
+        self.canvas.itemconfig("grid_line", state="normal")
+        self.canvas.tag_lower("grid_line")
+
+    def draw_walls(self):
+        """Draws the level's walls, one rectangle per horizontal run of wall cells."""
+        if self.level is None:
+            return
+        for y, x0, x1 in self.level.wall_runs():
+            self.canvas.create_rectangle(x0 * SEGMENT_SIZE, y * SEGMENT_SIZE, x1 * SEGMENT_SIZE, (y + 1) * SEGMENT_SIZE,
+                                         fill=WALL_COLOR, outline=WALL_COLOR, tags="wall")
+
+    def segment_pixel_coords(self, cell):
+        """Returns (border_coords, fill_coords) of the two rectangles drawn for a snake cell."""
+        x, y = cell[0] * SEGMENT_SIZE, cell[1] * SEGMENT_SIZE
+        return ((x, y, x + SEGMENT_SIZE, y + SEGMENT_SIZE),
+                (x + 1, y + 1, x + SEGMENT_SIZE - 1, y + SEGMENT_SIZE - 1))
+
+    def create_segment_items(self, cell, fill_color):
+        border_coords, fill_coords = self.segment_pixel_coords(cell)
+        # Border rectangle covers the whole cell, the main rectangle is inset by 1 pixel
+        border_id = self.canvas.create_rectangle(
+            *border_coords, fill=SEGMENT_BORDER_COLOR, outline=SEGMENT_BORDER_COLOR, tags="snake_border"
+        )
+        fill_id = self.canvas.create_rectangle(
+            *fill_coords, fill=fill_color, outline=fill_color, tags="snake_segment"
+        )
+        return border_id, fill_id
+
+    def redraw_game(self):
+        """Rebuilds the food and snake items from scratch."""
+        self.canvas.delete("food", "snake_border", "snake_segment")
+        self.tail_items = None # Deleted with the snake; start_moving_items makes a new one
+
+        # Draw food (engine coordinates are cells, the canvas works in pixels)
+        food_x = self.engine.food_coords[0] * SEGMENT_SIZE
+        food_y = self.engine.food_coords[1] * SEGMENT_SIZE
+        self.food_item = self.canvas.create_rectangle(
+            food_x, food_y, food_x + SEGMENT_SIZE, food_y + SEGMENT_SIZE,
             fill=self.current_food_color_hex, outline=self.current_food_color_hex, tags="food"
         )
+        self.drawn_food_coords = self.engine.food_coords
 
         # Draw snake
-        border_color_hex = "#000000" # Black for the border
-        
-        current_palette = SNAKE_COLOR_PALETTES[self.current_snake_color_name]
-        head_color_hex = current_palette["head"]
-        body_color_hex = self.current_snake_color_hex # This is already set to current_palette["body"]
+        head_color_hex = SNAKE_COLOR_PALETTES[self.current_snake_color_name]["head"]
+        body_color_hex = self.current_snake_color_hex
 
-        for i, (x, y) in enumerate(self.snake_segments):
-            is_head = (i == len(self.snake_segments) - 1)
+        snake_segments = self.engine.snake_segments
+        self.segment_items = deque()
+        for i, cell in enumerate(snake_segments):
+            is_head = (i == len(snake_segments) - 1)
             fill_color = head_color_hex if is_head else body_color_hex
+            self.segment_items.append(self.create_segment_items(cell, fill_color))
+        self.drawn_moves = self.engine.moves
 
-            # Draw border rectangle (1 pixel larger on all sides)
-            self.canvas.create_rectangle(
-                x, y, x + SEGMENT_SIZE, y + SEGMENT_SIZE,
-                fill=border_color_hex, outline=border_color_hex, tags="snake_border"
-            )
-            # Draw main segment rectangle (inset by 1 pixel for border effect)
-            self.canvas.create_rectangle(
-                x + 1, y + 1, x + SEGMENT_SIZE - 1, y + SEGMENT_SIZE - 1,
-                fill=fill_color, outline=fill_color, tags="snake_segment"
-            )
+    def draw_game(self):
+        """Updates only the canvas items that changed since the last frame.
 
-    def move_snake(self):
-        # Update direction based on last valid key press
-        self.direction = self.new_direction
-        
-        head_x, head_y = self.snake_segments[-1]
-
-        if self.direction == "Up":
-            new_head = (head_x, head_y - SEGMENT_SIZE)
-        elif self.direction == "Down":
-            new_head = (head_x, head_y + SEGMENT_SIZE)
-        elif self.direction == "Left":
-            new_head = (head_x - SEGMENT_SIZE, head_y)
-        elif self.direction == "Right":
-            new_head = (head_x + SEGMENT_SIZE, head_y)
-        else: # Should not happen
+        New heads reuse the items of freed tail cells, the old head is recolored
+        and the food item is moved, so a frame costs the same at any snake length.
+        """
+        if self.scrolling_viewport:
+            self.draw_viewport()
             return
 
-        final_head_pos = new_head
+        snake_segments = self.engine.snake_segments
+        new_heads = self.engine.moves - self.drawn_moves
+        if self.segment_items is None or not 0 <= new_heads < len(snake_segments):
+            self.redraw_game()
+            return
+        freed_tails = len(self.segment_items) + new_heads - len(snake_segments)
+        if not 0 <= freed_tails <= len(self.segment_items):
+            self.redraw_game()
+            return
 
+        head_color_hex = SNAKE_COLOR_PALETTES[self.current_snake_color_name]["head"]
+        body_color_hex = self.current_snake_color_hex
+
+        for i in range(len(snake_segments) - new_heads, len(snake_segments)):
+            cell = snake_segments[i]
+            # The previous head is now part of the body
+            old_head_border, old_head_fill = self.segment_items[-1]
+            if self.smooth_movement:
+                # place_moving_items left it partway into its cell (far from it after an early tick)
+                border_coords, fill_coords = self.segment_pixel_coords(snake_segments[i - 1])
+                self.canvas.coords(old_head_border, *border_coords)
+                self.canvas.coords(old_head_fill, *fill_coords)
+            self.canvas.itemconfig(old_head_fill, fill=body_color_hex, outline=body_color_hex)
+
+            if freed_tails > 0:
+                # Recycle the freed tail's items as the new head
+                freed_tails -= 1
+                border_id, fill_id = self.segment_items.popleft()
+                border_coords, fill_coords = self.segment_pixel_coords(cell)
+                self.canvas.coords(border_id, *border_coords)
+                self.canvas.coords(fill_id, *fill_coords)
+                self.canvas.itemconfig(fill_id, fill=head_color_hex, outline=head_color_hex)
+                self.segment_items.append((border_id, fill_id))
+            else:
+                self.segment_items.append(self.create_segment_items(cell, head_color_hex))
+        self.drawn_moves = self.engine.moves
+
+        if self.engine.food_coords != self.drawn_food_coords:
+            food_x = self.engine.food_coords[0] * SEGMENT_SIZE
+            food_y = self.engine.food_coords[1] * SEGMENT_SIZE
+            self.canvas.coords(self.food_item, food_x, food_y, food_x + SEGMENT_SIZE, food_y + SEGMENT_SIZE)
+            self.drawn_food_coords = self.engine.food_coords
+
+    def start_moving_items(self):
+        """After a tick's draw_game: sets up the head and tail items to slide over the coming tick."""
+        if self.segment_items is None:
+            return
+        if self.tail_items is None:
+            self.tail_items = self.create_segment_items((0, 0), self.current_snake_color_hex)
+            # Below the snake, so the sliding tail never covers a segment's border
+            self.canvas.tag_lower(self.tail_items[1], "snake_border")
+            self.canvas.tag_lower(self.tail_items[0], self.tail_items[1])
+        # Recycled head items keep the tail's place in the stacking order; the head slides over the body
+        border_id, fill_id = self.segment_items[-1]
+        self.canvas.tag_raise(border_id)
+        self.canvas.tag_raise(fill_id)
+        tail_state = "hidden" if self.engine.freed_tail_cell == NO_CELL or self.engine.moves == 0 else "normal"
+        self.canvas.itemconfig(self.tail_items[0], state=tail_state)
+        self.canvas.itemconfig(self.tail_items[1], state=tail_state)
+        self.place_moving_items(self.tick_clock.fraction())
+
+    def slide_step(self, from_cell, to_cell):
+        """(dx, dy) of the single-cell move from from_cell to to_cell, across the edge when wrapping."""
+        steps = []
+        for a, b in zip(self.engine.cell_coords(from_cell), self.engine.cell_coords(to_cell)):
+            d = b - a
+            if d > 1:
+                d = -1 # Wrapped past the low edge
+            elif d < -1:
+                d = 1 # Wrapped past the high edge
+            steps.append(d)
+        return steps
+
+    def place_moving_items(self, fraction):
+        """Puts the head and the sliding tail fraction (0-1) of the way through the last move.
+
+        Four canvas.coords calls, whatever the snake's length.
+        """
+        self.rendered_fraction = fraction
+        engine = self.engine
+        if self.segment_items is None or engine.moves == 0 or engine.length < 2:
+            return
+        remaining = 1.0 - fraction
+        head = engine.head_cell
+        head_x, head_y = engine.cell_coords(head)
+        dx, dy = self.slide_step(engine.body_cell(engine.length - 2), head)
+        border_coords, fill_coords = self.segment_pixel_coords((head_x - dx * remaining, head_y - dy * remaining))
+        border_id, fill_id = self.segment_items[-1]
+        self.canvas.coords(border_id, *border_coords)
+        self.canvas.coords(fill_id, *fill_coords)
+
+        freed_tail = engine.freed_tail_cell
+        if freed_tail != NO_CELL and self.tail_items is not None:
+            tail_x, tail_y = engine.cell_coords(freed_tail)
+            dx, dy = self.slide_step(freed_tail, engine.body_cell(0))
+            border_coords, fill_coords = self.segment_pixel_coords((tail_x + dx * fraction, tail_y + dy * fraction))
+            self.canvas.coords(self.tail_items[0], *border_coords)
+            self.canvas.coords(self.tail_items[1], *fill_coords)
+
+    def render_frame(self):
+        """Display-rate loop for smooth movement, separate from the logic ticks in game_loop."""
+        self.render_after_id = None
+        if self.menu_active or self.game_over_flag or not self.smooth_movement:
+            return
+        fraction = self.tick_clock.fraction()
+        if fraction != self.rendered_fraction:
+            self.place_moving_items(fraction)
+        self.render_after_id = self.master.after(RENDER_FRAME_MS, self.render_frame)
+
+    def viewport_position(self, cell):
+        """Returns the viewport (column, row) showing a board cell, or None if it is off screen."""
+        x = cell[0] - self.camera_x
+        y = cell[1] - self.camera_y
+        if self.screen_wrapping_enabled:
+            x %= self.map_size_n
+            y %= self.map_size_n
+        if 0 <= x < self.viewport_n and 0 <= y < self.viewport_n:
+            return x, y
+        return None
+
+    def recenter_camera(self, head):
+        """Moves the camera to center the head if it got too close to an edge. Returns True if it moved."""
+        n = self.map_size_n
+        position = self.viewport_position(head)
+        low, high = VIEWPORT_MARGIN_N, self.viewport_n - VIEWPORT_MARGIN_N
+        if position is not None and low <= position[0] < high and low <= position[1] < high:
+            return False
+
+        camera_x = head[0] - self.viewport_n // 2
+        camera_y = head[1] - self.viewport_n // 2
         if self.screen_wrapping_enabled:
-            # Screen Wrapping Logic
-            current_head_x, current_head_y = new_head
-            wrapped_head_x, wrapped_head_y = current_head_x, current_head_y
-
-            if current_head_x >= self.width:
-                wrapped_head_x = 0
-            elif current_head_x < 0:
-                wrapped_head_x = self.width - SEGMENT_SIZE
-            
-            if current_head_y >= self.height:
-                wrapped_head_y = 0
-            elif current_head_y < 0:
-                wrapped_head_y = self.height - SEGMENT_SIZE
-                
-            final_head_pos = (wrapped_head_x, wrapped_head_y)
+            camera_x %= n
+            camera_y %= n
         else:
-            # Boundary Collision Logic (No Wrapping)
-            current_head_x, current_head_y = new_head
-            if not (0 <= current_head_x < self.width and 0 <= current_head_y < self.height):
-                self.game_over_flag = True
-                # Game over due to wall collision, no need to add segment or check food
-                # The game_loop will pick up game_over_flag and display the screen.
-                return 
-
-        self.snake_segments.append(final_head_pos)
+            camera_x = max(0, min(camera_x, n - self.viewport_n))
+            camera_y = max(0, min(camera_y, n - self.viewport_n))
+        if (camera_x, camera_y) == (self.camera_x, self.camera_y):
+            return False # Already as close to centered as the walls allow
+        self.camera_x, self.camera_y = camera_x, camera_y
+        return True
+
+    def add_visible_segment(self, cell, fill_color):
+        position = self.viewport_position(cell)
+        if position is None:
+            return
+        items = self.create_segment_items(position, fill_color)
+        # Keep the minimap on top of the board
+        self.canvas.tag_lower(items[0], self.minimap_item)
+        self.canvas.tag_lower(items[1], self.minimap_item)
+        self.visible_items[cell] = items
+
+    def redraw_visible_walls(self):
+        """Draws the level's walls inside the viewport, one rectangle per run of wall cells in a row."""
+        self.canvas.delete("wall")
+        if self.level is None:
+            return
+        n = self.map_size_n
+        is_wall = self.level.is_wall
+        for row in range(self.viewport_n):
+            row_start = ((self.camera_y + row) % n) * n
+            run_start = None
+            for column in range(self.viewport_n + 1):
+                wall = column < self.viewport_n and is_wall(row_start + (self.camera_x + column) % n)
+                if wall and run_start is None:
+                    run_start = column
+                elif not wall and run_start is not None:
+                    item = self.canvas.create_rectangle(
+                        run_start * SEGMENT_SIZE, row * SEGMENT_SIZE, column * SEGMENT_SIZE, (row + 1) * SEGMENT_SIZE,
+                        fill=WALL_COLOR, outline=WALL_COLOR, tags="wall")
+                    self.canvas.tag_lower(item, self.minimap_item)
+                    run_start = None
+
+    def redraw_viewport(self):
+        """Rebuilds the snake and wall items for every cell inside the viewport (after the camera moved)."""
+        self.canvas.delete("snake_border", "snake_segment")
+        self.redraw_visible_walls()
+        self.visible_items = {}
+        n = self.map_size_n
+        occupancy = self.engine.occupancy
+        head = self.engine.snake_segments[-1]
+        head_color_hex = SNAKE_COLOR_PALETTES[self.current_snake_color_name]["head"]
+        for row in range(self.viewport_n):
+            y = (self.camera_y + row) % n
+            for column in range(self.viewport_n):
+                x = (self.camera_x + column) % n
+                if occupancy[y * n + x]:
+                    cell = (x, y)
+                    fill_color = head_color_hex if cell == head else self.current_snake_color_hex
+                    self.add_visible_segment(cell, fill_color)
+        self.drawn_head_cell = head
+
+    def draw_viewport(self):
+        """draw_game for scrolling boards: only cells inside the viewport have canvas items.
+
+        A normal tick adds the new head, drops the freed tail and recolors the
+        old head; only a camera move redraws the (viewport-sized) visible area.
+        """
+        changes = self.viewport_changes
+        self.viewport_changes = []
+        head = self.engine.snake_segments[-1]
+
+        if self.food_item is None:
+            self.food_item = self.canvas.create_rectangle(
+                0, 0, SEGMENT_SIZE, SEGMENT_SIZE,
+                fill=self.current_food_color_hex, outline=self.current_food_color_hex, tags="food"
+            )
+            self.canvas.tag_lower(self.food_item, self.minimap_item)
 
-        # Check if snake ate food
-        if final_head_pos == self.food_coords:
-            self.score += 1
-            self.master.title(f"Simple Snake Game - Score: {self.score}")
-            self.create_food()
+        camera_moved = self.recenter_camera(head)
+        if self.visible_items is None or camera_moved:
+            self.redraw_viewport()
+            self.update_minimap_frame()
         else:
-            self.snake_segments.pop(0) # Remove tail if no food eaten
-
-    def check_collisions(self):
-        head_x, head_y = self.snake_segments[-1]
-
-        # Wall collision logic is now handled in move_snake if wrapping is off.
-        # This method primarily checks for self-collision.
+            head_color_hex = SNAKE_COLOR_PALETTES[self.current_snake_color_name]["head"]
+            body_color_hex = self.current_snake_color_hex
+            for new_head, freed_tail in changes:
+                if freed_tail is not None and not self.engine.occupancy[freed_tail[1] * self.map_size_n + freed_tail[0]]:
+                    items = self.visible_items.pop(freed_tail, None)
+                    if items:
+                        self.canvas.delete(*items)
+                old_head_items = self.visible_items.get(self.drawn_head_cell)
+                if old_head_items:
+                    self.canvas.itemconfig(old_head_items[1], fill=body_color_hex, outline=body_color_hex)
+                if new_head in self.visible_items: # Moved into the cell its tail just left
+                    self.canvas.itemconfig(self.visible_items[new_head][1], fill=head_color_hex, outline=head_color_hex)
+                else:
+                    self.add_visible_segment(new_head, head_color_hex)
+                self.drawn_head_cell = new_head
+
+        for new_head, freed_tail in changes:
+            self.update_minimap(new_head, freed_tail)
+
+        food_position = self.viewport_position(self.engine.food_coords)
+        if food_position is None:
+            self.canvas.itemconfig(self.food_item, state="hidden")
+        else:
+            food_x, food_y = food_position[0] * SEGMENT_SIZE, food_position[1] * SEGMENT_SIZE
+            self.canvas.coords(self.food_item, food_x, food_y, food_x + SEGMENT_SIZE, food_y + SEGMENT_SIZE)
+            self.canvas.itemconfig(self.food_item, state="normal")
+        self.update_minimap_food()
+
+    def create_minimap(self):
+        """Builds the downsampled whole-board minimap (one pixel per minimap_block^2 cells)."""
+        n = self.map_size_n
+        self.minimap_block = math.ceil(n / MINIMAP_MAX_PX)
+        size = math.ceil(n / self.minimap_block)
+        self.minimap_counts = [0] * (size * size)
+        self.minimap_image = tk.PhotoImage(master=self.master, width=size, height=size)
+        self.minimap_image.put(BACKGROUND_COLOR, to=(0, 0, size, size))
+        left = self.width - size - 5
+        self.minimap_item = self.canvas.create_image(left, 5, anchor="nw", image=self.minimap_image, tags="minimap")
+        self.canvas.create_rectangle(left - 1, 4, left + size, 5 + size, outline="grey", tags="minimap")
+        self.minimap_frame_item = self.canvas.create_rectangle(0, 0, 0, 0, outline=MINIMAP_BORDER_COLOR, tags="minimap")
+        self.minimap_food_pixel = None
+        for cell in self.engine.snake_segments:
+            self.update_minimap(cell, None)
+
+    def minimap_pixel(self, cell):
+        return cell[0] // self.minimap_block, cell[1] // self.minimap_block
+
+    def update_minimap(self, new_head, freed_tail):
+        size = self.minimap_image.width()
+        for cell, delta in ((new_head, 1), (freed_tail, -1)):
+            if cell is None:
+                continue
+            x, y = self.minimap_pixel(cell)
+            count = self.minimap_counts[y * size + x] + delta
+            self.minimap_counts[y * size + x] = count
+            # A pixel only changes color when its block gains its first or loses its last segment
+            if (count == 1 and delta == 1) or count == 0:
+                if (x, y) != self.minimap_food_pixel:
+                    self.minimap_image.put(self.current_snake_color_hex if count else BACKGROUND_COLOR, to=(x, y))
+
+    def update_minimap_food(self):
+        pixel = self.minimap_pixel(self.engine.food_coords)
+        if pixel == self.minimap_food_pixel:
+            return
+        size = self.minimap_image.width()
+        if self.minimap_food_pixel is not None:
+            x, y = self.minimap_food_pixel
+            self.minimap_image.put(self.current_snake_color_hex if self.minimap_counts[y * size + x] else BACKGROUND_COLOR, to=(x, y))
+        self.minimap_image.put(self.current_food_color_hex, to=pixel)
+        self.minimap_food_pixel = pixel
+
+    def update_minimap_frame(self):
+        """Outlines the part of the board currently in the viewport."""
+        left = self.width - self.minimap_image.width() - 5
+        block = self.minimap_block
+        x0 = left + self.camera_x // block
+        y0 = 5 + self.camera_y // block
+        span = math.ceil(self.viewport_n / block)
+        self.canvas.coords(self.minimap_frame_item, x0, y0, x0 + span, y0 + span)
 
-        # Self-collision (check if head is in the rest of the body)
-        if (head_x, head_y) in self.snake_segments[:-1]:
-            return True # Collision occurred
+    def move_snake(self):
+        previous_score = self.engine.score
+        previous_moves = self.engine.moves
+        self.engine.move_snake()
+        if self.scrolling_viewport and self.engine.moves != previous_moves:
+            self.viewport_changes.append((self.engine.snake_segments[-1], self.engine.freed_tail))
+        if self.engine.score != previous_score:
+            self.master.title(f"Simple Snake Game - Score: {self.engine.score}")
+        if self.engine.game_over_flag:
+            # Wall collision or a full board; the game_loop will pick up game_over_flag and display the screen.
+            self.game_over_flag = True
 
-        return False # No collision
+    def check_collisions(self):
+        return self.engine.check_collisions()
 
     def change_direction(self, new_dir):
-        # Prevent 180-degree turns
-        if new_dir == "Up" and self.direction != "Down":
-            self.new_direction = new_dir
-        elif new_dir == "Down" and self.direction != "Up":
-            self.new_direction = new_dir
-        elif new_dir == "Left" and self.direction != "Right":
-            self.new_direction = new_dir
-        elif new_dir == "Right" and self.direction != "Left":
-            self.new_direction = new_dir
+        code = DIRECTION_CODES.get(new_dir)
+        if code is None or self.game_over_flag:
+            return
+        # Queued rather than applied, so a second turn pressed within the same tick isn't lost
+        if not self.input_queue.push(code, self.engine.direction_code):
+            return
+        if (self.early_tick_enabled and self.autopilot is None and len(self.input_queue.pending) == 1
+                and self.tick_clock.delay_ms() >= EARLY_TICK_MIN_MS):
+            # The next tick is far off: run it now instead of making the turn wait for it
+            self.master.after_cancel(self.game_loop_after_id)
+            self.tick_clock.pull_forward()
+            self.game_loop()
+
+    def save_replay(self):
+        replay = self.replay_recorder.finish()
+        self.writer.submit(REPLAY_FILE, lambda: replay.save(REPLAY_FILE), f"replay to {REPLAY_FILE}")
 
     def display_game_over(self):
-        self.save_high_score() # Save score before displaying
+        self.save_high_score() # The high score line fills in when the run is recorded
+        self.save_replay()
+
+        stats = self.tick_clock.stats()
+        print(f"Info: {stats['ticks']} ticks at {stats['achieved_ms']:.2f} ms/tick (target {stats['target_ms']:.0f} ms), "
+              f"lateness mean {stats['mean_lateness_ms']:.2f} ms / max {stats['max_lateness_ms']:.2f} ms, "
+              f"{stats['frames_skipped']} frames skipped, {stats['ticks_dropped']} ticks dropped, {stats['early_ticks']} early")
+        input_stats = self.input_queue.stats()
+        if input_stats["presses"]:
+            print(f"Info: {input_stats['presses']} key presses ({input_stats['dropped']} dropped), key-to-screen latency "
+                  f"mean {input_stats['mean_latency_ms']:.2f} ms / max {input_stats['max_latency_ms']:.2f} ms")
+        if self.autopilot is not None:
+            autopilot_stats = self.autopilot.stats()
+            print(f"Info: Autopilot decided {autopilot_stats['decisions']} ticks in {autopilot_stats['mean_ms']:.3f} ms mean / "
+                  f"{autopilot_stats['max_ms']:.3f} ms max ({autopilot_stats['max_ms'] / stats['target_ms']:.1%} of the tick), "
+                  f"{autopilot_stats['searches']} path searches")
+        if self.profiler is not None:
+            self.save_profile()
         self.unbind_game_keys() # Prevent movement after game over
 
         self.canvas.create_text(
             self.width / 2, self.height / 2 - 60, # Adjusted y for more elements
-            text="GAME OVER!",
+            text="YOU WIN!" if self.engine.won else "GAME OVER!",
             fill=GAME_OVER_TEXT_COLOR, font=("Arial", 24, "bold"), anchor="center"
         )
         self.canvas.create_text(
             self.width / 2, self.height / 2 - 20, # Adjusted y
-            text=f"Final Score: {self.score}",
+            text=f"Final Score: {self.engine.score}",
             fill=GAME_OVER_TEXT_COLOR, font=("Arial", 16), anchor="center"
         )
         self.canvas.create_text(
             self.width / 2, self.height / 2 + 20, # Display high score
-            text=f"High Score: {self.high_score}",
+            text="High Score: ...", tags=("game_over_high_score",),
             fill=GAME_OVER_TEXT_COLOR, font=("Arial", 16), anchor="center"
         )
         self.canvas.create_text(
@@ -581,17 +1139,90 @@ class SnakeGame:
             self.display_game_over() # Show game over screen
             return # Stop game loop here
 
-        self.move_snake()
+        # Run every logic tick that is due. Several are due only when we fell behind;
+        # they all run back to back and the intermediate frames are not rendered.
+        due_ticks = self.tick_clock.due_ticks()
+        for tick in range(due_ticks):
+            tick_start = time.perf_counter()
+            turn = self.input_queue.pop()
+            if turn is not None:
+                self.engine.change_direction_code(turn)
+            if self.autopilot is not None:
+                self.engine.change_direction_code(self.run_phase("autopilot", self.autopilot.next_direction))
+            self.run_phase("move_snake", self.move_snake)
+
+            if self.run_phase("check_collisions", self.check_collisions):
+                self.game_over_flag = True
+                self.engine.game_over_flag = True
+                self.engine.death_cause = DEATH_SELF
+                self.replay_recorder.record_tick()
+                self.end_profiled_tick(tick_start)
+                # Call game_loop one last time to display game over message
+                self.game_loop_after_id = self.master.after(self.tick_clock.delay_ms(), self.game_loop)
+                return
+            # Recorded after the collision check, so a keyframe is never taken of a finished game
+            self.replay_recorder.record_tick()
+
+            if self.game_over_flag or tick == due_ticks - 1:
+                # The frame is rendered once, as part of the last tick run
+                self.run_phase("draw_game", self.draw_game)
+                if self.smooth_movement:
+                    self.start_moving_items()
+                self.input_queue.frame_shown()
+                self.end_profiled_tick(tick_start)
+                break
+            self.end_profiled_tick(tick_start)
 
-        if self.check_collisions():
-            self.game_over_flag = True
-            # Call game_loop one last time to display game over message
-            self.master.after(self.current_speed_ms, self.game_loop)
+        # Sleep until the next absolute deadline, not a fixed delay after this tick's work
+        self.game_loop_after_id = self.master.after(self.tick_clock.delay_ms(), self.game_loop)
+
+
+    def run_phase(self, phase, func):
+        """Runs one phase of a tick, timing it when profiling is on."""
+        if self.profiler is None:
+            return func()
+        return self.profiler.measure(phase, func)
+
+    def end_profiled_tick(self, tick_start):
+        if self.profiler is None:
             return
+        self.profiler.record("tick_total", time.perf_counter() - tick_start)
+        self.profiler.end_tick(len(self.canvas.find_all()))
+        if self.profile_overlay_visible and self.profiler.ticks % PROFILE_OVERLAY_REFRESH_TICKS == 0:
+            self.update_profile_overlay()
+
+    def start_profiler(self):
+        self.profiling_enabled = True
+        self.profiler = TickProfiler()
+        # create_food is called from inside the engine, so time it there
+        self.engine.__class__ = profiled_engine(SnakeEngine, self.profiler)
+
+    def toggle_profile_overlay(self):
+        if self.profiler is None:
+            self.start_profiler() # The first F3 press turns profiling on for the rest of the session
+        self.profile_overlay_visible = not self.profile_overlay_visible
+        self.update_profile_overlay()
+
+    def update_profile_overlay(self):
+        if not self.profile_overlay_visible:
+            if self.profile_overlay_item is not None:
+                self.canvas.itemconfig(self.profile_overlay_item, state="hidden")
+            return
+        if self.profile_overlay_item is None:
+            self.profile_overlay_item = self.canvas.create_text(
+                5, 5, anchor="nw", fill=GAME_OVER_TEXT_COLOR, font=("Courier", 9), tags="profile_overlay"
+            )
+        self.canvas.itemconfig(self.profile_overlay_item, text=self.profiler.overlay_text(), state="normal")
+        self.canvas.tag_raise(self.profile_overlay_item)
 
-        self.draw_game()
-        self.master.after(self.current_speed_ms, self.game_loop)
+    def save_profile(self):
+        profiler = self.profiler # The next game gets a fresh profiler, so this one no longer changes
 
+        def dump():
+            profiler.dump_json(PROFILE_JSON_FILE)
+            profiler.dump_csv(PROFILE_CSV_FILE)
+            print(f"Info: Profile written to {PROFILE_JSON_FILE} and {PROFILE_CSV_FILE}")
+        self.writer.submit(PROFILE_JSON_FILE, dump, f"profile to {PROFILE_JSON_FILE}/{PROFILE_CSV_FILE}")
 
     def bind_game_keys(self):
         self.master.bind("<KeyPress-w>", lambda event: self.change_direction("Up"))
@@ -602,6 +1233,7 @@ class SnakeGame:
         self.master.bind("<Left>", lambda event: self.change_direction("Left"))
         self.master.bind("<Down>", lambda event: self.change_direction("Down"))
         self.master.bind("<Right>", lambda event: self.change_direction("Right"))
+        self.master.bind("<F3>", lambda event: self.toggle_profile_overlay())
         # Note: 'R' for restart during game is not implemented here, only from game over.
 
     def unbind_game_keys(self):
@@ -613,6 +1245,7 @@ class SnakeGame:
         self.master.unbind("<Left>")
         self.master.unbind("<Down>")
         self.master.unbind("<Right>")
+        self.master.unbind("<F3>")
         # Also unbind R from game over screen if it was bound
         self.master.unbind("<KeyPress-r>")
         self.master.unbind("<KeyPress-R>")
@@ -0,0 +1,315 @@
+"""Autopilot that plays the game by itself.
+
+The planner follows a Hamiltonian cycle through the board, which visits
+every cell, and takes A* shortcuts toward the food. A shortcut may only
+land in the stretch of the cycle between the head and the tail. That
+stretch is always free, and the body stays in cycle order from tail to
+head, so the snake can never trap itself. This replaces a per-tick flood
+fill with an O(1) check on two cycle positions.
+
+The path to the current food is planned once, with weighted A*, and then
+followed one cell per tick. It stays valid as the snake moves, because
+cells ahead of the head on the cycle only get freer as the tail advances. Searches stop
+after SEARCH_BUDGET cells. Food beyond SEARCH_RADIUS, or food the search
+budget could not reach, is approached with greedy shortcuts instead.
+These cost O(1) per tick, which keeps huge boards responsive.
+
+Odd-sized boards without wrapping have no Hamiltonian cycle, so there the
+cycle skips the bottom-right corner: the autopilot plays safely but can
+fill the board only up to that cell. When the snake does not start out
+in cycle order, or on levels whose walls cut the cycle, the autopilot runs
+A* over the free cells instead, with no safety guarantee.
+"""
+import heapq
+import time
+from array import array
+
+from snake_engine import NO_CELL, NEXT_CELL_TABLE_MAX_CELLS
+
+SEARCH_BUDGET = 4000 # Cells expanded per search before falling back to greedy shortcuts
+SEARCH_RADIUS = 100 # Food farther away than this (Manhattan) is approached greedily first
+HEURISTIC_WEIGHT = 2 # Weighted A*: slightly longer paths for far fewer expanded cells
+SEARCH_RETRY_TICKS = 16 # Ticks to wait before searching again after running out of budget
+
+
+class Autopilot:
+    def __init__(self, engine):
+        self.engine = engine
+        self.n = engine.map_size_n
+        self.cell_count = engine.cell_count
+        self.wrapping = engine.screen_wrapping_enabled
+        # Odd boards without wrapping leave out the bottom-right corner (see cycle_index)
+        self.cycle_length = self.cell_count if self.wrapping or self.n % 2 == 0 else self.cell_count - 1
+        self.has_cycle = engine.walls is None # Level walls break the cycle
+        self.reversed_cycle = False
+        self.cycle_order = None # Cell id -> cycle position, precomputed on small enough boards
+        self.path = [] # Planned cells toward path_food, the next one last
+        self.path_food = NO_CELL
+        self.next_search_tick = 0
+
+        # Decision latency, reported at game over
+        self.decisions = 0
+        self.searches = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+        if self.has_cycle and not self.body_in_cycle_order():
+            self.reversed_cycle = True # The snake starts out running against the cycle
+            if not self.body_in_cycle_order():
+                self.has_cycle = False
+        if self.has_cycle and self.cell_count <= NEXT_CELL_TABLE_MAX_CELLS:
+            self.cycle_order = array("I", map(self.cycle_index, range(self.cell_count)))
+
+    def cycle_index(self, cell):
+        """Position of cell along the Hamiltonian cycle."""
+        n = self.n
+        length = self.cycle_length
+        y, x = divmod(cell, n)
+        if self.wrapping:
+            # Row r (counted from the middle row) runs rightwards from column -r through
+            # the wrap, then steps down; after the last row the cycle closes by wrapping too
+            r = (y - n // 2) % n
+            index = r * n + (x + r) % n
+        elif y == 0:
+            index = x # Top row, left to right
+        elif x == 0:
+            index = length - y # Back up the left column
+        elif n % 2 and y >= n - 2:
+            # Odd boards: the last two rows zigzag up and down column by column, right to left,
+            # starting from the right end of row n - 2; the bottom-right corner is left out
+            if x == n - 1:
+                # The corner shares the position of the cell diagonally inside it: passing
+                # through it is a detour that skips that cell, never a step backwards
+                index = n + (n - 3) * (n - 1) + (y == n - 1)
+            else:
+                column = n - 2 - x
+                index = n + (n - 3) * (n - 1) + 1 + 2 * column + ((y == n - 1) == (column % 2 == 0))
+        elif y % 2:
+            index = n + (y - 1) * (n - 1) + (n - 1 - x) # Odd rows run right to left over columns 1..n-1
+        else:
+            index = n + (y - 1) * (n - 1) + (x - 1)
+        if self.reversed_cycle:
+            return -index % length
+        return index
+
+    def body_in_cycle_order(self):
+        """True when the snake's cells appear in cycle order from tail to head, within one lap."""
+        engine = self.engine
+        positions = [self.cycle_index(cell) for cell in engine.body_cells()]
+        laps = 0
+        for a, b in zip(positions, positions[1:]):
+            gap = (b - a) % self.cycle_length
+            if gap == 0:
+                return False
+            laps += gap
+        return laps < self.cycle_length
+
+    def estimate(self, cell, target):
+        """Manhattan distance between two cells (the shorter way round when wrapping)."""
+        n = self.n
+        y1, x1 = divmod(cell, n)
+        y2, x2 = divmod(target, n)
+        dx, dy = abs(x1 - x2), abs(y1 - y2)
+        if self.wrapping:
+            dx, dy = min(dx, n - dx), min(dy, n - dy)
+        return dx + dy
+
+    def direction_to(self, cell):
+        """Direction code that moves the head into the neighboring cell, or None."""
+        engine = self.engine
+        head = engine.head_cell
+        for code in range(4):
+            if engine.neighbor(head, code) == cell:
+                return code
+        return None
+
+    def next_direction(self):
+        """Plans this tick's move and returns its direction code."""
+        start = time.perf_counter()
+        if self.has_cycle:
+            code = self.plan_along_cycle()
+        else:
+            code = self.plan_free()
+        elapsed = time.perf_counter() - start
+        self.decisions += 1
+        self.total_time += elapsed
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+        return code
+
+    def plan_along_cycle(self):
+        engine = self.engine
+        length = self.cycle_length
+        index_of = self.cycle_order.__getitem__ if self.cycle_order is not None else self.cycle_index
+        head = engine.head_cell
+        head_index = index_of(head)
+        # Cells strictly between the head and the tail along the cycle are free; a move may
+        # land anywhere in there (or on the tail itself when it is the very next cell)
+        room = (index_of(engine.body_cell(0)) - head_index) % length
+        food = engine.food_cell
+        food_index = index_of(food)
+        food_distance = (food_index - head_index) % length
+
+        if self.path_food != food:
+            self.path = []
+            self.path_food = food
+            self.next_search_tick = engine.ticks
+        if (not self.path and food_distance < room and engine.ticks >= self.next_search_tick
+                and self.estimate(head, food) <= SEARCH_RADIUS):
+            self.path = self.search_along_cycle(head, head_index, room, food, index_of) or []
+            if not self.path:
+                self.next_search_tick = engine.ticks + SEARCH_RETRY_TICKS
+
+        if self.path:
+            cell = self.path.pop()
+            distance = (index_of(cell) - head_index) % length
+            code = self.direction_to(cell)
+            if code is not None and 0 < distance < room:
+                return code
+            self.path = [] # Knocked off the plan; search again
+
+        # No plan: take the neighbor that gets closest to the food without passing it,
+        # or just the next cell on the cycle when the food is behind the head
+        # (the tail's position is only ever entered as the very next cell)
+        food_ahead = food_distance < room or food_distance == 1
+        successor_code = engine.direction_code
+        best_code = None
+        best_estimate = None
+        for code in range(4):
+            cell = engine.neighbor(head, code)
+            if cell == NO_CELL:
+                continue
+            distance = (index_of(cell) - head_index) % length
+            if distance == 1:
+                successor_code = code
+            if food_ahead and 0 < distance <= food_distance and (distance < room or distance == 1):
+                estimate = self.estimate(cell, food)
+                if best_estimate is None or estimate < best_estimate:
+                    best_code, best_estimate = code, estimate
+        return successor_code if best_code is None else best_code
+
+    def search_along_cycle(self, head, head_index, room, food, index_of):
+        """A* from head to food that only moves forward along the cycle, inside the free stretch.
+
+        Returns the path's cells with the first step last, or None.
+        """
+        self.searches += 1
+        engine = self.engine
+        next_cells = engine.next_cells
+        length = self.cycle_length
+        n = self.n
+        wrapping = self.wrapping
+        food_y, food_x = divmod(food, n)
+        cost = {head: 0}
+        came_from = {}
+        frontier = [(self.estimate(head, food), 0, head)]
+        expanded = 0
+        while frontier:
+            _, steps, cell = heapq.heappop(frontier)
+            if cell == food:
+                return self.trace_path(came_from, head, food)
+            if steps > cost[cell]:
+                continue # Stale entry
+            expanded += 1
+            if expanded > SEARCH_BUDGET:
+                return None
+            cell_distance = (index_of(cell) - head_index) % length
+            steps += 1
+            for code in range(4):
+                if next_cells is not None:
+                    neighbor = next_cells[cell << 2 | code]
+                else:
+                    neighbor = engine.neighbor(cell, code)
+                if neighbor == NO_CELL or steps >= cost.get(neighbor, length):
+                    continue
+                if not cell_distance < (index_of(neighbor) - head_index) % length < room:
+                    continue
+                cost[neighbor] = steps
+                came_from[neighbor] = cell
+                # Manhattan estimate, inlined: this loop is the planner's hot path
+                y, x = divmod(neighbor, n)
+                dx, dy = abs(x - food_x), abs(y - food_y)
+                if wrapping:
+                    dx, dy = min(dx, n - dx), min(dy, n - dy)
+                heapq.heappush(frontier, (steps + HEURISTIC_WEIGHT * (dx + dy), steps, neighbor))
+        return None
+
+    def plan_free(self):
+        """Planning without a cycle: A* over free cells, then any free neighbor."""
+        engine = self.engine
+        head = engine.head_cell
+        food = engine.food_cell
+        if self.path_food != food:
+            self.path = []
+            self.path_food = food
+            self.next_search_tick = engine.ticks
+        if (not self.path and engine.ticks >= self.next_search_tick
+                and self.estimate(head, food) <= SEARCH_RADIUS):
+            self.path = self.search_free(head, food) or []
+            if not self.path:
+                self.next_search_tick = engine.ticks + SEARCH_RETRY_TICKS
+
+        if self.path:
+            cell = self.path.pop()
+            code = self.direction_to(cell)
+            if code is not None and not engine.occupancy[cell]:
+                return code
+            self.path = []
+
+        # The free neighbor closest to the food; the tail's cell is vacated as we move in
+        tail = engine.body_cell(0)
+        best_code = engine.direction_code
+        best_estimate = None
+        for code in range(4):
+            cell = engine.neighbor(head, code)
+            if cell == NO_CELL or (engine.occupancy[cell] and cell != tail):
+                continue
+            estimate = self.estimate(cell, food)
+            if best_estimate is None or estimate < best_estimate:
+                best_code, best_estimate = code, estimate
+        return best_code
+
+    def search_free(self, head, food):
+        """A* from head to food through currently free cells. Returns the path (first step last) or None."""
+        self.searches += 1
+        engine = self.engine
+        occupancy = engine.occupancy
+        cost = {head: 0}
+        came_from = {}
+        frontier = [(self.estimate(head, food), 0, head)]
+        expanded = 0
+        while frontier:
+            _, steps, cell = heapq.heappop(frontier)
+            if cell == food:
+                return self.trace_path(came_from, head, food)
+            if steps > cost[cell]:
+                continue
+            expanded += 1
+            if expanded > SEARCH_BUDGET:
+                return None
+            for code in range(4):
+                neighbor = engine.neighbor(cell, code)
+                if neighbor == NO_CELL or occupancy[neighbor]:
+                    continue
+                if steps + 1 < cost.get(neighbor, self.cell_count):
+                    cost[neighbor] = steps + 1
+                    came_from[neighbor] = cell
+                    heapq.heappush(frontier, (steps + 1 + HEURISTIC_WEIGHT * self.estimate(neighbor, food), steps + 1, neighbor))
+        return None
+
+    def trace_path(self, came_from, head, target):
+        path = []
+        cell = target
+        while cell != head:
+            path.append(cell)
+            cell = came_from[cell]
+        return path
+
+    def stats(self):
+        """Decision latency so far, in milliseconds."""
+        return {
+            "decisions": self.decisions,
+            "searches": self.searches,
+            "mean_ms": self.total_time / self.decisions * 1000 if self.decisions else 0.0,
+            "max_ms": self.max_time * 1000,
+        }
@@ -0,0 +1,211 @@
+"""Vectorized batch of snake games stepped in lockstep with NumPy.
+
+BatchSnakeEngine holds N boards as arrays (heads, ring-buffered bodies,
+occupancy, free-cell indexes, food, scores) and applies the SnakeEngine rules
+to all of them at once. Every game uses the same per-game seeded RNG and
+free-cell bookkeeping as SnakeEngine, so game i reset with seed s plays out
+exactly like SnakeEngine(seed=s) given the same actions.
+
+Requires NumPy (the rest of the game does not).
+"""
+import random
+
+import numpy as np
+
+from snake_engine import INITIAL_MAP_SIZE_N, DIRECTION_NAMES, DIRECTION_CODES, next_cell_table
+
+# Action codes are SnakeEngine's direction codes; -1 keeps the current direction
+ACTION_NAMES = DIRECTION_NAMES
+ACTION_CODES = DIRECTION_CODES
+NO_ACTION = -1
+
+OPPOSITE_ACTIONS = np.array([1, 0, 3, 2], dtype=np.int8)
+
+# Outcome codes for finished games
+OUTCOME_NONE = 0
+OUTCOME_WALL = 1
+OUTCOME_SELF = 2
+OUTCOME_WON = 3
+OUTCOME_NAMES = {OUTCOME_NONE: None, OUTCOME_WALL: "wall", OUTCOME_SELF: "self", OUTCOME_WON: "won"}
+
+
+class BatchSnakeEngine:
+    def __init__(self, num_envs, map_size_n=INITIAL_MAP_SIZE_N, screen_wrapping_enabled=True,
+                 seeds=None, auto_reset=True):
+        self.num_envs = num_envs
+        self.map_size_n = map_size_n
+        self.screen_wrapping_enabled = screen_wrapping_enabled
+        self.auto_reset = auto_reset
+
+        n_envs = num_envs
+        cells = map_size_n * map_size_n
+        self.cell_count = cells
+        # Cell ids fit in int16 up to 181x181 boards, which halves the memory of the big arrays
+        cell_dtype = np.int16 if cells < 2 ** 15 else np.int32
+        # cell * 4 + action -> next cell, -1 into a wall (shared with SnakeEngine)
+        self.next_cells = np.frombuffer(next_cell_table(map_size_n, screen_wrapping_enabled), dtype=np.int32)
+
+        # Per-game state. Bodies are ring buffers indexed by head_idx (the head) going backwards.
+        self.body = np.zeros((n_envs, cells), dtype=cell_dtype)
+        self.head_idx = np.zeros(n_envs, dtype=np.int64)
+        self.length = np.zeros(n_envs, dtype=np.int64)
+        self.head = np.zeros(n_envs, dtype=np.int64)
+        self.direction = np.zeros(n_envs, dtype=np.int8)
+        self.food = np.zeros(n_envs, dtype=np.int64)
+        self.score = np.zeros(n_envs, dtype=np.int64)
+        self.ticks = np.zeros(n_envs, dtype=np.int64)
+        self.done = np.zeros(n_envs, dtype=bool)
+        self.outcome = np.zeros(n_envs, dtype=np.int8)
+        self.occupancy = np.zeros((n_envs, cells), dtype=np.uint8)
+        self.free_cells = np.zeros((n_envs, cells), dtype=cell_dtype)
+        self.free_cell_pos = np.zeros((n_envs, cells), dtype=cell_dtype)
+        self.free_count = np.zeros(n_envs, dtype=np.int64)
+        self.rngs = [random.Random() for _ in range(n_envs)]
+
+        # Seeds; with auto_reset game i plays seeds[i], seeds[i] + num_envs, seeds[i] + 2 * num_envs, ...
+        self.seeds = np.zeros(n_envs, dtype=np.int64)
+        self.episodes = np.zeros(n_envs, dtype=np.int64)
+
+        # Results of the games that finished on the last step (valid where the step returned done)
+        self.final_score = np.zeros(n_envs, dtype=np.int64)
+        self.final_ticks = np.zeros(n_envs, dtype=np.int64)
+        self.final_outcome = np.zeros(n_envs, dtype=np.int8)
+
+        self.reset(seeds)
+
+    def reset(self, seeds=None):
+        """Restarts every game. seeds defaults to 0..num_envs-1."""
+        if seeds is None:
+            seeds = range(self.num_envs)
+        self.seeds[:] = np.asarray(list(seeds), dtype=np.int64)
+        self.episodes[:] = 0
+        for i in range(self.num_envs):
+            self.reset_env(i, int(self.seeds[i]))
+        return self
+
+    def reset_env(self, i, seed):
+        """Restarts game i with the given seed (mirrors SnakeEngine.reset)."""
+        n = self.map_size_n
+        self.rngs[i].seed(seed)
+        self.score[i] = 0
+        self.ticks[i] = 0
+        self.done[i] = False
+        self.outcome[i] = OUTCOME_NONE
+        self.direction[i] = ACTION_CODES["Right"]
+
+        self.occupancy[i] = 0
+        self.free_cells[i] = np.arange(self.cell_count)
+        self.free_cell_pos[i] = np.arange(self.cell_count)
+        self.free_count[i] = self.cell_count
+
+        mid = n // 2
+        self.length[i] = 0
+        self.head_idx[i] = -1
+        for x in (mid - 2, mid - 1, mid):
+            cell = mid * n + x
+            self.head_idx[i] += 1
+            self.body[i, self.head_idx[i]] = cell
+            self.length[i] += 1
+            self.occupancy[i, cell] += 1
+            if self.occupancy[i, cell] == 1:
+                self.take_free_cells(np.array([i]), np.array([cell]))
+        self.head[i] = mid * n + mid
+        self.create_food(i)
+
+    def take_free_cells(self, envs, cells):
+        """Swap-removes cells[k] from the free list of game envs[k] (one cell per game)."""
+        pos = self.free_cell_pos[envs, cells].astype(np.int64)
+        self.free_count[envs] -= 1
+        last = self.free_cells[envs, self.free_count[envs]]
+        self.free_cells[envs, pos] = last
+        self.free_cell_pos[envs, last] = pos
+        self.free_cell_pos[envs, cells] = -1
+
+    def release_free_cells(self, envs, cells):
+        """Appends cells[k] to the free list of game envs[k] (one cell per game)."""
+        self.free_cell_pos[envs, cells] = self.free_count[envs]
+        self.free_cells[envs, self.free_count[envs]] = cells
+        self.free_count[envs] += 1
+
+    def create_food(self, i):
+        count = int(self.free_count[i])
+        if count == 0:
+            self.done[i] = True
+            self.outcome[i] = OUTCOME_WON
+            return
+        self.food[i] = self.free_cells[i, self.rngs[i].randrange(count)]
+
+    def step(self, actions):
+        """Advances every game by one tick.
+
+        actions holds one action code per game (NO_ACTION keeps the heading).
+        Returns (ate, done) boolean arrays. Finished games are restarted
+        immediately when auto_reset is on; their results are in final_score,
+        final_ticks and final_outcome.
+        """
+        cells = self.cell_count
+        active = ~self.done
+        actions = np.asarray(actions, dtype=np.int8)
+
+        # Prevent 180-degree turns
+        valid = active & (actions >= 0) & (actions != OPPOSITE_ACTIONS[self.direction])
+        self.direction = np.where(valid, actions, self.direction)
+
+        next_heads = self.next_cells[self.head * 4 + self.direction]
+        wall = active & (next_heads < 0)
+        self.ticks[active] += 1
+
+        # Append the new heads
+        movers = np.nonzero(active & ~wall)[0]
+        new_heads = next_heads[movers].astype(np.int64)
+        self.head_idx[movers] = (self.head_idx[movers] + 1) % cells
+        self.body[movers, self.head_idx[movers]] = new_heads
+        self.length[movers] += 1
+        self.head[movers] = new_heads
+        previous = self.occupancy[movers, new_heads]
+        self.occupancy[movers, new_heads] = previous + 1
+        newly_occupied = previous == 0
+        self.take_free_cells(movers[newly_occupied], new_heads[newly_occupied])
+
+        # Food: eaters grow and get new food, everyone else drops their tail
+        ate_mask = new_heads == self.food[movers]
+        eaters = movers[ate_mask]
+        self.score[eaters] += 1
+        for i in eaters:
+            self.create_food(i)
+
+        shrinkers = movers[~ate_mask]
+        tail_idx = (self.head_idx[shrinkers] - self.length[shrinkers] + 1) % cells
+        tails = self.body[shrinkers, tail_idx].astype(np.int64)
+        self.length[shrinkers] -= 1
+        self.occupancy[shrinkers, tails] -= 1
+        vacated = self.occupancy[shrinkers, tails] == 0
+        self.release_free_cells(shrinkers[vacated], tails[vacated])
+
+        # Collisions
+        self_hit = np.zeros(self.num_envs, dtype=bool)
+        self_hit[movers] = self.occupancy[movers, new_heads] > 1
+        self_hit &= ~self.done # A board-filling move can't also be a self-collision
+        self.outcome[wall] = OUTCOME_WALL
+        self.outcome[self_hit] = OUTCOME_SELF
+        finished = active & (wall | self_hit | self.done)
+        self.done |= finished
+
+        ate = np.zeros(self.num_envs, dtype=bool)
+        ate[eaters] = True
+
+        finished_envs = np.nonzero(finished)[0]
+        self.final_score[finished_envs] = self.score[finished_envs]
+        self.final_ticks[finished_envs] = self.ticks[finished_envs]
+        self.final_outcome[finished_envs] = self.outcome[finished_envs]
+        if self.auto_reset:
+            for i in finished_envs:
+                self.episodes[i] += 1
+                self.reset_env(i, int(self.seeds[i] + self.episodes[i] * self.num_envs))
+        return ate, finished
+
+    def snake_cells(self, i):
+        """Cell ids of game i's snake, tail first (same order as SnakeEngine.snake_segments)."""
+        length = int(self.length[i])
+        idx = (self.head_idx[i] - np.arange(length - 1, -1, -1)) % self.cell_count
+        return self.body[i, idx].astype(np.int64)
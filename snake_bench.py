@@ -0,0 +1,320 @@
+"""Benchmarks for the game's hot paths.
+
+Drives SnakeEngine.move_snake, check_collisions and create_food, and
+SnakeGame.draw_grid, draw_game and the smooth movement frames drawn
+between ticks, through scripted scenarios: a range of map sizes, snake
+lengths from 3 to near board-full, wrapping on and off.
+Menu transitions (back to the menu, and from the menu into a running
+game's first frame) are timed once per run.
+The snake follows a fixed boustrophedon path, so every run does the same
+work. Each case is timed `--repeat` times and the best run is kept.
+
+Rendering needs a Tk display; on headless machines run it under a virtual
+one (xvfb-run python snake_bench.py). Without a display the render cases
+are skipped.
+
+    python snake_bench.py --out bench.json
+    python snake_bench.py --compare bench.json   # exits 1 on regressions
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from snake_engine import SnakeEngine
+from snake_timing import TickClock
+
+DEFAULT_MAP_SIZES = (10, 25, 50, 100)
+LENGTH_FRACTIONS = (0.1, 0.5, 0.9) # Besides the initial length of 3
+DEFAULT_THRESHOLD = 0.15 # Relative slowdown reported as a regression
+BENCH_SEED = 12345
+
+
+def boustrophedon_path(n):
+    """Every cell of an n x n board, row by row, alternating direction."""
+    path = []
+    for y in range(n):
+        xs = range(n) if y % 2 == 0 else range(n - 1, -1, -1)
+        path.extend((x, y) for x in xs)
+    return path
+
+
+def direction_between(a, b):
+    if b[0] > a[0]:
+        return "Right"
+    if b[0] < a[0]:
+        return "Left"
+    if b[1] > a[1]:
+        return "Down"
+    return "Up"
+
+
+def place_snake(engine, path, length):
+    """Lays a snake of the given length along the start of path (tail first)."""
+    engine.reset(BENCH_SEED)
+    engine.load_body([engine.cell_id(x, y) for x, y in path[:length]])
+    engine.direction = engine.new_direction = direction_between(path[length - 2], path[length - 1])
+    engine.create_food()
+
+
+def scenario_lengths(n):
+    cells = n * n
+    return sorted({3} | {max(3, int(cells * f)) for f in LENGTH_FRACTIONS})
+
+
+def bench_engine(n, wrapping, length, moves, repeat):
+    """Returns {"move_snake": s/op, "check_collisions": s/op, "create_food": s/op}."""
+    path = boustrophedon_path(n)
+    directions = [direction_between(a, b) for a, b in zip(path, path[1:])]
+    engine = SnakeEngine(n, wrapping, seed=BENCH_SEED)
+    results = {}
+
+    # move_snake: walk the snake along the path, re-laying it (untimed) when it reaches the end.
+    # The head only ever enters free cells ahead of it, so the snake never dies.
+    best = None
+    for _ in range(repeat):
+        elapsed = 0.0
+        done = 0
+        while done < moves:
+            place_snake(engine, path, length)
+            head_index = engine.length - 1
+            steps = min(moves - done, len(path) - 1 - head_index)
+            start = time.perf_counter()
+            for i in range(head_index, head_index + steps):
+                engine.change_direction(directions[i])
+                engine.move_snake()
+            elapsed += time.perf_counter() - start
+            done += steps
+        per_op = elapsed / moves
+        best = per_op if best is None else min(best, per_op)
+    results["move_snake"] = best
+
+    # check_collisions and create_food don't change the board, so time them in place
+    place_snake(engine, path, length)
+    for name, func in (("check_collisions", engine.check_collisions), ("create_food", engine.create_food)):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(moves):
+                func()
+            per_op = (time.perf_counter() - start) / moves
+            best = per_op if best is None else min(best, per_op)
+        results[name] = best
+    return results
+
+
+def make_render_game():
+    """Builds a SnakeGame on a real Tk root with the menu torn down, or None without a display.
+
+    Call it from an empty working directory: the game loads settings.json and opens the leaderboard there.
+    """
+    try:
+        import tkinter as tk
+        import snake
+        root = tk.Tk()
+    except Exception as e: # ImportError without Tk, TclError without a display
+        print(f"Info: Skipping render benchmarks, no Tk display available ({e})")
+        return None
+    game = snake.SnakeGame(root)
+    game.clear_menu_widgets()
+    game.menu_active = False
+    return game
+
+
+def bench_render(game, n, wrapping, length, frames, repeat):
+    """Returns s/op for draw_grid (rebuilt and cached), a full redraw and incremental draw_game."""
+    import snake
+    root = game.master
+    path = boustrophedon_path(n)
+    directions = [direction_between(a, b) for a, b in zip(path, path[1:])]
+
+    game.width = game.height = n * snake.SEGMENT_SIZE
+    game.canvas.config(width=game.width, height=game.height)
+    game.canvas.delete("all")
+    game.grid_size = None
+    game.grid_brightness = 50
+    game.engine = SnakeEngine(n, wrapping, seed=BENCH_SEED)
+    results = {}
+
+    def timed(setup, func, count):
+        best = None
+        for _ in range(repeat):
+            elapsed = 0.0
+            for _ in range(count):
+                setup()
+                start = time.perf_counter()
+                func()
+                root.update_idletasks() # Include Tk's own redraw work
+                elapsed += time.perf_counter() - start
+            per_op = elapsed / count
+            best = per_op if best is None else min(best, per_op)
+        return best
+
+    def invalidate_grid():
+        game.grid_size = None
+
+    results["draw_grid_rebuild"] = timed(invalidate_grid, game.draw_grid, max(1, frames // 20))
+    results["draw_grid_cached"] = timed(lambda: None, game.draw_grid, frames)
+
+    place_snake(game.engine, path, length)
+    results["draw_game_full"] = timed(lambda: None, game.redraw_game, max(1, frames // 20))
+
+    # Incremental frames: one engine move between draws (untimed), re-laying the snake at the path end
+    state = {"head_index": len(path)}
+
+    def advance():
+        if state["head_index"] >= len(path) - 1:
+            place_snake(game.engine, path, length)
+            game.redraw_game()
+            state["head_index"] = length - 1
+        game.engine.change_direction(directions[state["head_index"]])
+        game.engine.move_snake()
+        state["head_index"] += 1
+
+    results["draw_game_incremental"] = timed(advance, game.draw_game, frames)
+
+    # Smooth movement: one display-rate frame between ticks, each at a new tick fraction
+    game.tick_clock = TickClock(game.current_speed_ms)
+    game.tick_clock.start()
+    game.start_moving_items()
+    fraction = {"value": 0.0}
+
+    def next_fraction():
+        fraction["value"] = (fraction["value"] + 0.1) % 1.0
+
+    results["smooth_frame"] = timed(next_fraction, lambda: game.place_moving_items(fraction["value"]), frames)
+    return results
+
+
+def bench_menu(game, count, repeat):
+    """Returns s/op for show_menu and for start_game_from_menu up to the first rendered frame."""
+    import snake
+    root = game.master
+    game.save_settings = lambda: None # Keep every start on the same settings
+    # Default settings, spelled out so a change of defaults shows up as a change here
+    game.map_size_n = snake.INITIAL_MAP_SIZE_N
+    game.level_name = snake.NO_LEVEL
+    game.autopilot_enabled = False
+    game.smooth_movement_enabled = False
+    game.early_tick_enabled = False
+    results = {"menu_show": None, "menu_to_game": None}
+    for _ in range(repeat):
+        elapsed = dict.fromkeys(results, 0.0)
+        for _ in range(count):
+            for name, func in (("menu_show", game.show_menu), ("menu_to_game", game.start_game_from_menu)):
+                start = time.perf_counter()
+                func()
+                root.update_idletasks()
+                elapsed[name] += time.perf_counter() - start
+            root.after_cancel(game.game_loop_after_id) # Stop the game started above
+            if game.render_after_id is not None:
+                root.after_cancel(game.render_after_id)
+                game.render_after_id = None
+        for name in results:
+            per_op = elapsed[name] / count
+            results[name] = per_op if results[name] is None else min(results[name], per_op)
+    game.clear_menu_widgets()
+    game.menu_active = False
+    return results
+
+
+def run_benchmarks(map_sizes, moves, frames, repeat, render=True):
+    results = {}
+    # The game runs in an empty directory: the player's settings.json, levels and leaderboard
+    # neither change the results nor get created or migrated by a benchmark run
+    previous_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        game = None
+        try:
+            game = make_render_game() if render else None
+            if game is not None:
+                for name, value in bench_menu(game, max(1, frames // 20), repeat).items():
+                    results[f"render.{name}"] = value
+            for n in map_sizes:
+                for wrapping in (True, False):
+                    for length in scenario_lengths(n):
+                        scenario = f"n={n}/len={length}/wrap={'on' if wrapping else 'off'}"
+                        for name, value in bench_engine(n, wrapping, length, moves, repeat).items():
+                            results[f"engine.{name}/{scenario}"] = value
+                        if game is not None:
+                            for name, value in bench_render(game, n, wrapping, length, frames, repeat).items():
+                                results[f"render.{name}/{scenario}"] = value
+                        print(f"Info: {scenario} done", file=sys.stderr)
+        finally:
+            if game is not None:
+                game.master.destroy()
+                game.writer.flush() # Its leaderboard lives in directory
+            os.chdir(previous_directory)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "moves": moves,
+            "frames": frames,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Prints a comparison table and returns the names of the cases that regressed."""
+    regressions = []
+    for name in sorted(current["results"]):
+        new = current["results"][name]
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"{'new':>11}  {new * 1e6:10.3f} us  {name}")
+            continue
+        ratio = new / old if old else float("inf")
+        if ratio > 1 + threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            status = "improved"
+        else:
+            status = "ok"
+        print(f"{status:>11}  {old * 1e6:10.3f} -> {new * 1e6:10.3f} us ({ratio:5.2f}x)  {name}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the snake game's hot paths.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_MAP_SIZES)),
+                        help="Comma-separated map sizes")
+    parser.add_argument("--moves", type=int, default=20000, help="Engine operations timed per case")
+    parser.add_argument("--frames", type=int, default=200, help="Frames timed per render case")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the best is kept")
+    parser.add_argument("--no-render", action="store_true", help="Skip the Tk render cases")
+    parser.add_argument("--out", default=None, help="Write results as JSON here")
+    parser.add_argument("--compare", default=None, help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown that counts as a regression (default 0.15)")
+    args = parser.parse_args(argv)
+
+    map_sizes = [int(v) for v in args.sizes.split(",")]
+    report = run_benchmarks(map_sizes, args.moves, args.frames, args.repeat, render=not args.no_render)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=4)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            sys.exit(1)
+    else:
+        for name, value in sorted(report["results"].items()):
+            print(f"{value * 1e6:10.3f} us  {name}")
+
+
+if __name__ == "__main__":
+    main()
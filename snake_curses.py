@@ -0,0 +1,362 @@
+"""Terminal front end for machines without X (e.g. over SSH).
+
+Plays by the same rules as the Tk game: a SnakeEngine moved by a TickClock,
+with turns buffered in an InputQueue. The screen is drawn in full only
+when a game starts, the terminal is resized or the view has to scroll to
+follow the head. Every other tick writes just the cells that changed: the
+new head, the previous head (now body), the freed tail and the food when
+it moves, plus the status line when the score changes. The bytes sent per
+tick therefore do not depend on the board size.
+
+Each board cell is two terminal columns wide, so cells come out roughly
+square. Boards larger than the terminal scroll; the view recenters on the
+head when it gets within VIEW_MARGIN cells of an edge.
+
+    python snake_curses.py --size 25 --speed Fast
+    python snake_curses.py --size 200 --no-wrapping --color Blue
+    python snake_curses.py --level levels/maze.snkl
+"""
+import argparse
+import curses
+import sqlite3
+import sys
+
+from snake_engine import (SnakeEngine, INITIAL_MAP_SIZE_N, MIN_MAP_SIZE_N, MAX_HUGE_MAP_SIZE_N, DIRECTION_CODES,
+                          DEATH_SELF, DEATH_WALL)
+from snake_input import InputQueue
+from snake_level import Level, LevelError
+from snake_storage import BackgroundWriter, Leaderboard, LEADERBOARD_FILE, NO_LEVEL
+from snake_timing import TickClock, MOVE_SPEEDS
+
+CELL_WIDTH = 2 # Terminal columns per board cell
+VIEW_MARGIN = 3 # Cells kept between the head and the edge of a scrolling view
+STATUS_ROWS = 1
+
+# Nearest curses colors to SNAKE_COLOR_PALETTES in snake_style.py: (body/head, food)
+CURSES_COLOR_PALETTES = {
+    "Green": (curses.COLOR_GREEN, curses.COLOR_RED),
+    "Blue": (curses.COLOR_BLUE, curses.COLOR_RED),
+    "Purple": (curses.COLOR_MAGENTA, curses.COLOR_RED),
+    "Pink": (curses.COLOR_MAGENTA, curses.COLOR_RED),
+    "Red": (curses.COLOR_RED, curses.COLOR_GREEN),
+}
+BODY_PAIR = 1
+FOOD_PAIR = 2
+
+EMPTY_GLYPH = "  "
+BODY_GLYPH = "  " # Drawn reversed, so it shows as a solid block in the snake's color
+HEAD_GLYPH = "@@"
+FOOD_GLYPH = "()"
+WALL_GLYPH = "##"
+
+KEY_DIRECTIONS = {
+    curses.KEY_UP: "Up", curses.KEY_DOWN: "Down", curses.KEY_LEFT: "Left", curses.KEY_RIGHT: "Right",
+    ord("w"): "Up", ord("s"): "Down", ord("a"): "Left", ord("d"): "Right",
+    ord("W"): "Up", ord("S"): "Down", ord("A"): "Left", ord("D"): "Right",
+}
+
+
+class CursesSnakeGame:
+    def __init__(self, screen, map_size_n=INITIAL_MAP_SIZE_N, speed_name="Normal", screen_wrapping_enabled=True,
+                 color_name="Green", leaderboard=None, level=None):
+        self.screen = screen
+        if level is not None:
+            map_size_n = level.map_size_n
+        self.map_size_n = map_size_n
+        self.speed_name = speed_name
+        self.screen_wrapping_enabled = screen_wrapping_enabled
+        self.leaderboard = leaderboard
+        self.level = level
+        self.engine = SnakeEngine(map_size_n, screen_wrapping_enabled, level=level)
+        self.tick_clock = TickClock(MOVE_SPEEDS[speed_name])
+        self.input_queue = InputQueue()
+        self.board = None # Window holding the visible part of the board, inside a border
+        self.view_x = 0 # Board cell shown in the top left corner of the board window
+        self.view_y = 0
+        self.view_w = 0
+        self.view_h = 0
+        self.drawn_head = None # Cells as they are currently on screen
+        self.drawn_food = None
+        self.drawn_score = None
+        self.changes = [] # (new head, freed tail or NO_CELL) per move since the last render
+        self.game_over_flag = False
+        self.game_over_message = None # Status line shown until the next game
+
+        self.body_attr = curses.A_REVERSE
+        self.head_attr = curses.A_REVERSE | curses.A_BOLD
+        self.food_attr = curses.A_BOLD
+        if curses.has_colors():
+            curses.start_color()
+            curses.use_default_colors()
+            body_color, food_color = CURSES_COLOR_PALETTES[color_name]
+            curses.init_pair(BODY_PAIR, body_color, -1)
+            curses.init_pair(FOOD_PAIR, food_color, -1)
+            self.body_attr |= curses.color_pair(BODY_PAIR)
+            self.head_attr |= curses.color_pair(BODY_PAIR)
+            self.food_attr |= curses.color_pair(FOOD_PAIR)
+        try:
+            curses.curs_set(0)
+        except curses.error:
+            pass # Some terminals cannot hide the cursor
+        self.screen.keypad(True)
+
+    def start_game(self):
+        self.engine.reset()
+        self.input_queue.clear()
+        self.input_queue.reset_stats()
+        self.changes.clear()
+        self.game_over_flag = False
+        self.game_over_message = None
+        self.tick_clock.start()
+        self.layout()
+
+    def layout(self):
+        """Sizes the board window to the terminal and redraws everything."""
+        lines, cols = self.screen.getmaxyx()
+        self.view_w = max(1, min(self.map_size_n, (cols - 2) // CELL_WIDTH))
+        self.view_h = max(1, min(self.map_size_n, lines - 2 - STATUS_ROWS))
+        self.screen.erase()
+        self.screen.noutrefresh()
+        try:
+            frame = curses.newwin(self.view_h + 2, self.view_w * CELL_WIDTH + 2, STATUS_ROWS, 0)
+        except curses.error:
+            self.board = None # Terminal too small to show anything
+            return
+        frame.box()
+        frame.noutrefresh()
+        self.board = frame.derwin(self.view_h, self.view_w * CELL_WIDTH, 1, 1)
+        self.center_view()
+        self.redraw_board()
+        self.drawn_score = None
+        self.draw_status(self.game_over_message)
+        curses.doupdate()
+
+    def center_view(self):
+        x, y = self.engine.cell_coords(self.engine.head_cell)
+        n = self.map_size_n
+        self.view_x = min(max(0, x - self.view_w // 2), n - self.view_w)
+        self.view_y = min(max(0, y - self.view_h // 2), n - self.view_h)
+
+    def head_near_edge(self):
+        """True when the head is off screen or within VIEW_MARGIN cells of an edge the view can still scroll past."""
+        x, y = self.engine.cell_coords(self.engine.head_cell)
+        n = self.map_size_n
+        margin_x = min(VIEW_MARGIN, (self.view_w - 1) // 2)
+        margin_y = min(VIEW_MARGIN, (self.view_h - 1) // 2)
+        if self.view_w < n and (x < self.view_x + margin_x and self.view_x > 0
+                                or x >= self.view_x + self.view_w - margin_x and self.view_x + self.view_w < n
+                                or not self.view_x <= x < self.view_x + self.view_w):
+            return True
+        if self.view_h < n and (y < self.view_y + margin_y and self.view_y > 0
+                                or y >= self.view_y + self.view_h - margin_y and self.view_y + self.view_h < n
+                                or not self.view_y <= y < self.view_y + self.view_h):
+            return True
+        return False
+
+    def put_cell(self, cell, glyph, attr):
+        """Writes one board cell if it is inside the view."""
+        x, y = self.engine.cell_coords(cell)
+        x -= self.view_x
+        y -= self.view_y
+        if 0 <= x < self.view_w and 0 <= y < self.view_h:
+            try:
+                self.board.addstr(y, x * CELL_WIDTH, glyph, attr)
+            except curses.error:
+                pass # Writing the bottom right cell moves the cursor off the window
+
+    def redraw_board(self):
+        """Draws the whole view, a row at a time in runs of cells that look the same."""
+        engine = self.engine
+        occupancy = engine.occupancy
+        n = self.map_size_n
+        head = engine.head_cell
+        food = engine.food_cell
+        is_wall = engine.is_wall
+        self.board.erase()
+        for row in range(self.view_h):
+            first = (self.view_y + row) * n + self.view_x
+            column = 0
+            while column < self.view_w:
+                cell = first + column
+                if cell == head:
+                    glyph, attr = HEAD_GLYPH, self.head_attr
+                elif occupancy[cell]:
+                    glyph, attr = BODY_GLYPH, self.body_attr
+                elif cell == food:
+                    glyph, attr = FOOD_GLYPH, self.food_attr
+                elif is_wall(cell):
+                    glyph, attr = WALL_GLYPH, 0
+                else:
+                    column += 1
+                    continue # Left blank by erase()
+                run = 1
+                if glyph is BODY_GLYPH:
+                    while (column + run < self.view_w and occupancy[cell + run] and cell + run != head):
+                        run += 1
+                elif glyph is WALL_GLYPH:
+                    while column + run < self.view_w and is_wall(cell + run):
+                        run += 1
+                try:
+                    self.board.addstr(row, column * CELL_WIDTH, glyph * run, attr)
+                except curses.error:
+                    pass
+                column += run
+        self.board.noutrefresh()
+        self.drawn_head = head
+        self.drawn_food = food
+        self.changes.clear()
+
+    def draw_changes(self):
+        """Writes only the cells changed by the moves since the last render."""
+        if self.board is None:
+            return
+        if self.head_near_edge():
+            self.center_view()
+            self.redraw_board()
+            return
+        engine = self.engine
+        for head, tail in self.changes:
+            if self.drawn_head is not None and engine.occupancy[self.drawn_head]:
+                self.put_cell(self.drawn_head, BODY_GLYPH, self.body_attr)
+            if tail >= 0 and not engine.occupancy[tail]:
+                self.put_cell(tail, EMPTY_GLYPH, 0)
+            self.put_cell(head, HEAD_GLYPH, self.head_attr)
+            self.drawn_head = head
+        self.changes.clear()
+        if engine.food_cell != self.drawn_food and not engine.won:
+            self.put_cell(engine.food_cell, FOOD_GLYPH, self.food_attr)
+            self.drawn_food = engine.food_cell
+        self.board.noutrefresh()
+
+    def draw_status(self, message=None):
+        score = self.engine.score
+        if message is None and score == self.drawn_score:
+            return
+        self.drawn_score = score
+        board = f"{self.level.name} " if self.level is not None else ""
+        text = message or f" Score: {score}   {board}{self.map_size_n}x{self.map_size_n} {self.speed_name}   q: quit"
+        cols = self.screen.getmaxyx()[1]
+        try:
+            self.screen.addstr(0, 0, text[:cols - 1].ljust(cols - 1), curses.A_BOLD)
+        except curses.error:
+            pass
+        self.screen.noutrefresh()
+
+    def tick(self):
+        turn = self.input_queue.pop()
+        if turn is not None:
+            self.engine.change_direction_code(turn)
+        previous_moves = self.engine.moves
+        self.engine.move_snake()
+        if self.engine.moves != previous_moves:
+            self.changes.append((self.engine.head_cell, self.engine.freed_tail_cell))
+        if self.engine.check_collisions():
+            self.engine.game_over_flag = True
+            self.engine.death_cause = DEATH_SELF
+        if self.engine.game_over_flag:
+            self.game_over_flag = True
+
+    def change_direction(self, name):
+        if not self.game_over_flag:
+            self.input_queue.push(DIRECTION_CODES[name], self.engine.direction_code)
+
+    def game_over(self):
+        """Records the finished run and shows how it ended."""
+        score = self.engine.score
+        board_best = score
+        if self.leaderboard is not None:
+            level_name = self.level.name if self.level is not None else NO_LEVEL
+            # Queried before the run is written, hence the max()
+            board_best = max(score, self.leaderboard.best_score(self.map_size_n, self.speed_name,
+                                                                     self.screen_wrapping_enabled, level_name))
+            self.leaderboard.record_run(self.map_size_n, self.speed_name, self.screen_wrapping_enabled,
+                                        score, self.engine.ticks, self.engine.seed, level_name)
+        if self.engine.won:
+            reason = "Board full, you win!"
+        elif self.engine.death_cause == DEATH_WALL:
+            reason = "Hit the wall."
+        else:
+            reason = "Ran into yourself."
+        self.game_over_message = f" {reason} Score: {score} (best on this board: {board_best})   r: restart, q: quit"
+        self.draw_status(self.game_over_message)
+        curses.doupdate()
+
+    def run(self):
+        """Plays until the player quits."""
+        self.start_game()
+        while True:
+            if self.game_over_flag:
+                self.screen.timeout(-1)
+            else:
+                self.screen.timeout(self.tick_clock.delay_ms())
+            key = self.screen.getch()
+            if key in (ord("q"), ord("Q")):
+                return
+            if key == curses.KEY_RESIZE:
+                curses.update_lines_cols()
+                self.layout()
+            elif key in KEY_DIRECTIONS:
+                self.change_direction(KEY_DIRECTIONS[key])
+            elif key in (ord("r"), ord("R")) and self.game_over_flag:
+                self.start_game()
+                continue
+
+            if self.game_over_flag:
+                continue
+            due_ticks = self.tick_clock.due_ticks()
+            if not due_ticks:
+                continue
+            for _ in range(due_ticks):
+                self.tick()
+                if self.game_over_flag:
+                    break
+            # Rendered once for all the ticks run, like the Tk game loop
+            self.draw_changes()
+            self.draw_status()
+            curses.doupdate()
+            self.input_queue.frame_shown()
+            if self.game_over_flag:
+                self.game_over()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play snake in a terminal.")
+    parser.add_argument("--size", type=int, default=INITIAL_MAP_SIZE_N,
+                        help=f"board size in cells, {MIN_MAP_SIZE_N}-{MAX_HUGE_MAP_SIZE_N}")
+    parser.add_argument("--speed", choices=list(MOVE_SPEEDS), default="Normal")
+    parser.add_argument("--no-wrapping", action="store_true", help="walls at the board edges")
+    parser.add_argument("--color", choices=list(CURSES_COLOR_PALETTES), default="Green")
+    parser.add_argument("--leaderboard", default=LEADERBOARD_FILE, help="SQLite leaderboard shared with the Tk game")
+    parser.add_argument("--level", help="level file to play on (sets the size)")
+    args = parser.parse_args(argv)
+    if not MIN_MAP_SIZE_N <= args.size <= MAX_HUGE_MAP_SIZE_N:
+        parser.error(f"--size must be between {MIN_MAP_SIZE_N} and {MAX_HUGE_MAP_SIZE_N}")
+    level = None
+    if args.level is not None:
+        try:
+            level = Level.open(args.level)
+        except (LevelError, OSError) as e:
+            print(f"Warning: {e}")
+            return 1
+
+    writer = BackgroundWriter()
+    try:
+        leaderboard = Leaderboard(args.leaderboard, writer)
+    except sqlite3.Error as e:
+        print(f"Warning: Could not open leaderboard {args.leaderboard}, scores won't be kept ({e})")
+        leaderboard = None
+
+    def play(screen):
+        game = CursesSnakeGame(screen, args.size, args.speed, not args.no_wrapping, args.color, leaderboard, level)
+        game.run()
+        return game
+
+    game = curses.wrapper(play)
+    writer.close()
+    stats = game.tick_clock.stats()
+    print(f"Info: {stats['ticks']} ticks at {stats['achieved_ms']:.2f} ms/tick (target {stats['target_ms']:.0f} ms), "
+          f"{stats['ticks_dropped']} ticks dropped")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,506 @@
+"""Tk-free snake simulation core.
+
+SnakeEngine owns the board state and the game rules. SnakeGame in snake.py is
+only a view over it, so games can be stepped headless (CI, servers, agents).
+All coordinates in this module are grid cells, not pixels.
+
+Internally a cell is a single integer id, y * map_size_n + x. The snake is a
+ring buffer of cell ids in a preallocated array, and the occupancy counts and
+free-cell index are flat arrays too, so a move allocates nothing and a
+near-full 1000x1000 board takes a few megabytes. (x, y) tuples are only
+built for callers that ask for them (snake_segments, food_coords).
+
+Search agents can explore ahead with make_move() / unmake_move() (or
+snapshot() / restore()), which log only what each move touched instead
+of copying the board.
+
+Directions are integer codes internally, and on boards up to
+NEXT_CELL_TABLE_MAX_CELLS a move is a single lookup in a precomputed
+next-cell table (see next_cell_table).
+
+An engine built with a level (see snake_level.py) also has walls inside
+the board. They are a bitmap with one bit per cell, tested once per move,
+and never enter the free-cell index, so food placement is unchanged.
+"""
+import random
+from array import array
+from functools import lru_cache
+
+# Board Constants
+INITIAL_MAP_SIZE_N = 25 # Default number of segments for width and height
+MIN_MAP_SIZE_N = 10
+MAX_MAP_SIZE_N = 50 # Largest board shown whole; bigger ones scroll (see snake.py)
+MAX_HUGE_MAP_SIZE_N = 4096
+
+# Direction name -> (dx, dy) in cells
+DIRECTION_VECTORS = {
+    "Up": (0, -1),
+    "Down": (0, 1),
+    "Left": (-1, 0),
+    "Right": (1, 0),
+}
+
+# Direction codes index DIRECTION_NAMES. Opposites differ only in the low bit (code ^ 1).
+DIRECTION_NAMES = ("Up", "Down", "Left", "Right")
+DIRECTION_CODES = {name: code for code, name in enumerate(DIRECTION_NAMES)}
+UP, DOWN, LEFT, RIGHT = range(4)
+
+# Causes of a finished game (death_cause stays None when the snake fills the board)
+DEATH_WALL = "wall"
+DEATH_SELF = "self"
+
+NO_CELL = -1
+
+# Larger boards compute moves arithmetically instead (a table takes 16 bytes per cell)
+NEXT_CELL_TABLE_MAX_CELLS = 512 * 512
+
+
+def cell_typecode(cell_count):
+    """Smallest unsigned array type that holds any cell id or count of a board."""
+    return "H" if cell_count <= 0xFFFF else "I"
+
+
+def cell_array(cell_count):
+    """Zeroed array with one slot per cell, of type cell_typecode(cell_count)."""
+    typecode = cell_typecode(cell_count)
+    return array(typecode, bytes(array(typecode).itemsize * cell_count))
+
+
+@lru_cache(maxsize=8)
+def next_cell_table(map_size_n, screen_wrapping_enabled):
+    """Flat array mapping cell << 2 | direction code to the cell entered, or NO_CELL into a wall.
+
+    Tables are read-only and shared by every engine with the same board settings.
+    """
+    n = map_size_n
+    table = array("i", bytes(16 * n * n))
+    for code, name in enumerate(DIRECTION_NAMES):
+        dx, dy = DIRECTION_VECTORS[name]
+        if screen_wrapping_enabled:
+            column = [((y + dy) % n) * n + (x + dx) % n for y in range(n) for x in range(n)]
+        else:
+            column = [(y + dy) * n + x + dx if 0 <= x + dx < n and 0 <= y + dy < n else NO_CELL
+                      for y in range(n) for x in range(n)]
+        table[code::4] = array("i", column)
+    return table
+
+
+class SnakeBody:
+    """Read-only sequence view of the snake as (x, y) cells, tail first.
+
+    Supports len(), iteration and indexing (including negative indexes) like
+    the list of tuples views used to get, without storing any tuples.
+    """
+    __slots__ = ("engine",)
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __len__(self):
+        return self.engine.length
+
+    def __getitem__(self, index):
+        engine = self.engine
+        if index < 0:
+            index += engine.length
+        if not 0 <= index < engine.length:
+            raise IndexError("snake segment index out of range")
+        return engine.cell_coords(engine.body_cell(index))
+
+    def __iter__(self):
+        engine = self.engine
+        for i in range(engine.length):
+            yield engine.cell_coords(engine.body_cell(i))
+
+
+class SnakeEngine:
+    __slots__ = (
+        "map_size_n", "screen_wrapping_enabled", "rng", "seed",
+        "cell_count", "body", "head_index", "length", "occupancy",
+        "free_cells", "free_cell_pos", "free_count",
+        "food_cell", "freed_tail_cell", "direction_code", "new_direction_code", "next_cells",
+        "score", "ticks", "moves", "game_over_flag", "death_cause", "won", "undo_log",
+        "level", "walls",
+    )
+
+    def __init__(self, map_size_n=INITIAL_MAP_SIZE_N, screen_wrapping_enabled=True, seed=None, level=None):
+        if level is not None and level.map_size_n != map_size_n:
+            raise ValueError(f"Level is {level.map_size_n} cells wide, not {map_size_n}")
+        self.map_size_n = map_size_n
+        self.screen_wrapping_enabled = screen_wrapping_enabled
+        self.rng = random.Random()
+        self.level = level
+        self.walls = level.walls if level is not None else None # Wall bitmap: bit cell & 7 of byte cell >> 3
+
+        # Preallocated board storage, reused by every reset()
+        self.cell_count = map_size_n * map_size_n
+        self.body = cell_array(self.cell_count) # Ring buffer of cell ids, head at head_index
+        self.occupancy = bytearray(self.cell_count) # Snake segments per cell
+        self.free_cells = cell_array(self.cell_count) # The first free_count entries are the free cells
+        self.free_cell_pos = cell_array(self.cell_count) # Cell id -> index in free_cells (while free)
+        if self.cell_count <= NEXT_CELL_TABLE_MAX_CELLS:
+            self.next_cells = next_cell_table(map_size_n, screen_wrapping_enabled)
+        else:
+            self.next_cells = None
+
+        # Game state variables, (re)initialized by reset()
+        self.head_index = 0
+        self.length = 0
+        self.free_count = 0
+        self.food_cell = 0
+        self.freed_tail_cell = NO_CELL # Cell vacated by the last move (NO_CELL if the snake grew)
+        self.direction_code = RIGHT
+        self.new_direction_code = RIGHT
+        self.score = 0
+        self.ticks = 0
+        self.moves = 0 # Heads appended so far; lets views find what changed since they last looked
+        self.game_over_flag = False
+        self.death_cause = None
+        self.won = False
+        self.seed = None
+        self.undo_log = [] # One record per make_move() not yet taken back
+
+        self.reset(seed)
+
+    def cell_coords(self, cell):
+        y, x = divmod(cell, self.map_size_n)
+        return x, y
+
+    def cell_id(self, x, y):
+        return y * self.map_size_n + x
+
+    def is_wall(self, cell):
+        return self.walls is not None and self.walls[cell >> 3] >> (cell & 7) & 1 == 1
+
+    def body_cell(self, index):
+        """Cell id of segment index, counted from the tail."""
+        return self.body[(self.head_index - self.length + 1 + index) % self.cell_count]
+
+    def body_cells(self):
+        """Cell ids of the snake, tail first."""
+        return [self.body_cell(i) for i in range(self.length)]
+
+    @property
+    def direction(self):
+        return DIRECTION_NAMES[self.direction_code]
+
+    @direction.setter
+    def direction(self, name):
+        self.direction_code = DIRECTION_CODES[name]
+
+    @property
+    def new_direction(self):
+        return DIRECTION_NAMES[self.new_direction_code]
+
+    @new_direction.setter
+    def new_direction(self, name):
+        self.new_direction_code = DIRECTION_CODES[name]
+
+    @property
+    def snake_segments(self):
+        return SnakeBody(self)
+
+    @property
+    def head_cell(self):
+        return self.body[self.head_index]
+
+    @property
+    def food_coords(self):
+        return self.cell_coords(self.food_cell)
+
+    @property
+    def freed_tail(self):
+        if self.freed_tail_cell == NO_CELL:
+            return None
+        return self.cell_coords(self.freed_tail_cell)
+
+    def reset(self, seed=None):
+        """Starts a new game. The same seed always yields the same food sequence.
+
+        Without a seed a fresh one is drawn, so every game can be replayed from self.seed.
+        """
+        if seed is None:
+            seed = random.getrandbits(63)
+        self.seed = seed
+        self.rng.seed(seed)
+        self.score = 0
+        self.ticks = 0
+        self.moves = 0
+        self.freed_tail_cell = NO_CELL
+        self.game_over_flag = False
+        self.death_cause = None
+        self.won = False
+        self.direction_code = RIGHT
+        self.new_direction_code = RIGHT
+
+        if self.level is not None:
+            start = self.level.start_cell
+        else:
+            mid = self.map_size_n // 2
+            start = self.cell_id(mid, mid)
+        self.load_body([start - 2, start - 1, start])
+        self.create_food()
+        return self
+
+    def load_body(self, cells):
+        """Replaces the snake with cell ids (tail first) and rebuilds occupancy and the free-cell index."""
+        self.occupancy[:] = bytes(self.cell_count)
+        if self.level is not None:
+            # Walls are left out of the free list, so food never lands on one
+            free_cells, free_cell_pos, self.free_count = self.level.free_cell_index()
+            self.free_cells[:] = free_cells
+            self.free_cell_pos[:] = free_cell_pos
+        else:
+            self.free_cells[:] = array(self.free_cells.typecode, range(self.cell_count))
+            self.free_cell_pos[:] = array(self.free_cell_pos.typecode, range(self.cell_count))
+            self.free_count = self.cell_count
+        self.length = 0
+        self.head_index = self.cell_count - 1
+        self.undo_log.clear()
+        for cell in cells:
+            self.head_index = (self.head_index + 1) % self.cell_count
+            self.body[self.head_index] = cell
+            self.length += 1
+            self.occupy_cell(cell)
+
+    def step(self, action=None):
+        """Advances the game by one tick. action is an optional direction name.
+
+        Returns True once the game is over.
+        """
+        if self.game_over_flag:
+            return True
+        if action is not None:
+            self.change_direction(action)
+
+        self.move_snake()
+
+        if not self.game_over_flag and self.check_collisions():
+            self.game_over_flag = True
+            self.death_cause = DEATH_SELF
+        return self.game_over_flag
+
+    def occupy_cell(self, cell):
+        self.occupancy[cell] += 1
+        if self.occupancy[cell] == 1:
+            # Swap-remove the cell from the free list
+            pos = self.free_cell_pos[cell]
+            self.free_count -= 1
+            last = self.free_cells[self.free_count]
+            if last != cell:
+                self.free_cells[pos] = last
+                self.free_cell_pos[last] = pos
+
+    def vacate_cell(self, cell):
+        self.occupancy[cell] -= 1
+        if self.occupancy[cell] == 0:
+            self.free_cells[self.free_count] = cell
+            self.free_cell_pos[cell] = self.free_count
+            self.free_count += 1
+
+    def create_food(self):
+        """Places food on a uniformly random free cell.
+
+        When the snake covers the whole board there is nowhere left to put it;
+        the game is then over and won.
+        """
+        if not self.free_count:
+            self.game_over_flag = True
+            self.won = True
+            return
+        self.food_cell = self.free_cells[self.rng.randrange(self.free_count)]
+
+    def neighbor(self, cell, code):
+        """Returns the cell entered moving from cell in direction code, or NO_CELL for a wall."""
+        if self.next_cells is not None:
+            cell = self.next_cells[cell << 2 | code]
+        else:
+            n = self.map_size_n
+            y, x = divmod(cell, n)
+            dx, dy = DIRECTION_VECTORS[DIRECTION_NAMES[code]]
+            new_x, new_y = x + dx, y + dy
+
+            if self.screen_wrapping_enabled:
+                cell = (new_y % n) * n + new_x % n
+            elif 0 <= new_x < n and 0 <= new_y < n:
+                cell = new_y * n + new_x
+            else:
+                return NO_CELL
+        walls = self.walls
+        if walls is not None and cell != NO_CELL and walls[cell >> 3] >> (cell & 7) & 1:
+            return NO_CELL
+        return cell
+
+    def next_cell_id(self, code):
+        """Returns the cell id the head would enter moving in direction code, or NO_CELL for a wall."""
+        return self.neighbor(self.body[self.head_index], code)
+
+    def next_cell(self, direction):
+        """Returns the (x, y) cell the head would enter moving in direction, or None for a wall."""
+        cell = self.next_cell_id(DIRECTION_CODES[direction])
+        if cell == NO_CELL:
+            return None
+        return self.cell_coords(cell)
+
+    def move_snake(self):
+        # Update direction based on last valid key press
+        self.direction_code = self.new_direction_code
+        self.ticks += 1
+
+        next_cells = self.next_cells
+        if next_cells is not None:
+            new_head = next_cells[self.body[self.head_index] << 2 | self.direction_code]
+            walls = self.walls
+            if walls is not None and new_head != NO_CELL and walls[new_head >> 3] >> (new_head & 7) & 1:
+                new_head = NO_CELL
+        else:
+            new_head = self.next_cell_id(self.direction_code) # neighbor() tests level walls itself
+        if new_head == NO_CELL:
+            # Game over due to wall collision, no need to add segment or check food
+            self.game_over_flag = True
+            self.death_cause = DEATH_WALL
+            return
+
+        self.head_index = (self.head_index + 1) % self.cell_count
+        self.body[self.head_index] = new_head
+        self.length += 1
+        self.occupy_cell(new_head)
+        self.moves += 1
+
+        # Check if snake ate food
+        if new_head == self.food_cell:
+            self.score += 1
+            self.freed_tail_cell = NO_CELL
+            self.create_food()
+        else:
+            # Remove tail if no food eaten
+            tail = self.body[(self.head_index - self.length + 1) % self.cell_count]
+            self.length -= 1
+            self.freed_tail_cell = tail
+            self.vacate_cell(tail)
+
+    def check_collisions(self):
+        # Wall collision (board edge without wrapping, or a level wall) is handled in move_snake.
+        # This method checks for self-collision: the head shares its cell with another segment.
+        return self.occupancy[self.body[self.head_index]] > 1
+
+    def change_direction(self, new_dir):
+        code = DIRECTION_CODES.get(new_dir)
+        if code is not None:
+            self.change_direction_code(code)
+
+    def change_direction_code(self, code):
+        # Prevent 180-degree turns
+        if code ^ 1 != self.direction_code:
+            self.new_direction_code = code
+
+    def make_move(self, code=None, next_food=None):
+        """Like step(), but can be taken back with unmake_move(). code is an optional direction code.
+
+        When the move eats, the new food goes on next_food if given (e.g. to
+        enumerate spawns in a search) instead of being drawn from the RNG.
+        Only the cells the move touches are logged, so both directions are O(1).
+        Returns True once the game is over.
+        """
+        if self.game_over_flag:
+            self.undo_log.append(None)
+            return True
+        previous = (self.direction_code, self.new_direction_code, self.ticks, self.moves, self.score,
+                    self.head_index, self.length, self.free_count, self.food_cell, self.freed_tail_cell)
+        if code is not None:
+            self.change_direction_code(code)
+        self.direction_code = self.new_direction_code
+        self.ticks += 1
+
+        if self.next_cells is not None:
+            new_head = self.next_cells[self.body[self.head_index] << 2 | self.direction_code]
+            walls = self.walls
+            if walls is not None and new_head != NO_CELL and walls[new_head >> 3] >> (new_head & 7) & 1:
+                new_head = NO_CELL
+        else:
+            new_head = self.next_cell_id(self.direction_code)
+        if new_head == NO_CELL:
+            self.game_over_flag = True
+            self.death_cause = DEATH_WALL
+            self.undo_log.append((previous, NO_CELL, 0, NO_CELL, 0, 0, None))
+            return True
+
+        self.head_index = (self.head_index + 1) % self.cell_count
+        overwritten = self.body[self.head_index]
+        self.body[self.head_index] = new_head
+        self.length += 1
+        self.occupy_cell(new_head)
+        self.moves += 1
+
+        rng_state = None
+        tail = NO_CELL
+        tail_slot = tail_pos = 0
+        if new_head == self.food_cell:
+            self.score += 1
+            self.freed_tail_cell = NO_CELL
+            if next_food is not None:
+                self.food_cell = next_food
+            else:
+                rng_state = self.rng.getstate()
+                self.create_food()
+        else:
+            tail = self.body[(self.head_index - self.length + 1) % self.cell_count]
+            # vacate_cell may overwrite these; unmake_move puts them back
+            if self.free_count < self.cell_count:
+                tail_slot = self.free_cells[self.free_count]
+            tail_pos = self.free_cell_pos[tail]
+            self.length -= 1
+            self.freed_tail_cell = tail
+            self.vacate_cell(tail)
+
+        if not self.game_over_flag and self.occupancy[new_head] > 1:
+            self.game_over_flag = True
+            self.death_cause = DEATH_SELF
+        self.undo_log.append((previous, new_head, overwritten, tail, tail_slot, tail_pos, rng_state))
+        return self.game_over_flag
+
+    def unmake_move(self):
+        """Takes back the last make_move()."""
+        record = self.undo_log.pop()
+        if record is None:
+            return
+        previous, new_head, overwritten, tail, tail_slot, tail_pos, rng_state = record
+        (self.direction_code, self.new_direction_code, self.ticks, self.moves, self.score,
+         head_index, length, free_count, self.food_cell, self.freed_tail_cell) = previous
+        self.game_over_flag = False
+        self.death_cause = None
+        self.won = False
+        if rng_state is not None:
+            self.rng.setstate(rng_state)
+
+        if new_head != NO_CELL:
+            if tail != NO_CELL:
+                # Undo vacate_cell(tail)
+                self.occupancy[tail] += 1
+                if self.occupancy[tail] == 1:
+                    self.free_count -= 1
+                    self.free_cells[self.free_count] = tail_slot
+                    self.free_cell_pos[tail] = tail_pos
+            # Undo occupy_cell(new_head): free_cell_pos[new_head] still holds its old slot,
+            # and the swapped-in cell's old slot (free_count) still holds that cell
+            self.occupancy[new_head] -= 1
+            if self.occupancy[new_head] == 0:
+                pos = self.free_cell_pos[new_head]
+                last = self.free_cells[self.free_count]
+                if last != new_head:
+                    self.free_cells[pos] = new_head
+                    self.free_cell_pos[last] = self.free_count
+                self.free_count += 1
+            self.body[self.head_index] = overwritten
+        self.head_index = head_index
+        self.length = length
+        self.free_count = free_count
+
+    def snapshot(self):
+        """Marks the current state for restore(). O(1): it is a position in the undo log."""
+        return len(self.undo_log)
+
+    def restore(self, mark):
+        """Takes back every make_move() since snapshot() returned mark."""
+        while len(self.undo_log) > mark:
+            self.unmake_move()
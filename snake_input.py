@@ -0,0 +1,81 @@
+"""Buffered, timestamped direction input for the front ends.
+
+Key presses are queued instead of overwriting the next direction, and the
+game loop applies one queued turn per tick, in order. Two quick turns
+within one tick (Up then Left to double back along the next row) then
+both happen, on consecutive ticks, instead of the first one being lost.
+
+Each turn is validated against the one queued before it, not only the
+snake's current direction. Repeats and reversals are dropped when the
+key is pressed, so they never take up a tick. The queue is bounded, so
+mashing keys cannot build up a backlog of stale turns.
+
+Every press is timestamped. When the frame showing a turn has been drawn,
+frame_shown() records the key-to-screen latency.
+"""
+import time
+from collections import deque
+
+INPUT_QUEUE_SIZE = 3 # Turns buffered ahead of the snake; further presses are dropped
+
+
+class InputQueue:
+    def __init__(self, size=INPUT_QUEUE_SIZE, clock=time.perf_counter):
+        self.size = size
+        self.clock = clock
+        self.pending = deque() # (direction code, press time), oldest first
+        self.applied = [] # Press times of turns applied since the last frame_shown()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.presses = 0
+        self.dropped = 0 # Presses rejected: repeats, reversals or a full queue
+        self.shown = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def clear(self):
+        self.pending.clear()
+        self.applied.clear()
+
+    def push(self, code, current_code):
+        """Queues a turn. current_code is the snake's direction. Returns False if the turn was dropped."""
+        self.presses += 1
+        previous = self.pending[-1][0] if self.pending else current_code
+        # Prevent repeats and 180-degree turns relative to the turn before this one
+        if code == previous or code ^ 1 == previous or len(self.pending) >= self.size:
+            self.dropped += 1
+            return False
+        self.pending.append((code, self.clock()))
+        return True
+
+    def pop(self):
+        """Returns the direction code to apply this tick, or None when no turn is queued."""
+        if not self.pending:
+            return None
+        code, pressed = self.pending.popleft()
+        self.applied.append(pressed)
+        return code
+
+    def frame_shown(self):
+        """Records key-to-screen latency for every turn applied since the last frame."""
+        if not self.applied:
+            return
+        now = self.clock()
+        for pressed in self.applied:
+            latency = now - pressed
+            self.shown += 1
+            self.total_latency += latency
+            if latency > self.max_latency:
+                self.max_latency = latency
+        self.applied.clear()
+
+    def stats(self):
+        """Key presses and key-to-screen latency so far, in milliseconds."""
+        return {
+            "presses": self.presses,
+            "dropped": self.dropped,
+            "shown": self.shown,
+            "mean_latency_ms": self.total_latency / self.shown * 1000 if self.shown else 0.0,
+            "max_latency_ms": self.max_latency * 1000,
+        }
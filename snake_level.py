@@ -0,0 +1,380 @@
+"""Level files: boards with walls and obstacles, stored as memory-mapped bitmaps.
+
+A level is a square board with some cells walled off. On disk it is a
+fixed header, a bitmap with one bit per cell (set for walls) and the list
+of wall cell ids. Level.open memory-maps the file and uses the bitmap and
+the list in place, so opening a level takes the same time at any size and
+parses nothing. The engine tests a cell with a single bit lookup in that
+bitmap (see SnakeEngine.move_snake and neighbor), so a tick costs the same
+on an obstacle-dense level as on an empty board.
+
+Walls never enter the engine's free-cell list, so create_food keeps
+drawing from free cells only, in O(1). The free list each reset starts
+from is derived from the bitmap once per level (free_cell_index) and then
+copied. LevelCache keeps recently used levels open, so switching levels
+in the menu does not reopen or re-index them.
+
+File layout (little endian):
+    header      see HEADER
+    walls       bitmap, bit (cell & 7) of byte (cell >> 3), padded to 4 bytes
+    wall cells  wall_count x uint32, ascending
+
+Text levels are converted with the build command: one line per row,
+'#' for a wall, 'S' for the snake's starting head (it starts with its tail
+two cells to the left, moving right), anything else for floor.
+
+    python snake_level.py build levels/maze.txt levels/maze.snkl
+    python snake_level.py random --size 1000 --density 0.3 levels/rocks.snkl
+    python snake_level.py info levels/rocks.snkl
+    python snake_level.py bench --size 1000 --density 0.3
+"""
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from itertools import accumulate, compress, islice
+
+from snake_engine import MIN_MAP_SIZE_N, MAX_HUGE_MAP_SIZE_N, cell_typecode
+from snake_storage import atomic_write
+
+MAGIC = b"SNKL"
+VERSION = 1
+LEVEL_EXTENSION = ".snkl"
+LEVELS_DIR = "levels" # Levels offered in the menu
+LEVEL_CACHE_SIZE = 8 # Levels kept open by LevelCache
+INDEX_CHUNK_CELLS = 1 << 15 # Cells free_cell_index handles per step (a multiple of 8, a few ms of work)
+
+# magic, version, map_size_n, start_cell, wall_count
+HEADER = struct.Struct("<4sB3xIII")
+
+# Bitmap byte -> its 8 cells as 0/1 bytes, and 0/1 bytes swapped
+EXPAND_BITS = [bytes((byte >> bit) & 1 for bit in range(8)) for byte in range(256)]
+INVERT_FLAGS = bytes.maketrans(b"\x00\x01", b"\x01\x00")
+
+
+class LevelError(Exception):
+    """Raised for files that are not valid levels."""
+
+
+def bitmap_size(cell_count):
+    """Bytes of wall bitmap for cell_count cells, padded so the wall list after it stays aligned."""
+    return ((cell_count + 7) // 8 + 3) & ~3
+
+
+class Level:
+    def __init__(self, map_size_n, start_cell, walls, wall_cells, path=None):
+        self.map_size_n = map_size_n
+        self.cell_count = map_size_n * map_size_n
+        self.start_cell = start_cell # Cell of the snake's head at the start of a game
+        self.walls = walls # Bitmap, indexable by byte (bytes, bytearray or a memoryview of the file)
+        self.wall_cells = wall_cells # Ascending wall cell ids (array or memoryview)
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0] if path else ""
+        self.mapped = None # The mmap, for levels opened from a file
+        self.free_index = None # (free_cells, free_cell_pos, free_count), see free_cell_index
+        self.runs = None # Wall runs per row, see wall_runs
+
+    @classmethod
+    def from_walls(cls, map_size_n, wall_cells, start_cell=None):
+        """Builds a level in memory. Without start_cell the snake starts in the middle like on an empty board."""
+        if not MIN_MAP_SIZE_N <= map_size_n <= MAX_HUGE_MAP_SIZE_N:
+            raise LevelError(f"Levels must be {MIN_MAP_SIZE_N}-{MAX_HUGE_MAP_SIZE_N} cells per side, not {map_size_n}")
+        cell_count = map_size_n * map_size_n
+        walls = bytearray(bitmap_size(cell_count))
+        cells = sorted(set(wall_cells))
+        if cells and (cells[0] < 0 or cells[-1] >= cell_count):
+            raise LevelError(f"Wall cell {cells[0] if cells[0] < 0 else cells[-1]} is outside the board")
+        ordered = array("I", cells)
+        for cell in ordered:
+            walls[cell >> 3] |= 1 << (cell & 7)
+        if start_cell is None:
+            mid = map_size_n // 2
+            start_cell = mid * map_size_n + mid
+        level = cls(map_size_n, start_cell, bytes(walls), ordered)
+        level.check_start()
+        return level
+
+    @classmethod
+    def from_text(cls, text):
+        rows = [line.rstrip("\r\n") for line in text.splitlines()]
+        while rows and not rows[-1].strip():
+            rows.pop()
+        n = len(rows)
+        if any(len(row) > n for row in rows):
+            raise LevelError(f"Text levels must be square: {n} rows, but a row is longer than that")
+        walls = []
+        start_cell = None
+        for y, row in enumerate(rows):
+            for x, char in enumerate(row):
+                if char == "#":
+                    walls.append(y * n + x)
+                elif char == "S":
+                    start_cell = y * n + x
+        return cls.from_walls(n, walls, start_cell)
+
+    @classmethod
+    def open(cls, path):
+        """Memory-maps a level file. Nothing is read up front beyond the header."""
+        with open(path, "rb") as f:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError: # Empty file
+                raise LevelError(f"{path} is empty") from None
+        level = None
+        try:
+            if len(mapped) < HEADER.size:
+                raise LevelError(f"{path} is too short to be a level")
+            magic, version, map_size_n, start_cell, wall_count = HEADER.unpack_from(mapped)
+            if magic != MAGIC:
+                raise LevelError(f"{path} is not a snake level")
+            if version != VERSION:
+                raise LevelError(f"{path} has unsupported level version {version}")
+            if not MIN_MAP_SIZE_N <= map_size_n <= MAX_HUGE_MAP_SIZE_N:
+                raise LevelError(f"{path} has an unsupported size of {map_size_n}")
+            cell_count = map_size_n * map_size_n
+            walls_end = HEADER.size + bitmap_size(cell_count)
+            if len(mapped) != walls_end + 4 * wall_count:
+                raise LevelError(f"{path} is truncated or corrupt")
+            if not 0 <= start_cell < cell_count:
+                raise LevelError(f"{path} starts the snake outside the board")
+            walls = memoryview(mapped)[HEADER.size:walls_end]
+            if sys.byteorder == "little":
+                wall_cells = memoryview(mapped)[walls_end:].cast("I")
+            else:
+                wall_cells = array("I", mapped[walls_end:])
+                wall_cells.byteswap()
+            level = cls(map_size_n, start_cell, walls, wall_cells, path)
+            level.mapped = mapped
+            level.check_start()
+        except BaseException:
+            if level is not None:
+                level.close()
+            else:
+                mapped.close()
+            raise
+        return level
+
+    def check_start(self):
+        """The starting snake (head and two cells to its left) and the cell ahead of it must be floor."""
+        n = self.map_size_n
+        y, x = divmod(self.start_cell, n)
+        if not 0 <= self.start_cell < self.cell_count or not 2 <= x < n - 1:
+            raise LevelError("The start must leave room for the snake's tail on its left and one free cell on its right")
+        for cell in range(self.start_cell - 2, self.start_cell + 2):
+            if self.is_wall(cell):
+                raise LevelError(f"The snake starts on or facing a wall at {cell % n}, {cell // n}")
+
+    def is_wall(self, cell):
+        return self.walls[cell >> 3] >> (cell & 7) & 1
+
+    def to_bytes(self):
+        wall_cells = array("I", self.wall_cells)
+        if sys.byteorder != "little":
+            wall_cells.byteswap()
+        return (HEADER.pack(MAGIC, VERSION, self.map_size_n, self.start_cell, len(wall_cells))
+                + bytes(self.walls) + wall_cells.tobytes())
+
+    def save(self, path):
+        atomic_write(path, self.to_bytes())
+
+    def cell_flags(self, start=0, stop=None):
+        """One byte per cell in start <= cell < stop, 1 for walls, expanded from the bitmap at C speed."""
+        if stop is None:
+            stop = self.cell_count
+        flags = b"".join(map(EXPAND_BITS.__getitem__, self.walls[start >> 3:(stop + 7) >> 3]))
+        return flags[start & 7:(start & 7) + stop - start]
+
+    def free_cell_index(self):
+        """The engine's free-cell list with the walls left out: (free_cells, free_cell_pos, free_count).
+
+        Built from the bitmap on first use (O(cells), without a per-cell Python loop) and
+        kept, so resetting an engine on this level is a copy. The work is done INDEX_CHUNK_CELLS
+        at a time, so a thread building it for a huge level lets the Tk thread run in between.
+        """
+        if self.free_index is None:
+            typecode = cell_typecode(self.cell_count)
+            free_cells = array(typecode)
+            wall_cells = array(typecode)
+            free_cell_pos = array(typecode)
+            for start in range(0, self.cell_count, INDEX_CHUNK_CELLS):
+                stop = min(start + INDEX_CHUNK_CELLS, self.cell_count)
+                wall_flags = self.cell_flags(start, stop)
+                floor_flags = wall_flags.translate(INVERT_FLAGS)
+                cells = range(start, stop)
+                # A floor cell's position is the number of floor cells before it
+                free_cell_pos.extend(islice(accumulate(floor_flags, initial=len(free_cells)), stop - start))
+                free_cells.extend(compress(cells, floor_flags))
+                wall_cells.extend(compress(cells, wall_flags))
+            free_count = len(free_cells)
+            free_cells.extend(wall_cells) # Never handed out: they sit past free_count
+            self.free_index = (free_cells, free_cell_pos, free_count)
+        return self.free_index
+
+    def wall_runs(self):
+        """Walls as (y, x0, x1) runs of wall cells x0 <= x < x1 in row y, for drawing."""
+        if self.runs is None:
+            n = self.map_size_n
+            flags = self.cell_flags()
+            runs = []
+            for y in range(n):
+                row = flags[y * n:(y + 1) * n]
+                x = row.find(1)
+                while x != -1:
+                    end = row.find(0, x)
+                    if end == -1:
+                        end = n
+                    runs.append((y, x, end))
+                    x = row.find(1, end)
+            self.runs = runs
+        return self.runs
+
+    def close(self):
+        if self.mapped is None:
+            return
+        # Views into the map must be released before it can close
+        if isinstance(self.wall_cells, memoryview):
+            self.wall_cells.release()
+        self.walls.release()
+        self.mapped.close()
+        self.mapped = None
+
+
+def list_levels(directory=LEVELS_DIR):
+    """Level files in directory, by name."""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return sorted(os.path.join(directory, name) for name in names if name.endswith(LEVEL_EXTENSION))
+
+
+class LevelCache:
+    """The most recently used levels, kept open and indexed. Reopens a level whose file changed."""
+
+    def __init__(self, size=LEVEL_CACHE_SIZE):
+        self.size = size
+        self.levels = OrderedDict() # path -> (modification time, Level), least recently used first
+
+    def get(self, path):
+        """The level at path. Raises LevelError or OSError."""
+        mtime = os.stat(path).st_mtime_ns
+        entry = self.levels.get(path)
+        if entry is not None:
+            if entry[0] == mtime:
+                self.levels.move_to_end(path)
+                return entry[1]
+            del self.levels[path]
+        level = Level.open(path)
+        self.levels[path] = (mtime, level)
+        while len(self.levels) > self.size:
+            # Not closed: an engine may still be playing it. The map goes with the last reference.
+            self.levels.popitem(last=False)
+        return level
+
+
+def random_level(map_size_n, density, seed=0):
+    """A level with a density fraction of its cells walled off at random, around a clear start."""
+    rng = random.Random(seed)
+    mid = map_size_n // 2
+    start_cell = mid * map_size_n + mid
+    keep_clear = set(range(start_cell - 2, start_cell + 2))
+    walls = [cell for cell in range(map_size_n * map_size_n) if rng.random() < density and cell not in keep_clear]
+    return Level.from_walls(map_size_n, walls, start_cell)
+
+
+def bench(map_size_n, density, ticks):
+    """Times opening a level file, its first reset and ticks against an empty board of the same size."""
+    import tempfile
+    from snake_engine import SnakeEngine, NO_CELL
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench" + LEVEL_EXTENSION)
+        random_level(map_size_n, density).save(path)
+        start = time.perf_counter()
+        level = Level.open(path)
+        open_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        engine = SnakeEngine(map_size_n, True, seed=0, level=level)
+        first_reset_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        engine.reset(0)
+        reset_ms = (time.perf_counter() - start) * 1000
+
+        results = {}
+        for name, board in (("empty", SnakeEngine(map_size_n, True, seed=0)), ("level", engine)):
+            elapsed = 0.0
+            moves = 0
+            rng = random.Random(1)
+            board.reset(0)
+            while moves < ticks:
+                code = board.direction_code
+                # Turn away from walls and the body when possible, so games last
+                for candidate in (code, code ^ 2, code ^ 3, rng.randrange(4)):
+                    cell = board.neighbor(board.head_cell, candidate)
+                    if cell != NO_CELL and not board.occupancy[cell] and candidate ^ 1 != board.direction_code:
+                        code = candidate
+                        break
+                board.change_direction_code(code)
+                start = time.perf_counter()
+                board.move_snake()
+                over = board.game_over_flag or board.check_collisions()
+                elapsed += time.perf_counter() - start
+                moves += 1
+                if over:
+                    board.reset(moves)
+            results[name] = elapsed / ticks * 1e6
+        level_walls = len(level.wall_cells)
+        engine = None
+        level.close()
+    print(f"{map_size_n}x{map_size_n} level, {level_walls} walls ({density:.0%}): open {open_ms:.3f} ms, "
+          f"first reset {first_reset_ms:.1f} ms, later resets {reset_ms:.1f} ms; "
+          f"tick {results['level']:.2f} us vs {results['empty']:.2f} us on an empty board "
+          f"({ticks} ticks)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build, inspect and benchmark snake level files.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="convert a text level")
+    build_parser.add_argument("text")
+    build_parser.add_argument("output")
+    random_parser = subparsers.add_parser("random", help="generate a level of random obstacles")
+    random_parser.add_argument("--size", type=int, required=True)
+    random_parser.add_argument("--density", type=float, default=0.2)
+    random_parser.add_argument("--seed", type=int, default=0)
+    random_parser.add_argument("output")
+    info_parser = subparsers.add_parser("info")
+    info_parser.add_argument("path")
+    bench_parser = subparsers.add_parser("bench")
+    bench_parser.add_argument("--size", type=int, default=1000)
+    bench_parser.add_argument("--density", type=float, default=0.3)
+    bench_parser.add_argument("--ticks", type=int, default=200000)
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "build":
+            with open(args.text, "r") as f:
+                level = Level.from_text(f.read())
+            level.save(args.output)
+        elif args.command == "random":
+            level = random_level(args.size, args.density, args.seed)
+            level.save(args.output)
+        elif args.command == "info":
+            level = Level.open(args.path)
+        else:
+            bench(args.size, args.density, args.ticks)
+            return
+    except (LevelError, OSError) as e:
+        print(f"Warning: {e}")
+        sys.exit(1)
+    start_x, start_y = level.start_cell % level.map_size_n, level.start_cell // level.map_size_n
+    print(f"{level.map_size_n}x{level.map_size_n}, {len(level.wall_cells)} walls, start {start_x}, {start_y}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,820 @@
+"""Local multiplayer: several snakes on one board, served over asyncio.
+
+MultiSnakeEngine runs the authoritative rules. They are SnakeEngine's
+move_snake / check_collisions rules extended to many snakes: all snakes
+move at once, and a head that ends the tick on any other segment (its
+own, another snake's, or another head) dies. Dead snakes are cleared
+from the board and respawn after RESPAWN_TICKS. Food is shared, with one
+piece on the board per player.
+
+MultiplayerServer ticks the engine on a TickClock and broadcasts each tick
+as a delta, never the full board. Every tick's changes are a list of
+(op, player id, cell) events, packed as a few bytes each. MOVE means "head
+enters cell, tail cell freed". GROW means "head enters cell, eating the
+food there". The client drops the tail itself, so a moving snake costs
+one event per tick whatever its length. A joining client gets one full
+STATE message. Clients then replay the same events through
+MultiplayerBoard.apply_event. The server mutates its own board through
+that same method, so client boards match the server's exactly.
+
+Wire format (little endian): each message is a u32 length followed by
+the payload, and the payload's first byte is its type.
+    STATE   server -> joining client, see STATE_HEADER (cells are u32)
+    DELTA   server -> clients, DELTA_HEADER then event_count events
+    INPUT   client -> server, a direction code
+
+    python snake_multiplayer.py serve --port 8765
+    python snake_multiplayer.py play --port 8765        # Tk client
+    python snake_multiplayer.py bots 30 --port 8765     # headless load
+    python snake_multiplayer.py bench --clients 32 --ticks 400
+"""
+import argparse
+import asyncio
+import os
+import queue
+import random
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from collections import deque
+
+from snake_engine import (
+    cell_array, next_cell_table, NO_CELL, NEXT_CELL_TABLE_MAX_CELLS, DIRECTION_VECTORS,
+    DIRECTION_NAMES, DIRECTION_CODES, LEFT, RIGHT, MAX_MAP_SIZE_N,
+)
+from snake_timing import TickClock, MOVE_SPEEDS
+from snake_style import SEGMENT_SIZE, SNAKE_COLOR_PALETTES, BACKGROUND_COLOR
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MULTIPLAYER_MAP_SIZE_N = MAX_MAP_SIZE_N
+FAST_TICK_MS = MOVE_SPEEDS["Fast"]
+MAX_PLAYERS = 255 # Player ids are one byte
+SPAWN_LENGTH = 3
+SPAWN_ATTEMPTS = 64 # Random spawn spots tried per tick before waiting for the next one
+RESPAWN_TICKS = 20
+FOOD_PER_PLAYER = 1
+MAX_CLIENT_BACKLOG = 256 * 1024 # Unsent bytes after which a client counts as stalled and is dropped
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+# Message types (first payload byte)
+MSG_STATE = 1
+MSG_DELTA = 2
+MSG_INPUT = 3
+
+# Event ops
+EVENT_MOVE = 0 # Head enters cell, the tail cell is freed
+EVENT_GROW = 1 # Head enters cell and eats any food there, the tail stays
+EVENT_DIED = 2 # The snake's body is cleared (cell unused)
+EVENT_SPAWN = 3 # A new body starts at cell (its tail); GROW events add the rest
+EVENT_FOOD = 4 # Food appears on cell
+EVENT_LEAVE = 5 # The player disconnected (cell unused)
+
+FRAME_HEADER = struct.Struct("<I")
+# type, wrapping, map_size_n, tick, your player id, snake count, food count
+STATE_HEADER = struct.Struct("<BBHIBHH")
+SNAKE_HEADER = struct.Struct("<BI") # player id, body length; then the body's cells, tail first
+DELTA_HEADER = struct.Struct("<BIH") # type, tick, event count
+INPUT_MESSAGE = struct.Struct("<BB") # type, direction code
+# op, player id, cell; boards of up to 65536 cells send two-byte cells
+SMALL_EVENT = struct.Struct("<BBH")
+LARGE_EVENT = struct.Struct("<BBI")
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def event_format(cell_count):
+    return SMALL_EVENT if cell_count <= 0x10000 else LARGE_EVENT
+
+
+def frame(payload):
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+async def read_message(reader):
+    """Returns the next payload from reader, or None once the connection is closed."""
+    try:
+        (length,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+        if length > MAX_MESSAGE_BYTES:
+            raise ProtocolError(f"Message of {length} bytes")
+        return await reader.readexactly(length)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+
+
+class MultiplayerBoard:
+    """Shared board state as every client sees it: bodies, food and occupancy.
+
+    Changes only through apply_event(), on the server and on clients alike.
+    """
+    def __init__(self, map_size_n=MULTIPLAYER_MAP_SIZE_N, screen_wrapping_enabled=True):
+        self.map_size_n = map_size_n
+        self.screen_wrapping_enabled = screen_wrapping_enabled
+        self.cell_count = map_size_n * map_size_n
+        self.event_format = event_format(self.cell_count)
+        if self.cell_count <= NEXT_CELL_TABLE_MAX_CELLS:
+            self.next_cells = next_cell_table(map_size_n, screen_wrapping_enabled)
+        else:
+            self.next_cells = None
+        self.occupancy = bytearray(self.cell_count) # Segments per cell, over all snakes
+        self.bodies = {} # Player id -> deque of cell ids, tail first (empty while dead)
+        self.food_cells = set()
+        self.ticks = 0
+
+    def neighbor(self, cell, code):
+        """Returns the cell entered moving from cell in direction code, or NO_CELL for a wall."""
+        if self.next_cells is not None:
+            return self.next_cells[cell << 2 | code]
+        n = self.map_size_n
+        y, x = divmod(cell, n)
+        dx, dy = DIRECTION_VECTORS[DIRECTION_NAMES[code]]
+        new_x, new_y = x + dx, y + dy
+        if self.screen_wrapping_enabled:
+            return (new_y % n) * n + new_x % n
+        if 0 <= new_x < n and 0 <= new_y < n:
+            return new_y * n + new_x
+        return NO_CELL
+
+    def distance(self, a, b):
+        """Manhattan distance between two cells (the shorter way round when wrapping)."""
+        n = self.map_size_n
+        y1, x1 = divmod(a, n)
+        y2, x2 = divmod(b, n)
+        dx, dy = abs(x1 - x2), abs(y1 - y2)
+        if self.screen_wrapping_enabled:
+            dx, dy = min(dx, n - dx), min(dy, n - dy)
+        return dx + dy
+
+    def occupy_cell(self, cell):
+        self.occupancy[cell] += 1
+
+    def vacate_cell(self, cell):
+        self.occupancy[cell] -= 1
+
+    def apply_event(self, op, player_id, cell):
+        if op == EVENT_MOVE:
+            body = self.bodies[player_id]
+            body.append(cell)
+            self.occupy_cell(cell)
+            self.vacate_cell(body.popleft())
+        elif op == EVENT_GROW:
+            self.bodies[player_id].append(cell)
+            self.occupy_cell(cell)
+            self.food_cells.discard(cell)
+        elif op == EVENT_FOOD:
+            self.food_cells.add(cell)
+        elif op == EVENT_SPAWN:
+            body = self.bodies.setdefault(player_id, deque())
+            body.append(cell)
+            self.occupy_cell(cell)
+        elif op in (EVENT_DIED, EVENT_LEAVE):
+            body = self.bodies[player_id]
+            for segment in body:
+                self.vacate_cell(segment)
+            body.clear()
+            if op == EVENT_LEAVE:
+                del self.bodies[player_id]
+        else:
+            raise ProtocolError(f"Unknown event op {op}")
+
+    def encode_state(self, player_id):
+        """Full STATE message for a client joining as player_id."""
+        parts = [STATE_HEADER.pack(MSG_STATE, self.screen_wrapping_enabled, self.map_size_n, self.ticks,
+                                   player_id, len(self.bodies), len(self.food_cells))]
+        for snake_id, body in self.bodies.items():
+            parts.append(SNAKE_HEADER.pack(snake_id, len(body)))
+            parts.append(array("I", body).tobytes())
+        parts.append(array("I", self.food_cells).tobytes())
+        return frame(b"".join(parts))
+
+    @classmethod
+    def from_state(cls, payload):
+        """Builds a board from a STATE payload. Returns (board, your player id)."""
+        if not payload or payload[0] != MSG_STATE:
+            raise ProtocolError("Expected a STATE message")
+        _, wrapping, map_size_n, ticks, player_id, snake_count, food_count = STATE_HEADER.unpack_from(payload)
+        board = cls(map_size_n, bool(wrapping))
+        board.ticks = ticks
+        offset = STATE_HEADER.size
+        for _ in range(snake_count):
+            snake_id, length = SNAKE_HEADER.unpack_from(payload, offset)
+            offset += SNAKE_HEADER.size
+            cells = array("I")
+            cells.frombytes(payload[offset:offset + 4 * length])
+            offset += 4 * length
+            board.bodies[snake_id] = deque(cells)
+            for cell in cells:
+                board.occupy_cell(cell)
+        food = array("I")
+        food.frombytes(payload[offset:offset + 4 * food_count])
+        board.food_cells.update(food)
+        return board, player_id
+
+    def decode_delta(self, payload):
+        """Returns the (op, player id, cell) events of a DELTA payload and takes its tick."""
+        if not payload or payload[0] != MSG_DELTA:
+            raise ProtocolError("Expected a DELTA message")
+        _, ticks, event_count = DELTA_HEADER.unpack_from(payload)
+        events = list(self.event_format.iter_unpack(payload[DELTA_HEADER.size:]))
+        if len(events) != event_count:
+            raise ProtocolError("Truncated DELTA message")
+        self.ticks = ticks
+        return events
+
+    def apply_delta(self, payload):
+        events = self.decode_delta(payload)
+        for op, player_id, cell in events:
+            self.apply_event(op, player_id, cell)
+        return events
+
+    def encode_delta(self, events):
+        pack = self.event_format.pack
+        return frame(DELTA_HEADER.pack(MSG_DELTA, self.ticks, len(events))
+                     + b"".join([pack(*event) for event in events]))
+
+    def matches(self, other):
+        """True when both boards hold the same snakes and food."""
+        return (self.bodies == other.bodies and self.food_cells == other.food_cells
+                and self.occupancy == other.occupancy)
+
+
+class Player:
+    __slots__ = ("direction_code", "new_direction_code", "alive", "score", "respawn_tick")
+
+    def __init__(self):
+        self.direction_code = RIGHT
+        self.new_direction_code = RIGHT
+        self.alive = False
+        self.score = 0
+        self.respawn_tick = 0
+
+
+class MultiSnakeEngine(MultiplayerBoard):
+    """The authoritative board: decides each tick's events and applies them."""
+    def __init__(self, map_size_n=MULTIPLAYER_MAP_SIZE_N, screen_wrapping_enabled=True, seed=None):
+        super().__init__(map_size_n, screen_wrapping_enabled)
+        self.rng = random.Random(seed)
+        self.free_cells = cell_array(self.cell_count) # The first free_count entries are the free cells
+        self.free_cells[:] = array(self.free_cells.typecode, range(self.cell_count))
+        self.free_cell_pos = cell_array(self.cell_count)
+        self.free_cell_pos[:] = array(self.free_cell_pos.typecode, range(self.cell_count))
+        self.free_count = self.cell_count
+        self.players = {} # Player id -> Player
+        self.events = [] # Applied but not yet broadcast
+
+    def occupy_cell(self, cell):
+        self.occupancy[cell] += 1
+        if self.occupancy[cell] == 1:
+            # Swap-remove the cell from the free list
+            pos = self.free_cell_pos[cell]
+            self.free_count -= 1
+            last = self.free_cells[self.free_count]
+            if last != cell:
+                self.free_cells[pos] = last
+                self.free_cell_pos[last] = pos
+
+    def vacate_cell(self, cell):
+        self.occupancy[cell] -= 1
+        if self.occupancy[cell] == 0:
+            self.free_cells[self.free_count] = cell
+            self.free_cell_pos[cell] = self.free_count
+            self.free_count += 1
+
+    def emit(self, op, player_id, cell=0):
+        self.events.append((op, player_id, cell))
+        self.apply_event(op, player_id, cell)
+
+    def take_events(self):
+        """Returns the events applied since the last call."""
+        events = self.events
+        self.events = []
+        return events
+
+    def add_player(self):
+        """Adds a player and spawns its snake if there is room. Returns its id, or None when full."""
+        player_id = next((i for i in range(MAX_PLAYERS) if i not in self.players), None)
+        if player_id is None:
+            return None
+        player = self.players[player_id] = Player()
+        self.spawn(player_id, player)
+        self.create_food()
+        return player_id
+
+    def remove_player(self, player_id):
+        if self.players.pop(player_id, None) is not None and player_id in self.bodies:
+            self.emit(EVENT_LEAVE, player_id)
+
+    def change_direction_code(self, player_id, code):
+        player = self.players.get(player_id)
+        # Prevent 180-degree turns
+        if player is not None and 0 <= code < 4 and code ^ 1 != player.direction_code:
+            player.new_direction_code = code
+
+    def spawn(self, player_id, player):
+        """Lays a new snake heading right on a random free stretch of the board. False if none was found."""
+        for _ in range(SPAWN_ATTEMPTS):
+            if not self.free_count:
+                break
+            head = self.free_cells[self.rng.randrange(self.free_count)]
+            cells = [head]
+            while len(cells) < SPAWN_LENGTH and cells[-1] != NO_CELL:
+                cells.append(self.neighbor(cells[-1], LEFT))
+            ahead = self.neighbor(head, RIGHT)
+            # The snake and the cell it moves into first must be free, food included
+            if any(cell == NO_CELL or self.occupancy[cell] or cell in self.food_cells for cell in cells + [ahead]):
+                continue
+            if len(set(cells + [ahead])) < SPAWN_LENGTH + 1:
+                continue # Tiny wrapping board
+            cells.reverse()
+            self.emit(EVENT_SPAWN, player_id, cells[0])
+            for cell in cells[1:]:
+                self.emit(EVENT_GROW, player_id, cell)
+            player.alive = True
+            player.score = 0
+            player.direction_code = player.new_direction_code = RIGHT
+            return True
+        player.respawn_tick = self.ticks + 1 # Try again next tick
+        return False
+
+    def create_food(self):
+        """Tops the food up to FOOD_PER_PLAYER per player, on random free cells."""
+        target = max(1, len(self.players)) * FOOD_PER_PLAYER
+        # Food only ever lies on free cells, so this leaves at least one free cell to pick
+        while len(self.food_cells) < target and self.free_count > len(self.food_cells):
+            cell = self.free_cells[self.rng.randrange(self.free_count)]
+            if cell not in self.food_cells:
+                self.emit(EVENT_FOOD, 0, cell)
+
+    def tick(self):
+        """Advances every snake by one cell. Returns the tick's events."""
+        self.ticks += 1
+        next_cells = self.next_cells
+        moving = []
+        dead = []
+        for player_id, player in self.players.items():
+            if not player.alive:
+                continue
+            player.direction_code = player.new_direction_code
+            head = self.bodies[player_id][-1]
+            if next_cells is not None:
+                new_head = next_cells[head << 2 | player.direction_code]
+            else:
+                new_head = self.neighbor(head, player.direction_code)
+            if new_head == NO_CELL:
+                dead.append(player_id) # Wall
+            else:
+                moving.append((player_id, new_head))
+
+        # Every snake moves before any collision is checked, so the outcome doesn't depend on player order.
+        # Heads move in player id order: when two reach the same food, the lowest id eats it.
+        moving.sort()
+        for player_id, new_head in moving:
+            if new_head in self.food_cells:
+                self.players[player_id].score += 1
+                self.emit(EVENT_GROW, player_id, new_head)
+            else:
+                self.emit(EVENT_MOVE, player_id, new_head)
+        dead.extend(player_id for player_id, new_head in moving if self.occupancy[new_head] > 1)
+
+        for player_id in dead:
+            player = self.players[player_id]
+            player.alive = False
+            player.respawn_tick = self.ticks + RESPAWN_TICKS
+            self.emit(EVENT_DIED, player_id)
+        for player_id, player in self.players.items():
+            if not player.alive and self.ticks >= player.respawn_tick:
+                self.spawn(player_id, player)
+        self.create_food()
+        return self.take_events()
+
+
+class MultiplayerServer:
+    """Runs the authoritative tick and fans the deltas out to every connected client."""
+    def __init__(self, engine, period_ms=FAST_TICK_MS):
+        self.engine = engine
+        self.clock = TickClock(period_ms)
+        self.clients = {} # Player id -> StreamWriter
+        self.handlers = set() # Running handle_client tasks
+        self.server = None
+        self.running = False
+        self.bytes_sent = 0
+        self.tick_time = 0.0 # Seconds spent ticking and broadcasting
+        self.max_tick_time = 0.0
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        """Listens on a Unix socket at path, or on TCP host:port."""
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle_client, path=path)
+        else:
+            self.server = await asyncio.start_server(self.handle_client, host, port)
+
+    def address(self):
+        return self.server.sockets[0].getsockname()
+
+    async def handle_client(self, reader, writer):
+        task = asyncio.current_task()
+        self.handlers.add(task)
+        task.add_done_callback(self.handlers.discard)
+        player_id = self.engine.add_player()
+        if player_id is None:
+            print("Info: Refusing a client, the server is full")
+            writer.close()
+            return
+        # Existing clients hear about the newcomer first; nothing can tick between these writes
+        self.broadcast(self.engine.take_events())
+        writer.write(self.engine.encode_state(player_id))
+        self.clients[player_id] = writer
+        try:
+            while True:
+                payload = await read_message(reader)
+                if payload is None:
+                    break
+                if payload[0] == MSG_INPUT and len(payload) == INPUT_MESSAGE.size:
+                    self.engine.change_direction_code(player_id, payload[1])
+        except ProtocolError as e:
+            print(f"Warning: Dropping player {player_id}: {e}")
+        finally:
+            self.drop_client(player_id)
+
+    def drop_client(self, player_id):
+        writer = self.clients.pop(player_id, None)
+        if writer is None:
+            return
+        writer.close()
+        self.engine.remove_player(player_id)
+        self.broadcast(self.engine.take_events())
+
+    def broadcast(self, events):
+        """Sends one DELTA to every client. Clients that stopped reading are dropped afterwards."""
+        data = self.engine.encode_delta(events)
+        stalled = []
+        for player_id, writer in self.clients.items():
+            if writer.transport.get_write_buffer_size() > MAX_CLIENT_BACKLOG:
+                stalled.append(player_id)
+                continue
+            writer.write(data)
+            self.bytes_sent += len(data)
+        for player_id in stalled:
+            print(f"Info: Dropping player {player_id}, it stopped reading")
+            self.drop_client(player_id)
+
+    async def run(self, ticks=None):
+        """Ticks at the clock's rate until stop(), or until the engine reaches ticks."""
+        self.running = True
+        self.clock.start()
+        while self.running and (ticks is None or self.engine.ticks < ticks):
+            for _ in range(self.clock.due_ticks()):
+                start = time.perf_counter()
+                self.broadcast(self.engine.tick())
+                elapsed = time.perf_counter() - start
+                self.tick_time += elapsed
+                self.max_tick_time = max(self.max_tick_time, elapsed)
+            await asyncio.sleep(self.clock.delay_ms() / 1000)
+
+    def stop(self):
+        self.running = False
+
+    async def close(self):
+        self.stop()
+        for writer in list(self.clients.values()):
+            writer.close()
+        self.clients.clear()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        # Closed connections end their handlers; wait for them so nothing is left pending
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+
+
+class MultiplayerClient:
+    """Connection to a MultiplayerServer that keeps a MultiplayerBoard in sync."""
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.board = None
+        self.player_id = None
+        self.bytes_received = 0
+
+    async def connect(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        """Connects over a Unix socket at path, or TCP host:port, and loads the initial STATE."""
+        if path is not None:
+            self.reader, self.writer = await asyncio.open_unix_connection(path)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(host, port)
+        payload = await self.read_payload()
+        if payload is None:
+            raise ConnectionError("Server closed the connection (full?)")
+        self.board, self.player_id = MultiplayerBoard.from_state(payload)
+
+    async def read_payload(self):
+        payload = await read_message(self.reader)
+        if payload is not None:
+            self.bytes_received += FRAME_HEADER.size + len(payload)
+        return payload
+
+    async def receive(self):
+        """Waits for the next DELTA and applies it. Returns its events, or None once disconnected."""
+        payload = await self.read_payload()
+        if payload is None:
+            return None
+        return self.board.apply_delta(payload)
+
+    def send_direction(self, code):
+        if self.writer is not None and not self.writer.is_closing():
+            self.writer.write(frame(INPUT_MESSAGE.pack(MSG_INPUT, code)))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def bot_direction(board, player_id):
+    """Greedy bot: the free neighbor closest to any food, or None while dead."""
+    body = board.bodies.get(player_id)
+    if not body:
+        return None
+    head = body[-1]
+    best_code = None
+    best_distance = None
+    for code in range(4):
+        cell = board.neighbor(head, code)
+        if cell == NO_CELL or board.occupancy[cell]:
+            continue # Also rules out reversing into the neck
+        distance = min((board.distance(cell, food) for food in board.food_cells), default=0)
+        if best_distance is None or distance < best_distance:
+            best_code, best_distance = code, distance
+    return best_code
+
+
+async def play_bot(client):
+    """Steers client's snake with bot_direction until the connection closes."""
+    while await client.receive() is not None:
+        code = bot_direction(client.board, client.player_id)
+        if code is not None:
+            client.send_direction(code)
+
+
+async def run_bots(count, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+    clients = []
+    for _ in range(count):
+        client = MultiplayerClient()
+        await client.connect(host, port, path)
+        clients.append(client)
+    print(f"Info: {count} bots connected")
+    await asyncio.gather(*(play_bot(client) for client in clients))
+
+
+async def run_server(map_size_n, wrapping, period_ms, seed, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+    server = MultiplayerServer(MultiSnakeEngine(map_size_n, wrapping, seed), period_ms)
+    await server.start(host, port, path)
+    print(f"Info: Serving a {map_size_n}x{map_size_n} board on {path or server.address()}, one tick every {period_ms} ms")
+    try:
+        await server.run()
+    finally:
+        await server.close()
+
+
+async def run_bench(clients, ticks, map_size_n, wrapping, period_ms, seed, use_tcp=False):
+    """Serves clients bots in this process for ticks ticks, then checks every client board against the server's.
+
+    Returns the report; report["ok"] is False if a board diverged or the server dropped ticks.
+    """
+    engine = MultiSnakeEngine(map_size_n, wrapping, seed)
+    server = MultiplayerServer(engine, period_ms)
+    with tempfile.TemporaryDirectory() as tmp:
+        if use_tcp or not hasattr(socket, "AF_UNIX"):
+            await server.start(port=0)
+            host, port = server.address()[:2]
+            path = None
+        else:
+            host = port = None
+            path = os.path.join(tmp, "snake.sock")
+            await server.start(path=path)
+
+        bots = []
+        for _ in range(clients):
+            bot = MultiplayerClient()
+            await bot.connect(host, port, path)
+            bots.append(bot)
+        tasks = [asyncio.create_task(play_bot(bot)) for bot in bots]
+        start = time.perf_counter()
+        await server.run(ticks)
+        seconds = time.perf_counter() - start
+
+        # Let the last deltas arrive before comparing
+        deadline = time.perf_counter() + 5
+        while any(bot.board.ticks < engine.ticks for bot in bots) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+        diverged = sum(not bot.board.matches(engine) for bot in bots)
+        bytes_received = sum(bot.bytes_received for bot in bots)
+
+        for bot in bots:
+            bot.close()
+        await server.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    clock = server.clock.stats()
+    return {
+        "clients": clients,
+        "ticks": engine.ticks,
+        "seconds": seconds,
+        "clock": clock,
+        "mean_tick_ms": server.tick_time / max(1, engine.ticks) * 1000,
+        "max_tick_ms": server.max_tick_time * 1000,
+        "bytes_per_client_tick": bytes_received / max(1, clients * engine.ticks),
+        "top_score": max((player.score for player in engine.players.values()), default=0),
+        "diverged": diverged,
+        "ok": diverged == 0 and clock["ticks_dropped"] == 0,
+    }
+
+
+class NetworkThread(threading.Thread):
+    """Runs a MultiplayerClient's asyncio loop beside Tk's mainloop.
+
+    Payloads are handed to the Tk thread through a queue and applied there,
+    so the board is only ever touched by one thread.
+    """
+    def __init__(self, host, port, path):
+        super().__init__(daemon=True)
+        self.address = (host, port, path)
+        self.client = MultiplayerClient()
+        self.messages = queue.Queue()
+        self.loop = None
+
+    def run(self):
+        asyncio.run(self.main())
+
+    async def main(self):
+        self.loop = asyncio.get_running_loop()
+        client = self.client
+        try:
+            if self.address[2] is not None:
+                client.reader, client.writer = await asyncio.open_unix_connection(self.address[2])
+            else:
+                client.reader, client.writer = await asyncio.open_connection(*self.address[:2])
+        except OSError as e:
+            self.messages.put(("error", str(e)))
+            return
+        while (payload := await client.read_payload()) is not None:
+            self.messages.put(("payload", payload))
+        self.messages.put(("closed", None))
+
+    def send_direction(self, code):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.client.send_direction, code)
+
+
+class MultiplayerWindow:
+    """Tk client: draws the shared board from deltas and sends the arrow keys."""
+    POLL_MS = 5
+
+    def __init__(self, master, network):
+        import tkinter as tk
+        self.master = master
+        self.network = network
+        self.board = None
+        self.player_id = None
+        self.canvas = None
+        self.segment_size = SEGMENT_SIZE
+        self.palettes = list(SNAKE_COLOR_PALETTES.values())
+        self.food_color = SNAKE_COLOR_PALETTES["Green"]["food"]
+        self.background = BACKGROUND_COLOR
+        self.tk = tk
+        self.snake_items = {} # Player id -> deque of canvas items, parallel to the board's bodies
+        self.food_items = {} # Cell id -> canvas item
+        master.title("Snake multiplayer (connecting)")
+        master.bind("<Key>", self.handle_key)
+        master.after(self.POLL_MS, self.poll)
+
+    def handle_key(self, event):
+        code = DIRECTION_CODES.get(event.keysym)
+        if code is not None:
+            self.network.send_direction(code)
+
+    def poll(self):
+        try:
+            while True:
+                kind, payload = self.network.messages.get_nowait()
+                if kind == "payload":
+                    self.handle_payload(payload)
+                elif kind == "error":
+                    print(f"Warning: Could not connect: {payload}")
+                    self.master.title("Snake multiplayer (could not connect)")
+                    return
+                else:
+                    self.master.title("Snake multiplayer (disconnected)")
+                    return
+        except queue.Empty:
+            pass
+        self.master.after(self.POLL_MS, self.poll)
+
+    def handle_payload(self, payload):
+        if self.board is None:
+            self.board, self.player_id = MultiplayerBoard.from_state(payload)
+            n = self.board.map_size_n
+            # Big boards shrink the cells rather than scroll
+            self.segment_size = max(2, min(self.segment_size, 800 // n))
+            size = n * self.segment_size
+            self.canvas = self.tk.Canvas(self.master, width=size, height=size, bg=self.background, highlightthickness=0)
+            self.canvas.pack()
+            for player_id, body in self.board.bodies.items():
+                self.snake_items[player_id] = deque(self.create_cell(cell, self.palettes[player_id % len(self.palettes)]["body"])
+                                                    for cell in body)
+            for cell in self.board.food_cells:
+                self.food_items[cell] = self.create_cell(cell, self.food_color)
+        else:
+            for op, player_id, cell in self.board.decode_delta(payload):
+                self.draw_event(op, player_id, cell)
+                self.board.apply_event(op, player_id, cell)
+        body = self.board.bodies.get(self.player_id)
+        score = len(body) - SPAWN_LENGTH if body else 0
+        self.master.title(f"Snake multiplayer - player {self.player_id}, score {score}")
+
+    def create_cell(self, cell, color):
+        y, x = divmod(cell, self.board.map_size_n)
+        size = self.segment_size
+        return self.canvas.create_rectangle(x * size, y * size, (x + 1) * size, (y + 1) * size, fill=color, outline="")
+
+    def draw_event(self, op, player_id, cell):
+        """Updates the canvas for an event, before it is applied to the board."""
+        canvas = self.canvas
+        palette = self.palettes[player_id % len(self.palettes)]
+        if op in (EVENT_MOVE, EVENT_GROW, EVENT_SPAWN):
+            items = self.snake_items.setdefault(player_id, deque())
+            if items:
+                canvas.itemconfigure(items[-1], fill=palette["body"])
+            items.append(self.create_cell(cell, palette["head"]))
+            if op == EVENT_MOVE:
+                canvas.delete(items.popleft())
+            elif op == EVENT_GROW and cell in self.food_items:
+                canvas.delete(self.food_items.pop(cell))
+        elif op == EVENT_FOOD:
+            self.food_items[cell] = self.create_cell(cell, self.food_color)
+        elif op in (EVENT_DIED, EVENT_LEAVE):
+            for item in self.snake_items.pop(player_id, ()):
+                canvas.delete(item)
+
+
+def play(host, port, path):
+    import tkinter as tk
+    network = NetworkThread(host, port, path)
+    network.start()
+    root = tk.Tk()
+    MultiplayerWindow(root, network)
+    root.mainloop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve, play or load-test local multiplayer snake.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command in ("serve", "play", "bots"):
+        sub = subparsers.add_parser(command)
+        if command == "bots":
+            sub.add_argument("count", type=int)
+        sub.add_argument("--host", default=DEFAULT_HOST)
+        sub.add_argument("--port", type=int, default=DEFAULT_PORT)
+        sub.add_argument("--unix", default=None, help="Unix socket path (instead of TCP)")
+    for sub in (subparsers.choices["serve"], subparsers.add_parser("bench")):
+        sub.add_argument("--size", type=int, default=MULTIPLAYER_MAP_SIZE_N, help="Map size")
+        sub.add_argument("--wrapping", choices=["on", "off"], default="on")
+        sub.add_argument("--speed", type=int, default=FAST_TICK_MS, help="Milliseconds per tick")
+        sub.add_argument("--seed", type=int, default=None)
+    bench_parser = subparsers.choices["bench"]
+    bench_parser.add_argument("--clients", type=int, default=32)
+    bench_parser.add_argument("--ticks", type=int, default=400)
+    bench_parser.add_argument("--tcp", action="store_true", help="Use localhost TCP instead of a Unix socket")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "serve":
+            asyncio.run(run_server(args.size, args.wrapping == "on", args.speed, args.seed,
+                                   args.host, args.port, args.unix))
+        elif args.command == "bots":
+            asyncio.run(run_bots(args.count, args.host, args.port, args.unix))
+        elif args.command == "play":
+            play(args.host, args.port, args.unix)
+        else:
+            report = asyncio.run(run_bench(args.clients, args.ticks, args.size, args.wrapping == "on",
+                                           args.speed, args.seed, use_tcp=args.tcp))
+            clock = report["clock"]
+            print(f"{report['clients']} clients, {report['ticks']} ticks in {report['seconds']:.2f}s: "
+                  f"period {clock['achieved_ms']:.2f}/{clock['target_ms']:.0f} ms, "
+                  f"lateness mean {clock['mean_lateness_ms']:.2f} max {clock['max_lateness_ms']:.2f} ms, "
+                  f"dropped {clock['ticks_dropped']}")
+            print(f"tick+broadcast mean {report['mean_tick_ms']:.3f} max {report['max_tick_ms']:.3f} ms, "
+                  f"{report['bytes_per_client_tick']:.1f} bytes per client per tick, top score {report['top_score']}, "
+                  f"{report['diverged']} diverged boards")
+            if not report["ok"]:
+                sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Opt-in per-tick profiling for the game loop.
+
+TickProfiler accumulates the wall time spent in each phase of a logic tick
+and keeps the last `window` ticks in fixed-size arrays, so memory stays
+bounded however long the game runs. Percentiles are computed from that
+rolling window on demand (the overlay refreshes every few ticks, the dump
+runs once at game over). Phase times are exclusive: time spent in a
+measured call nested inside another (create_food inside move_snake) is
+only counted for the inner phase.
+"""
+import csv
+import io
+import json
+import time
+from array import array
+
+from snake_storage import atomic_write
+
+PHASES = ("autopilot", "move_snake", "check_collisions", "create_food", "draw_game")
+PERCENTILES = (50, 95, 99)
+
+
+class TickProfiler:
+    def __init__(self, window=1024, clock=time.perf_counter):
+        self.window = window
+        self.clock = clock
+        self.columns = PHASES + ("tick_total",)
+        self.samples = {name: array("d", bytes(8 * window)) for name in self.columns}
+        self.canvas_items = array("l", bytes(array("l").itemsize * window))
+        self.ticks = 0 # Ticks recorded so far (the window holds the last min(ticks, window))
+        self.current = dict.fromkeys(self.columns, 0.0)
+        self.nested_time = 0.0 # Time measured inside the currently running measure() call
+
+    def record(self, phase, seconds):
+        self.current[phase] += seconds
+
+    def measure(self, phase, func, *args):
+        """Calls func(*args), adding its wall time to phase. Returns func's result."""
+        outer_nested_time = self.nested_time
+        self.nested_time = 0.0
+        start = self.clock()
+        try:
+            return func(*args)
+        finally:
+            elapsed = self.clock() - start
+            self.current[phase] += elapsed - self.nested_time
+            self.nested_time = outer_nested_time + elapsed
+
+    def wrap(self, phase, func):
+        """Returns func timed under phase, for calls made from code we don't drive directly."""
+        def timed(*args):
+            return self.measure(phase, func, *args)
+        return timed
+
+    def end_tick(self, canvas_items=0):
+        """Stores the current tick's phase times and starts a new tick.
+
+        tick_total must have been recorded by the caller (record("tick_total", ...)).
+        """
+        slot = self.ticks % self.window
+        for name in self.columns:
+            self.samples[name][slot] = self.current[name]
+            self.current[name] = 0.0
+        self.canvas_items[slot] = canvas_items
+        self.ticks += 1
+
+    def window_values(self, name):
+        """Samples in the rolling window, oldest first."""
+        count = min(self.ticks, self.window)
+        values = self.samples[name] if name != "canvas_items" else self.canvas_items
+        if self.ticks <= self.window:
+            return list(values[:count])
+        slot = self.ticks % self.window
+        return list(values[slot:]) + list(values[:slot])
+
+    def percentiles(self, name):
+        """{"p50": ..., "p95": ..., "p99": ...} in milliseconds over the rolling window."""
+        values = sorted(self.window_values(name))
+        result = {}
+        for p in PERCENTILES:
+            if values:
+                index = min(len(values) - 1, int(len(values) * p / 100))
+                result[f"p{p}"] = values[index] * 1000
+            else:
+                result[f"p{p}"] = 0.0
+        return result
+
+    def summary(self):
+        items = self.window_values("canvas_items")
+        return {
+            "ticks": self.ticks,
+            "window": min(self.ticks, self.window),
+            "phases_ms": {name: self.percentiles(name) for name in self.columns},
+            "canvas_items": {"last": items[-1] if items else 0, "max": max(items) if items else 0},
+        }
+
+    def overlay_text(self):
+        lines = [f"{'phase':<17}{'p50':>7}{'p95':>7}{'p99':>7} ms"]
+        for name in self.columns:
+            p = self.percentiles(name)
+            lines.append(f"{name:<17}{p['p50']:7.2f}{p['p95']:7.2f}{p['p99']:7.2f}")
+        items = self.window_values("canvas_items")
+        lines.append(f"canvas items: {items[-1] if items else 0}")
+        return "\n".join(lines)
+
+    def dump_json(self, path):
+        atomic_write(path, json.dumps(self.summary(), indent=4))
+
+    def dump_csv(self, path):
+        """Writes the per-tick samples of the rolling window, one row per tick (times in ms)."""
+        first_tick = self.ticks - min(self.ticks, self.window)
+        columns = [self.window_values(name) for name in self.columns]
+        items = self.window_values("canvas_items")
+        f = io.StringIO(newline="")
+        writer = csv.writer(f)
+        writer.writerow(("tick",) + tuple(f"{name}_ms" for name in self.columns) + ("canvas_items",))
+        for i, row in enumerate(zip(*columns)):
+            writer.writerow([first_tick + i] + [f"{v * 1000:.4f}" for v in row] + [items[i]])
+        atomic_write(path, f.getvalue())
+
+
+def profiled_engine(engine_class, profiler):
+    """Subclass of engine_class whose create_food is timed by profiler.
+
+    The engine keeps its state in __slots__, so methods can't be wrapped per
+    instance; swap an existing engine's __class__ to this instead.
+    """
+    class ProfiledEngine(engine_class):
+        __slots__ = ()
+
+        def create_food(self):
+            return profiler.measure("create_food", super().create_food)
+
+    return ProfiledEngine
@@ -0,0 +1,471 @@
+"""Headless rasterizer: draws games into a NumPy frame buffer and streams the frames to disk.
+
+FrameRasterizer paints a board the way the Tk game does (see draw_game and
+draw_grid in snake.py): palette colors, a 1px black border around every
+snake segment, food filling its whole cell, level walls filling theirs
+and optional grid lines under everything. It keeps one frame buffer and, like draw_game, repaints only
+the cells that changed since the last frame: new heads, the previous head,
+freed tails and the food. A frame therefore costs the same at any board
+size or snake length. Anything it cannot follow incrementally (a new
+game, a seek, unmake_move) triggers one vectorized full redraw. Walls
+never change, so only full redraws paint them.
+
+The writers stream frames out as they come, buffering at most about
+CHUNK_BYTES, so exporting a long game never holds all of its frames:
+
+    raw   rgb24 frames back to back, e.g. for
+          ffmpeg -f rawvideo -pix_fmt rgb24 -s 500x500 -r 13.33 -i game.rgb game.mp4
+    ppm   one binary PPM image per frame
+    gif   an animated GIF; each frame covers only the region that changed
+
+Requires NumPy (the rest of the game does not).
+
+    python snake_raster.py replay last_replay.snkr game.gif
+    python snake_raster.py autopilot --size 25 --ticks 5000 --every 2 game.rgb
+    python snake_raster.py autopilot --level levels/maze.snkl --ticks 2000 maze.gif
+    python snake_raster.py bench --size 25 --frames 20000
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+from snake_engine import SnakeEngine, INITIAL_MAP_SIZE_N, NO_CELL
+from snake_replay import Replay, ReplayPlayer, ReplayError
+from snake_autopilot import Autopilot
+from snake_level import Level, LevelError
+from snake_style import SEGMENT_SIZE, BACKGROUND_COLOR, SEGMENT_BORDER_COLOR, WALL_COLOR, SNAKE_COLOR_PALETTES, grid_color_hex
+from snake_timing import GAME_SPEED
+
+# Cell kinds, indexes into FrameRasterizer.tiles
+TILE_EMPTY = 0
+TILE_BODY = 1
+TILE_HEAD = 2
+TILE_FOOD = 3
+TILE_WALL = 4
+
+MIN_CELL_PX = 3 # Room for the 1px segment border on both sides of the fill
+CHUNK_BYTES = 16 << 20 # Writers buffer about this much before writing to disk
+NAMED_COLORS = {"black": "#000000", "white": "#FFFFFF"}
+
+# GIF frames are stored as uncompressed LZW: with a 7-bit minimum code size every code is
+# one byte, and a clear code every GIF_LITERALS_PER_CLEAR pixels keeps it that way
+GIF_MIN_CODE_SIZE = 7
+GIF_CLEAR_CODE = 1 << GIF_MIN_CODE_SIZE
+GIF_END_CODE = GIF_CLEAR_CODE + 1
+GIF_LITERALS_PER_CLEAR = 120
+GIF_PALETTE_SIZE = GIF_CLEAR_CODE
+
+
+def hex_to_rgb(color):
+    color = NAMED_COLORS.get(color, color)
+    return int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
+
+
+class FrameRasterizer:
+    """One RGB frame buffer of a whole board, updated from a SnakeEngine."""
+
+    def __init__(self, map_size_n=INITIAL_MAP_SIZE_N, color_name="Green", grid_brightness=0, cell_px=SEGMENT_SIZE):
+        if cell_px < MIN_CELL_PX:
+            raise ValueError(f"cell_px must be at least {MIN_CELL_PX}")
+        self.map_size_n = map_size_n
+        self.cell_px = cell_px
+        self.width = self.height = map_size_n * cell_px
+        self.frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        # The same memory seen as cells: cells[y, :, x, :] is the block of cell (x, y)
+        self.cells = self.frame.reshape(map_size_n, cell_px, map_size_n, cell_px, 3)
+
+        palette = SNAKE_COLOR_PALETTES[color_name]
+        background = hex_to_rgb(BACKGROUND_COLOR)
+        self.tiles = np.empty((5, cell_px, cell_px, 3), dtype=np.uint8)
+        self.tiles[TILE_EMPTY] = background
+        if grid_brightness > 0:
+            # Grid lines run along the top and left edge of every cell, below the snake and food
+            grid = hex_to_rgb(grid_color_hex(grid_brightness))
+            self.tiles[TILE_EMPTY, 0, :] = grid
+            self.tiles[TILE_EMPTY, :, 0] = grid
+        for kind, color in ((TILE_BODY, palette["body"]), (TILE_HEAD, palette["head"])):
+            self.tiles[kind] = hex_to_rgb(SEGMENT_BORDER_COLOR)
+            self.tiles[kind, 1:-1, 1:-1] = hex_to_rgb(color)
+        self.tiles[TILE_FOOD] = hex_to_rgb(palette["food"])
+        self.tiles[TILE_WALL] = hex_to_rgb(WALL_COLOR)
+        self.colors = np.unique(self.tiles.reshape(-1, 3), axis=0) # Every color a frame can contain
+
+        self.drawn_cells = deque() # Snake cells as painted, tail first
+        self.drawn_moves = None # engine.moves when the frame was last updated
+        self.drawn_food = NO_CELL
+        self.dirty = None # (x0, y0, x1, y1) cell bounds painted since take_dirty_region()
+        self.full_redraws = 0
+
+    def invalidate(self):
+        """Makes the next update() repaint everything."""
+        self.drawn_moves = None
+
+    def put(self, cell, kind):
+        y, x = divmod(cell, self.map_size_n)
+        self.cells[y, :, x, :] = self.tiles[kind]
+        if self.dirty is None:
+            self.dirty = [x, y, x + 1, y + 1]
+        else:
+            dirty = self.dirty
+            if x < dirty[0]: dirty[0] = x
+            if y < dirty[1]: dirty[1] = y
+            if x >= dirty[2]: dirty[2] = x + 1
+            if y >= dirty[3]: dirty[3] = y + 1
+
+    def redraw(self, engine):
+        """Paints the whole board from the engine's occupancy and walls, in one vectorized pass."""
+        n = self.map_size_n
+        kinds = np.frombuffer(engine.occupancy, dtype=np.uint8).astype(bool).astype(np.uint8) # TILE_BODY where occupied
+        if engine.walls is not None:
+            walls = np.unpackbits(np.frombuffer(engine.walls, dtype=np.uint8), bitorder="little")[:n * n]
+            kinds[walls.view(bool)] = TILE_WALL
+        if not engine.won and not engine.occupancy[engine.food_cell]:
+            kinds[engine.food_cell] = TILE_FOOD
+        kinds[engine.head_cell] = TILE_HEAD
+        self.cells[...] = self.tiles[kinds.reshape(n, n)].transpose(0, 2, 1, 3, 4)
+        self.drawn_cells = deque(engine.body_cells())
+        self.drawn_moves = engine.moves
+        self.drawn_food = engine.food_cell
+        self.dirty = [0, 0, n, n]
+        self.full_redraws += 1
+
+    def update(self, engine):
+        """Brings the frame up to date with engine, repainting only the cells that changed."""
+        if engine.map_size_n != self.map_size_n:
+            raise ValueError("Engine and rasterizer board sizes differ")
+        drawn = self.drawn_cells
+        length = engine.length
+        new_heads = engine.moves - self.drawn_moves if self.drawn_moves is not None else -1
+        freed_tails = len(drawn) + new_heads - length
+        if (not 0 <= new_heads <= length or not 0 <= freed_tails <= len(drawn)
+                # The painted head and tail must still be where this many moves leave them
+                or new_heads < length and drawn and drawn[-1] != engine.body_cell(length - 1 - new_heads)
+                or freed_tails < len(drawn) and drawn[freed_tails] != engine.body_cell(0)):
+            self.redraw(engine) # A new game, a seek, unmake_move, or more moves than the snake is long
+            return self.frame
+
+        occupancy = engine.occupancy
+        if new_heads and drawn:
+            self.put(drawn[-1], TILE_BODY) # The old head
+        for _ in range(freed_tails):
+            cell = drawn.popleft()
+            if not occupancy[cell]:
+                self.put(cell, TILE_EMPTY)
+        for index in range(length - new_heads, length):
+            cell = engine.body_cell(index)
+            drawn.append(cell)
+            self.put(cell, TILE_HEAD if index == length - 1 else TILE_BODY)
+        self.drawn_moves = engine.moves
+
+        food = engine.food_cell
+        if food != self.drawn_food and not engine.won and not occupancy[food]:
+            self.put(food, TILE_FOOD)
+            self.drawn_food = food
+        return self.frame
+
+    def take_dirty_region(self):
+        """Pixel bounds (x0, y0, x1, y1) of everything painted since the last call, or None."""
+        dirty = self.dirty
+        self.dirty = None
+        if dirty is None:
+            return None
+        px = self.cell_px
+        return dirty[0] * px, dirty[1] * px, dirty[2] * px, dirty[3] * px
+
+
+class RawFrameWriter:
+    """rgb24 frames back to back, to a file or to stdout ("-")."""
+
+    def __init__(self, path, width, height):
+        self.path = path
+        self.file = sys.stdout.buffer if path == "-" else open(path, "wb")
+        frame_bytes = width * height * 3
+        self.buffer = np.empty((max(1, CHUNK_BYTES // frame_bytes), height, width, 3), dtype=np.uint8)
+        self.buffered = 0
+        self.frames = 0
+        self.bytes_written = 0
+
+    def write(self, frame, region=None):
+        self.buffer[self.buffered] = frame
+        self.buffered += 1
+        self.frames += 1
+        if self.buffered == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        if self.buffered:
+            data = memoryview(self.buffer[:self.buffered]).cast("B")
+            self.file.write(data)
+            self.bytes_written += len(data)
+            self.buffered = 0
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        if self.file is not sys.stdout.buffer:
+            self.file.close()
+
+
+class PpmSequenceWriter:
+    """One binary PPM per frame. pattern is a path with a %d placeholder for the frame number, or a directory."""
+
+    def __init__(self, pattern, width, height):
+        if "%" not in pattern:
+            root, extension = os.path.splitext(pattern)
+            if extension.lower() == ".ppm":
+                pattern = root + "_%06d" + extension # game.ppm -> game_000000.ppm, ...
+            else:
+                pattern = os.path.join(pattern, "frame_%06d.ppm") # A directory
+                os.makedirs(os.path.dirname(pattern), exist_ok=True)
+        self.pattern = pattern
+        self.header = b"P6 %d %d 255\n" % (width, height)
+        self.frames = 0
+        self.bytes_written = 0
+
+    def write(self, frame, region=None):
+        with open(self.pattern % self.frames, "wb") as f:
+            f.write(self.header)
+            f.write(memoryview(frame).cast("B"))
+        self.frames += 1
+        self.bytes_written += len(self.header) + frame.nbytes
+
+    def close(self):
+        pass
+
+
+class GifWriter:
+    """Animated GIF. Frames after the first cover only the region passed to write()."""
+
+    def __init__(self, path, width, height, colors, frame_ms=GAME_SPEED, loop=True):
+        if len(colors) > GIF_PALETTE_SIZE:
+            raise ValueError(f"A GIF frame can use at most {GIF_PALETTE_SIZE} colors")
+        self.file = open(path, "wb")
+        self.width = width
+        self.height = height
+        self.frame_ms = frame_ms
+        self.frames = 0
+        self.bytes_written = 0
+        self.pending = bytearray()
+        # Colors are looked up by their packed 24-bit value
+        self.color_keys = np.array([r << 16 | g << 8 | b for r, g, b in colors.tolist()], dtype=np.uint32)
+        self.color_order = np.argsort(self.color_keys)
+        palette = np.zeros((GIF_PALETTE_SIZE, 3), dtype=np.uint8)
+        palette[:len(colors)] = colors
+
+        # Global color table of 2 ** (6 + 1) entries, 8 bits per primary
+        self.pending += b"GIF89a" + struct.pack("<HHBBB", width, height, 0xF6, 0, 0) + palette.tobytes()
+        if loop:
+            self.pending += b"\x21\xFF\x0BNETSCAPE2.0\x03\x01\x00\x00\x00"
+
+    def color_indexes(self, pixels):
+        keys = (pixels[..., 0].astype(np.uint32) << 16 | pixels[..., 1].astype(np.uint32) << 8
+                | pixels[..., 2]).ravel()
+        positions = np.searchsorted(self.color_keys[self.color_order], keys)
+        return self.color_order[positions].astype(np.uint8)
+
+    def image_data(self, indexes):
+        """LZW data sub-blocks for the palette indexes, stored as literal codes."""
+        count = len(indexes)
+        clears = -(-count // GIF_LITERALS_PER_CLEAR) or 1
+        codes = np.empty(count + clears + 1, dtype=np.uint8)
+        positions = np.arange(count)
+        positions += positions // GIF_LITERALS_PER_CLEAR + 1
+        codes[positions] = indexes
+        codes[np.arange(clears) * (GIF_LITERALS_PER_CLEAR + 1)] = GIF_CLEAR_CODE
+        codes[-1] = GIF_END_CODE
+
+        full_blocks, rest = divmod(len(codes), 255)
+        blocks = np.empty((full_blocks, 256), dtype=np.uint8)
+        blocks[:, 0] = 255
+        blocks[:, 1:] = codes[:full_blocks * 255].reshape(full_blocks, 255)
+        data = bytes([GIF_MIN_CODE_SIZE]) + blocks.tobytes()
+        if rest:
+            data += bytes([rest]) + codes[full_blocks * 255:].tobytes()
+        return data + b"\x00"
+
+    def write(self, frame, region=None):
+        if self.frames == 0:
+            region = (0, 0, self.width, self.height)
+        elif region is None:
+            region = (0, 0, 1, 1) # Nothing changed; the frame still has to carry its delay
+        x0, y0, x1, y1 = region
+        # Whole centiseconds, rounded so the total stays in step with frame_ms
+        delay = round((self.frames + 1) * self.frame_ms / 10) - round(self.frames * self.frame_ms / 10)
+        # Graphic control extension: keep the previous frame under this one (disposal 1)
+        self.pending += b"\x21\xF9\x04\x04" + struct.pack("<H", delay) + b"\x00\x00"
+        self.pending += b"\x2C" + struct.pack("<HHHHB", x0, y0, x1 - x0, y1 - y0, 0)
+        self.pending += self.image_data(self.color_indexes(frame[y0:y1, x0:x1]))
+        self.frames += 1
+        if len(self.pending) >= CHUNK_BYTES:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.pending)
+        self.bytes_written += len(self.pending)
+        self.pending.clear()
+
+    def close(self):
+        self.pending += b"\x3B"
+        self.flush()
+        self.file.close()
+
+
+def open_writer(path, output_format, rasterizer, frame_ms):
+    if output_format is None:
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".gif":
+            output_format = "gif"
+        elif extension == ".ppm" or "%" in path or path.endswith(os.sep) or os.path.isdir(path):
+            output_format = "ppm"
+        else:
+            output_format = "raw"
+    if output_format == "gif":
+        return GifWriter(path, rasterizer.width, rasterizer.height, rasterizer.colors, frame_ms)
+    if output_format == "ppm":
+        return PpmSequenceWriter(path, rasterizer.width, rasterizer.height)
+    return RawFrameWriter(path, rasterizer.width, rasterizer.height)
+
+
+def export_game(engine, advance, rasterizer, writer, every=1, max_frames=None):
+    """Writes a frame of engine every `every` ticks until advance() reports the game over.
+
+    advance() plays one tick and returns True once the game is over. Returns the number of frames.
+    """
+    frames = 0
+    done = False
+    while not done and (max_frames is None or frames < max_frames):
+        writer.write(rasterizer.update(engine), rasterizer.take_dirty_region())
+        frames += 1
+        for _ in range(every):
+            done = advance()
+            if done:
+                break
+    if done and (max_frames is None or frames < max_frames):
+        writer.write(rasterizer.update(engine), rasterizer.take_dirty_region()) # The final position
+        frames += 1
+    return frames
+
+
+def autopilot_advance(engine, max_ticks=None):
+    autopilot = Autopilot(engine)
+
+    def advance():
+        if not engine.game_over_flag and (max_ticks is None or engine.ticks < max_ticks):
+            engine.change_direction_code(autopilot.next_direction())
+            engine.step()
+        return engine.game_over_flag or (max_ticks is not None and engine.ticks >= max_ticks)
+    return advance
+
+
+def bench(map_size_n, frames, cell_px):
+    """Times rasterizing an autopilot game, then encoding its frames for each writer."""
+    engine = SnakeEngine(map_size_n, True, seed=0)
+    advance = autopilot_advance(engine)
+    rasterizer = FrameRasterizer(map_size_n, cell_px=cell_px)
+    rasterizer.update(engine)
+    game_seconds = raster_seconds = 0.0
+    for _ in range(frames):
+        start = time.perf_counter()
+        if advance():
+            engine.reset(0)
+            advance = autopilot_advance(engine)
+            rasterizer.invalidate()
+        middle = time.perf_counter()
+        rasterizer.update(engine)
+        rasterizer.take_dirty_region()
+        raster_seconds += time.perf_counter() - middle
+        game_seconds += middle - start
+    print(f"{map_size_n}x{map_size_n} board, {rasterizer.width}x{rasterizer.height} px: "
+          f"{frames / raster_seconds:.0f} frames/s rasterized ({raster_seconds / frames * 1e6:.1f} us/frame, "
+          f"{rasterizer.full_redraws} full redraws), game logic {game_seconds / frames * 1e6:.1f} us/tick")
+
+    for output_format, path in (("raw", os.devnull), ("gif", os.devnull)):
+        engine.reset(0)
+        rasterizer.invalidate()
+        writer = open_writer(path, output_format, rasterizer, GAME_SPEED)
+        start = time.perf_counter()
+        count = export_game(engine, autopilot_advance(engine), rasterizer, writer, max_frames=frames)
+        writer.close()
+        seconds = time.perf_counter() - start
+        print(f"{output_format}: {count / seconds:.0f} frames/s exported, {writer.bytes_written / count / 1024:.1f} KiB/frame")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render snake games to image sequences, GIFs or raw video frames.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    replay_parser = subparsers.add_parser("replay", help="render a recorded replay")
+    replay_parser.add_argument("replay")
+    autopilot_parser = subparsers.add_parser("autopilot", help="render a game played by the autopilot")
+    autopilot_parser.add_argument("--size", type=int, default=INITIAL_MAP_SIZE_N)
+    autopilot_parser.add_argument("--level", help="level file to play on (sets the size)")
+    autopilot_parser.add_argument("--no-wrapping", action="store_true")
+    autopilot_parser.add_argument("--seed", type=int)
+    autopilot_parser.add_argument("--ticks", type=int, help="stop after this many ticks")
+    autopilot_parser.add_argument("--speed-ms", type=int, default=GAME_SPEED, help="tick length shown in GIFs")
+    for sub in (replay_parser, autopilot_parser):
+        sub.add_argument("output", help="file (.gif, .rgb) or directory / %%d pattern for PPM frames; - for raw to stdout")
+        sub.add_argument("--format", choices=["raw", "ppm", "gif"], help="default: from the output name")
+        sub.add_argument("--color", choices=list(SNAKE_COLOR_PALETTES), default="Green")
+        sub.add_argument("--grid-brightness", type=int, default=0)
+        sub.add_argument("--cell-px", type=int, default=SEGMENT_SIZE)
+        sub.add_argument("--every", type=int, default=1, help="write a frame every this many ticks")
+    bench_parser = subparsers.add_parser("bench")
+    bench_parser.add_argument("--size", type=int, default=INITIAL_MAP_SIZE_N)
+    bench_parser.add_argument("--frames", type=int, default=20000)
+    bench_parser.add_argument("--cell-px", type=int, default=SEGMENT_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        bench(args.size, args.frames, args.cell_px)
+        return
+    if args.cell_px < MIN_CELL_PX:
+        parser.error(f"--cell-px must be at least {MIN_CELL_PX}")
+    if args.every < 1:
+        parser.error("--every must be at least 1")
+
+    if args.command == "replay":
+        replay = Replay.load(args.replay)
+        try:
+            player = ReplayPlayer(replay)
+        except ReplayError as e:
+            print(f"Warning: {e}")
+            sys.exit(1)
+        engine = player.engine
+        frame_ms = replay.speed_ms or GAME_SPEED
+
+        def advance():
+            if engine.ticks < replay.ticks:
+                player.step()
+            return engine.game_over_flag or engine.ticks >= replay.ticks
+    else:
+        level = None
+        if args.level is not None:
+            try:
+                level = Level.open(args.level)
+            except (LevelError, OSError) as e:
+                print(f"Warning: {e}")
+                sys.exit(1)
+        engine = SnakeEngine(level.map_size_n if level else args.size, not args.no_wrapping, seed=args.seed, level=level)
+        frame_ms = args.speed_ms
+        advance = autopilot_advance(engine, args.ticks)
+
+    rasterizer = FrameRasterizer(engine.map_size_n, args.color, args.grid_brightness, args.cell_px)
+    writer = open_writer(args.output, args.format, rasterizer, frame_ms * args.every)
+    start = time.perf_counter()
+    try:
+        frames = export_game(engine, advance, rasterizer, writer, args.every)
+    finally:
+        writer.close()
+    seconds = time.perf_counter() - start
+    print(f"Info: {frames} frames ({rasterizer.width}x{rasterizer.height}) of {engine.ticks} ticks, score {engine.score}, "
+          f"in {seconds:.2f}s ({frames / seconds:.0f} frames/s, {writer.bytes_written / 1048576:.1f} MiB)",
+          file=sys.stderr if args.output == "-" else sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+"""Compact deterministic replays with keyframe seeking.
+
+A game is fully determined by its seed, its settings and the direction the
+snake moved in on each tick, so a replay stores only those. Direction
+changes are run-length encoded as varints of (ticks since the previous
+change << 2 | direction code). Keyframes (full engine snapshots every
+keyframe_interval ticks) let a player jump to any tick after simulating at
+most one interval, and verify_replay re-runs a replay headless to audit
+its recorded score.
+
+Games on a level (see snake_level.py) record the level's path and a
+checksum of its walls, and the player reopens it from there. A relative
+path is taken relative to the replay file's directory (the game saves
+its replay next to where it found the level directory).
+
+File layout (little endian):
+    header      see HEADER
+    level       see LEVEL_FIELD, then path_bytes of UTF-8 level path (version 2 on)
+    inputs      input_bytes of varints
+    index       keyframe_count x KEYFRAME_ENTRY (tick, input index, blob length)
+    keyframes   zlib-compressed snapshots, in index order
+
+    python snake_replay.py verify last_replay.snkr
+    python snake_replay.py seek last_replay.snkr 50000
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+from snake_engine import SnakeEngine, DEATH_WALL, DEATH_SELF, NO_CELL, DIRECTION_NAMES, DIRECTION_CODES
+from snake_level import Level, LevelError
+from snake_storage import atomic_write
+
+MAGIC = b"SNKR"
+VERSION = 2
+READABLE_VERSIONS = (1, 2) # Version 1 replays have no level field
+KEYFRAME_INTERVAL = 4096 # Ticks between keyframes
+
+# Recorded outcome of the game
+OUTCOME_UNFINISHED = 0
+OUTCOME_WALL = 1
+OUTCOME_SELF = 2
+OUTCOME_WON = 3
+
+# magic, version, wrapping, map_size_n, speed_ms, seed, ticks, score, outcome,
+# keyframe_interval, keyframe_count, input_bytes
+HEADER = struct.Struct("<4sBBHHQIIBIII")
+# has level, CRC-32 of the level's wall bitmap, path_bytes
+LEVEL_FIELD = struct.Struct("<BIH")
+KEYFRAME_ENTRY = struct.Struct("<III")
+# tick, moves, score, direction, new_direction, food x, food y, body length, free cell count
+KEYFRAME_STATE = struct.Struct("<IIIBBHHII")
+
+
+class ReplayError(Exception):
+    pass
+
+
+def engine_outcome(engine):
+    if engine.won:
+        return OUTCOME_WON
+    if engine.death_cause == DEATH_WALL:
+        return OUTCOME_WALL
+    if engine.death_cause == DEATH_SELF:
+        return OUTCOME_SELF
+    return OUTCOME_UNFINISHED
+
+
+def encode_varint(value, out):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_inputs(data):
+    """Decodes the input stream into parallel lists of change ticks and direction names."""
+    ticks = []
+    directions = []
+    tick = 0
+    value = 0
+    shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        tick += value >> 2
+        ticks.append(tick)
+        directions.append(DIRECTION_NAMES[value & 3])
+        value = 0
+        shift = 0
+    if shift:
+        raise ReplayError("Truncated input stream")
+    return ticks, directions
+
+
+def snapshot_engine(engine, input_index):
+    """Serializes everything needed to resume engine exactly (including its RNG)."""
+    body = array("I", engine.body_cells())
+    free_cells = array("I", engine.free_cells[:engine.free_count])
+    rng_state = engine.rng.getstate()
+    state = KEYFRAME_STATE.pack(
+        engine.ticks, engine.moves, engine.score,
+        engine.direction_code, engine.new_direction_code,
+        engine.food_coords[0], engine.food_coords[1], len(body), len(free_cells),
+    )
+    blob = state + body.tobytes() + free_cells.tobytes() + array("I", rng_state[1]).tobytes()
+    return zlib.compress(blob), input_index
+
+
+def restore_engine(engine, blob):
+    """Loads a snapshot_engine() blob into an engine built with the same settings."""
+    data = zlib.decompress(blob)
+    (ticks, moves, score, direction, new_direction,
+     food_x, food_y, body_length, free_count) = KEYFRAME_STATE.unpack_from(data)
+    offset = KEYFRAME_STATE.size
+    body = array("I")
+    body.frombytes(data[offset:offset + 4 * body_length])
+    offset += 4 * body_length
+    free_cells = array("I")
+    free_cells.frombytes(data[offset:offset + 4 * free_count])
+    offset += 4 * free_count
+    rng_words = array("I")
+    rng_words.frombytes(data[offset:])
+
+    engine.game_over_flag = False # Keyframes are only taken while the game is running
+    engine.death_cause = None
+    engine.won = False
+    engine.ticks = ticks
+    engine.moves = moves
+    engine.score = score
+    engine.direction_code = direction
+    engine.new_direction_code = new_direction
+    engine.food_cell = engine.cell_id(food_x, food_y)
+    engine.freed_tail_cell = NO_CELL
+    # The free list order decides where food lands next, so restore it as saved
+    engine.occupancy[:] = bytes(engine.cell_count)
+    engine.length = 0
+    engine.head_index = engine.cell_count - 1
+    for cell in body:
+        engine.head_index = (engine.head_index + 1) % engine.cell_count
+        engine.body[engine.head_index] = cell
+        engine.length += 1
+        engine.occupancy[cell] += 1
+    engine.free_count = free_count
+    for pos, cell in enumerate(free_cells):
+        engine.free_cells[pos] = cell
+        engine.free_cell_pos[cell] = pos
+    engine.rng.setstate((3, tuple(rng_words), None))
+    return engine
+
+
+class Replay:
+    def __init__(self, seed, map_size_n, screen_wrapping_enabled, speed_ms=0, ticks=0, score=0,
+                 outcome=OUTCOME_UNFINISHED, keyframe_interval=KEYFRAME_INTERVAL,
+                 input_ticks=None, input_directions=None, keyframes=None, level_path=None, level_crc=0):
+        self.seed = seed
+        self.map_size_n = map_size_n
+        self.screen_wrapping_enabled = screen_wrapping_enabled
+        self.speed_ms = speed_ms
+        self.ticks = ticks
+        self.score = score
+        self.outcome = outcome
+        self.keyframe_interval = keyframe_interval
+        self.input_ticks = input_ticks if input_ticks is not None else []
+        self.input_directions = input_directions if input_directions is not None else []
+        self.keyframes = keyframes if keyframes is not None else [] # (tick, input_index, blob)
+        self.level_path = level_path # None for the empty board, "" for a level that was never saved
+        self.level_crc = level_crc
+        self.directory = None # Where the replay was loaded from; relative level paths start there
+
+    def to_bytes(self):
+        inputs = bytearray()
+        previous_tick = 0
+        for tick, direction in zip(self.input_ticks, self.input_directions):
+            encode_varint(((tick - previous_tick) << 2) | DIRECTION_CODES[direction], inputs)
+            previous_tick = tick
+
+        header = HEADER.pack(MAGIC, VERSION, int(self.screen_wrapping_enabled), self.map_size_n,
+                             self.speed_ms, self.seed, self.ticks, self.score, self.outcome,
+                             self.keyframe_interval, len(self.keyframes), len(inputs))
+        path = (self.level_path or "").encode()
+        level = LEVEL_FIELD.pack(self.level_path is not None, self.level_crc, len(path)) + path
+        index = b"".join(KEYFRAME_ENTRY.pack(tick, input_index, len(blob))
+                         for tick, input_index, blob in self.keyframes)
+        return header + level + bytes(inputs) + index + b"".join(blob for _, _, blob in self.keyframes)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ReplayError("Replay is too short")
+        (magic, version, wrapping, map_size_n, speed_ms, seed, ticks, score, outcome,
+         keyframe_interval, keyframe_count, input_bytes) = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ReplayError("Not a snake replay")
+        if version not in READABLE_VERSIONS:
+            raise ReplayError(f"Unsupported replay version {version}")
+
+        offset = HEADER.size
+        level_path = None
+        level_crc = 0
+        if version >= 2:
+            if len(data) < offset + LEVEL_FIELD.size:
+                raise ReplayError("Replay is too short")
+            has_level, level_crc, path_bytes = LEVEL_FIELD.unpack_from(data, offset)
+            offset += LEVEL_FIELD.size
+            if has_level:
+                level_path = data[offset:offset + path_bytes].decode("utf-8", "replace")
+            offset += path_bytes
+        input_ticks, input_directions = decode_inputs(data[offset:offset + input_bytes])
+        offset += input_bytes
+
+        entries = []
+        for _ in range(keyframe_count):
+            entries.append(KEYFRAME_ENTRY.unpack_from(data, offset))
+            offset += KEYFRAME_ENTRY.size
+        keyframes = []
+        for tick, input_index, length in entries:
+            keyframes.append((tick, input_index, data[offset:offset + length]))
+            offset += length
+
+        return cls(seed, map_size_n, bool(wrapping), speed_ms, ticks, score, outcome,
+                   keyframe_interval, input_ticks, input_directions, keyframes, level_path, level_crc)
+
+    def save(self, path):
+        atomic_write(path, self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            replay = cls.from_bytes(f.read())
+        replay.directory = os.path.dirname(os.path.abspath(path))
+        return replay
+
+
+class ReplayRecorder:
+    """Records a game as it is played. Call record_tick() after every tick's collision check."""
+
+    def __init__(self, engine, speed_ms=0, keyframe_interval=KEYFRAME_INTERVAL):
+        self.engine = engine
+        self.replay = Replay(engine.seed, engine.map_size_n, engine.screen_wrapping_enabled,
+                             speed_ms, keyframe_interval=keyframe_interval)
+        if engine.level is not None:
+            self.replay.level_path = engine.level.path or ""
+            self.replay.level_crc = zlib.crc32(engine.level.walls)
+        self.last_direction_code = engine.direction_code
+
+    def record_tick(self):
+        engine = self.engine
+        replay = self.replay
+        if engine.direction_code != self.last_direction_code:
+            replay.input_ticks.append(engine.ticks)
+            replay.input_directions.append(DIRECTION_NAMES[engine.direction_code])
+            self.last_direction_code = engine.direction_code
+        # No keyframe of a finished game: restore_engine resumes a running one. check_collisions catches
+        # a self-collision the caller has not flagged yet.
+        if (engine.ticks % replay.keyframe_interval == 0 and not engine.game_over_flag
+                and not engine.check_collisions()):
+            blob, input_index = snapshot_engine(engine, len(replay.input_ticks))
+            replay.keyframes.append((engine.ticks, input_index, blob))
+
+    def finish(self):
+        """Returns the replay, stamped with the engine's current score and outcome."""
+        self.replay.ticks = self.engine.ticks
+        self.replay.score = self.engine.score
+        self.replay.outcome = engine_outcome(self.engine)
+        return self.replay
+
+
+class ReplayPlayer:
+    """Re-simulates a replay headless; seek() starts from the nearest earlier keyframe.
+
+    Replays on a level reopen it from its recorded path unless level is given.
+    """
+
+    def __init__(self, replay, level=None):
+        self.replay = replay
+        if level is None and replay.level_path is not None:
+            if not replay.level_path:
+                raise ReplayError("Replay was played on a level that was never saved")
+            level_path = replay.level_path
+            if replay.directory is not None:
+                level_path = os.path.join(replay.directory, level_path) # Keeps absolute paths as they are
+            try:
+                level = Level.open(level_path)
+            except (LevelError, OSError) as e:
+                raise ReplayError(f"Cannot open the replay's level: {e}") from None
+        if level is not None and zlib.crc32(level.walls) != replay.level_crc:
+            raise ReplayError("Replay was recorded on different walls than this level has")
+        self.engine = SnakeEngine(replay.map_size_n, replay.screen_wrapping_enabled, seed=replay.seed, level=level)
+        self.input_index = 0
+
+    def restart(self):
+        self.engine.reset(self.replay.seed)
+        self.input_index = 0
+
+    def step(self):
+        """Plays the next recorded tick. Returns True once the game is over."""
+        replay = self.replay
+        action = None
+        if self.input_index < len(replay.input_ticks) and replay.input_ticks[self.input_index] == self.engine.ticks + 1:
+            action = replay.input_directions[self.input_index]
+            self.input_index += 1
+        return self.engine.step(action)
+
+    def seek(self, tick):
+        """Moves to the state right after the given tick and returns the engine."""
+        tick = max(0, min(tick, self.replay.ticks))
+        if tick < self.engine.ticks:
+            self.restart()
+
+        # Jump to the last keyframe at or before tick, if it is ahead of where we are
+        keyframe = None
+        for entry in self.replay.keyframes:
+            if entry[0] > tick:
+                break
+            keyframe = entry
+        if keyframe is not None and keyframe[0] > self.engine.ticks:
+            restore_engine(self.engine, keyframe[2])
+            self.input_index = keyframe[1]
+
+        while self.engine.ticks < tick and not self.step():
+            pass
+        return self.engine
+
+    def play_to_end(self):
+        while self.engine.ticks < self.replay.ticks and not self.step():
+            pass
+        return self.engine
+
+
+def verify_replay(replay, level=None):
+    """Re-runs a replay from tick 0 and checks the recorded score, length and outcome.
+
+    Returns (ok, message).
+    """
+    engine = ReplayPlayer(replay, level).play_to_end()
+    actual = (engine.score, engine.ticks, engine_outcome(engine))
+    recorded = (replay.score, replay.ticks, replay.outcome)
+    if actual != recorded:
+        return False, f"Mismatch: recorded score/ticks/outcome {recorded}, replayed {actual}"
+    return True, f"OK: score {engine.score} after {engine.ticks} ticks"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect, verify and seek snake replays.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command in ("info", "verify"):
+        sub = subparsers.add_parser(command)
+        sub.add_argument("path")
+    seek_parser = subparsers.add_parser("seek")
+    seek_parser.add_argument("path")
+    seek_parser.add_argument("tick", type=int)
+    args = parser.parse_args(argv)
+
+    replay = Replay.load(args.path)
+    if args.command == "info":
+        print(f"seed={replay.seed} map_size_n={replay.map_size_n} wrapping={replay.screen_wrapping_enabled} "
+              f"speed_ms={replay.speed_ms} ticks={replay.ticks} score={replay.score} outcome={replay.outcome} "
+              f"inputs={len(replay.input_ticks)} keyframes={len(replay.keyframes)} level={replay.level_path}")
+        return
+    try:
+        player = ReplayPlayer(replay)
+    except ReplayError as e:
+        print(f"Warning: {e}")
+        sys.exit(1)
+    if args.command == "verify":
+        start = time.perf_counter()
+        ok, message = verify_replay(replay, player.engine.level)
+        print(f"{message} ({(time.perf_counter() - start) * 1000:.1f} ms)")
+        if not ok:
+            sys.exit(1)
+    else:
+        start = time.perf_counter()
+        engine = player.seek(args.tick)
+        print(f"tick {engine.ticks}: score {engine.score}, length {len(engine.snake_segments)}, "
+              f"head {engine.snake_segments[-1]}, food {engine.food_coords} "
+              f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
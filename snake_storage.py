@@ -0,0 +1,267 @@
+"""Persistence off the Tk thread: atomic writes, a background writer and the leaderboard.
+
+Files are written with atomic_write: the data goes to a temporary file
+next to the target, which then replaces it in one rename. A crash leaves
+either the old file or the new one, never half of one.
+
+BackgroundWriter runs save jobs on a single worker thread, in submission
+order, so the game loop and the menu never wait for the disk. Jobs carry
+a key, and a job submitted while another with the same key is still
+queued replaces it. Toggling settings quickly therefore writes
+settings.json once.
+
+The leaderboard is a SQLite table of finished runs. It is indexed by
+(level, map size, speed, wrapping, score), so a top-K query for one setting
+reads K index entries however many runs are stored. Runs are inserted
+by the writer thread on its own connection. Queries run on another
+connection, on the thread that opened the leaderboard. The Tk game opens
+and queries it on the writer thread too, so the Tk thread never touches
+the database. The database is in WAL mode, so reads never wait for a
+write in progress.
+
+    python snake_storage.py top --size 25 --speed Normal --wrapping on
+    python snake_storage.py top --size 40 --level maze
+    python snake_storage.py bench --runs 300000
+"""
+import argparse
+import atexit
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+LEADERBOARD_FILE = "leaderboard.sqlite3"
+TOP_RUNS = 10
+
+TABLE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    map_size_n INTEGER NOT NULL,
+    speed_name TEXT NOT NULL,
+    wrapping INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    ticks INTEGER NOT NULL,
+    seed INTEGER,
+    played_at REAL NOT NULL,
+    level TEXT NOT NULL DEFAULT ''
+);
+"""
+INDEX_SCHEMA = """
+CREATE INDEX IF NOT EXISTS runs_by_level_setting ON runs (level, map_size_n, speed_name, wrapping, score DESC);
+CREATE INDEX IF NOT EXISTS runs_by_score ON runs (score);
+"""
+NO_LEVEL = "" # Level name of runs on the empty board
+# Runs imported from the old single-integer high score file have unknown settings
+LEGACY_MAP_SIZE_N = 0
+LEGACY_SPEED_NAME = ""
+
+
+def atomic_write(path, data):
+    """Replaces path with data (str or bytes) in one rename, after syncing it to disk."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data.encode() if isinstance(data, str) else data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class BackgroundWriter:
+    """Runs save jobs on one daemon thread, in order, coalescing queued jobs with the same key."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.jobs = {} # Key -> (func, description); dicts keep submission order
+        self.busy = False
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name="snake-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.close) # Finish pending saves when the game exits
+
+    def submit(self, key, func, description):
+        """Queues func() to run on the writer thread. description names what failed in warnings."""
+        with self.condition:
+            if self.closed:
+                return
+            self.jobs[key] = (func, description) # Replaces a queued job with this key, keeping its place
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.jobs and not self.closed:
+                    self.condition.wait()
+                if not self.jobs:
+                    return
+                key = next(iter(self.jobs))
+                func, description = self.jobs.pop(key)
+                self.busy = True
+            try:
+                func()
+            except (OSError, sqlite3.Error) as e:
+                print(f"Warning: Could not save {description} ({e})")
+            finally:
+                with self.condition:
+                    self.busy = False
+                    self.condition.notify_all()
+
+    def flush(self, timeout=None):
+        """Waits until every queued job has run. Returns False on timeout."""
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.jobs and not self.busy, timeout)
+
+    def close(self, timeout=10):
+        """Runs the remaining jobs and stops the thread."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
+
+
+class Leaderboard:
+    """Finished runs, keyed by map size, speed and wrapping.
+
+    Writes go through writer (or run inline without one); queries run on
+    the thread that opened it and take well under a millisecond.
+    """
+
+    def __init__(self, path=LEADERBOARD_FILE, writer=None, legacy_high_score_file=None):
+        self.path = path
+        self.writer = writer
+        self.write_connection = None # Only ever used on the writer thread
+        self.run_keys = itertools.count() # Runs are never coalesced: each one gets its own writer key
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(TABLE_SCHEMA)
+        self.add_level_column()
+        self.connection.executescript(INDEX_SCHEMA)
+        if legacy_high_score_file is not None:
+            self.import_legacy_high_score(legacy_high_score_file)
+
+    def add_level_column(self):
+        """Upgrades leaderboards from before levels: their runs were all on the empty board."""
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(runs)")]
+        if "level" not in columns:
+            with self.connection:
+                self.connection.execute("ALTER TABLE runs ADD COLUMN level TEXT NOT NULL DEFAULT ''")
+                self.connection.execute("DROP INDEX IF EXISTS runs_by_setting") # Superseded by runs_by_level_setting
+
+    def import_legacy_high_score(self, path):
+        """Keeps the old highscore.txt score as a run with unknown settings, once."""
+        if self.connection.execute("SELECT 1 FROM runs LIMIT 1").fetchone() is not None:
+            return
+        try:
+            with open(path, "r") as f:
+                score = int(f.read())
+        except (FileNotFoundError, ValueError):
+            return
+        if score > 0:
+            # Inserted inline, not through the writer: the imported score must count in the very next query
+            self.insert_run((LEGACY_MAP_SIZE_N, LEGACY_SPEED_NAME, 0, score, 0, None, time.time(), NO_LEVEL))
+
+    def insert_run(self, row):
+        if self.write_connection is None:
+            self.write_connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self.write_connection:
+            self.write_connection.execute(
+                "INSERT INTO runs (map_size_n, speed_name, wrapping, score, ticks, seed, played_at, level) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row)
+
+    def record_run(self, map_size_n, speed_name, wrapping, score, ticks, seed, level=NO_LEVEL):
+        row = (map_size_n, speed_name, int(wrapping), score, ticks, seed, time.time(), level)
+        if self.writer is None:
+            self.insert_run(row)
+        else:
+            self.writer.submit(("run", next(self.run_keys)), lambda: self.insert_run(row), f"run to {self.path}")
+
+    def top_runs(self, map_size_n, speed_name, wrapping, limit=TOP_RUNS, level=NO_LEVEL):
+        """Best runs for one setting, highest score first, as (score, ticks, seed, played_at) tuples."""
+        return self.connection.execute(
+            "SELECT score, ticks, seed, played_at FROM runs "
+            "WHERE level = ? AND map_size_n = ? AND speed_name = ? AND wrapping = ? "
+            "ORDER BY score DESC LIMIT ?", (level, map_size_n, speed_name, int(wrapping), limit)).fetchall()
+
+    def best_score(self, map_size_n=None, speed_name=None, wrapping=None, level=NO_LEVEL):
+        """Highest score for one setting, or over all runs when no setting is given. 0 without runs."""
+        if map_size_n is None:
+            row = self.connection.execute("SELECT MAX(score) FROM runs").fetchone()
+            return row[0] or 0
+        runs = self.top_runs(map_size_n, speed_name, wrapping, 1, level)
+        return runs[0][0] if runs else 0
+
+    def count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+
+def bench(runs, queries):
+    """Fills a throwaway leaderboard with runs and times top-K queries on it."""
+    with tempfile.TemporaryDirectory() as directory:
+        leaderboard = Leaderboard(os.path.join(directory, LEADERBOARD_FILE))
+        rng = random.Random(0)
+        settings = [(n, speed, wrapping) for n in range(10, 51) for speed in ("Slow", "Normal", "Fast")
+                    for wrapping in (0, 1)]
+        start = time.perf_counter()
+        with leaderboard.connection:
+            leaderboard.connection.executemany(
+                "INSERT INTO runs (map_size_n, speed_name, wrapping, score, ticks, seed, played_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((*rng.choice(settings), rng.randrange(500), rng.randrange(100000), rng.getrandbits(63), time.time())
+                 for _ in range(runs)))
+        insert_seconds = time.perf_counter() - start
+
+        timings = []
+        for _ in range(queries):
+            setting = rng.choice(settings)
+            start = time.perf_counter()
+            leaderboard.top_runs(*setting)
+            timings.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        best = leaderboard.best_score()
+        best_seconds = time.perf_counter() - start
+        leaderboard.connection.close()
+    timings.sort()
+    print(f"{runs} runs inserted in {insert_seconds:.2f}s; top-{TOP_RUNS} query p50 {timings[len(timings) // 2] * 1000:.3f} ms, "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1000:.3f} ms, max {timings[-1] * 1000:.3f} ms; "
+          f"overall best {best} in {best_seconds * 1000:.3f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query or benchmark the snake leaderboard.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    top_parser = subparsers.add_parser("top")
+    top_parser.add_argument("--path", default=LEADERBOARD_FILE)
+    top_parser.add_argument("--size", type=int, required=True)
+    top_parser.add_argument("--speed", default="Normal")
+    top_parser.add_argument("--wrapping", choices=["on", "off"], default="on")
+    top_parser.add_argument("--limit", type=int, default=TOP_RUNS)
+    top_parser.add_argument("--level", default=NO_LEVEL, help="level name (default: the empty board)")
+    bench_parser = subparsers.add_parser("bench")
+    bench_parser.add_argument("--runs", type=int, default=300000)
+    bench_parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        bench(args.runs, args.queries)
+        return
+    if not os.path.exists(args.path):
+        print(f"Warning: No leaderboard at {args.path}")
+        sys.exit(1)
+    leaderboard = Leaderboard(args.path)
+    for rank, (score, ticks, seed, played_at) in enumerate(
+            leaderboard.top_runs(args.size, args.speed, args.wrapping == "on", args.limit, args.level), 1):
+        print(f"{rank:>3}. {score:>6}  {ticks:>8} ticks  seed {seed}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(played_at))}")
+
+
+if __name__ == "__main__":
+    main()
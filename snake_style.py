@@ -0,0 +1,20 @@
+"""Colors and sizes shared by the Tk game and the headless renderers (Tk-free)."""
+
+SEGMENT_SIZE = 20  # Size of each snake segment and food, in pixels
+BACKGROUND_COLOR = "black"
+SEGMENT_BORDER_COLOR = "#000000" # 1px border drawn around every snake segment
+WALL_COLOR = "#707070" # Level walls and obstacles
+
+SNAKE_COLOR_PALETTES = {
+    "Green": {"body": "#00FF00", "head": "#00AA00", "food": "#FF0000"},
+    "Blue": {"body": "#0000FF", "head": "#0000AA", "food": "#FF0000"},
+    "Purple": {"body": "#800080", "head": "#500050", "food": "#FF0000"},
+    "Pink": {"body": "#FFC0CB", "head": "#FF80A0", "food": "#FF0000"},
+    "Red": {"body": "#FF0000", "head": "#AA0000", "food": "#00FF00"},
+}
+
+
+def grid_color_hex(grid_brightness):
+    """Grey of the grid lines for a brightness setting of 0-100."""
+    rgb_val = int(255 * (grid_brightness / 100.0))
+    return f"#{rgb_val:02x}{rgb_val:02x}{rgb_val:02x}"
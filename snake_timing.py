@@ -0,0 +1,102 @@
+"""Drift-free fixed-timestep scheduling for the game loops.
+
+TickClock targets absolute deadlines on a monotonic clock. Each logic tick
+moves the deadline forward by exactly one period, however long the tick's
+work took, so the tick rate does not drift as the snake grows. Front ends
+ask due_ticks() how many logic ticks to run now (more than one means they
+are behind and should render only once) and delay_ms() how long to sleep.
+pull_forward() makes the next tick due at once (an early tick on a key
+press); later deadlines are then counted from it. fraction() tells a
+renderer running faster than the ticks how far to interpolate.
+"""
+import math
+import time
+
+# Shared by every front end (Tk, curses, the multiplayer server)
+GAME_SPEED = 150   # Milliseconds between game updates (lower is faster)
+MOVE_SPEEDS = {
+    "Slow": 250,
+    "Normal": GAME_SPEED, # Use the existing constant
+    "Fast": 75,
+}
+
+
+class TickClock:
+    def __init__(self, period_ms, max_catch_up=5, clock=time.perf_counter):
+        self.period = period_ms / 1000.0
+        self.max_catch_up = max_catch_up # Ticks run back to back before the backlog is dropped
+        self.clock = clock
+        self.start_time = 0.0
+        self.next_deadline = 0.0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.ticks = 0
+        self.total_lateness = 0.0
+        self.max_lateness = 0.0
+        self.frames_skipped = 0 # Ticks run without a render of their own while catching up
+        self.ticks_dropped = 0 # Ticks given up on when too far behind
+        self.early_ticks = 0 # Ticks pulled forward by pull_forward()
+        self.last_tick_time = 0.0
+
+    def start(self):
+        """Starts the clock; the first tick is due immediately."""
+        now = self.clock()
+        self.start_time = now
+        self.next_deadline = now
+        self.reset_stats()
+
+    def due_ticks(self):
+        """Returns how many logic ticks to run now and advances the deadline past them."""
+        now = self.clock()
+        if now < self.next_deadline:
+            return 0
+
+        behind = int((now - self.next_deadline) / self.period) + 1
+        if behind > self.max_catch_up:
+            self.ticks_dropped += behind - self.max_catch_up
+            self.next_deadline += (behind - self.max_catch_up) * self.period
+            behind = self.max_catch_up
+
+        for k in range(behind):
+            lateness = now - (self.next_deadline + k * self.period)
+            self.total_lateness += lateness
+            if lateness > self.max_lateness:
+                self.max_lateness = lateness
+        self.next_deadline += behind * self.period
+        self.ticks += behind
+        self.frames_skipped += behind - 1
+        self.last_tick_time = now
+        return behind
+
+    def pull_forward(self):
+        """Makes the next tick due now; the one after it is due a full period later."""
+        now = self.clock()
+        if now < self.next_deadline:
+            self.next_deadline = now
+            self.early_ticks += 1
+
+    def fraction(self):
+        """How far (0 to 1) the clock is from the last tick's deadline to the next one, for interpolation."""
+        elapsed = self.clock() - (self.next_deadline - self.period)
+        return min(1.0, max(0.0, elapsed / self.period))
+
+    def delay_ms(self):
+        """Whole milliseconds until the next tick is due (rounded up, so we never wake early)."""
+        # The epsilon keeps float error in the deadline sum from adding a whole millisecond
+        return max(0, math.ceil((self.next_deadline - self.clock()) * 1000 - 1e-6))
+
+    def stats(self):
+        """Achieved tick period and lateness so far, in milliseconds."""
+        ticks = self.ticks
+        elapsed = self.last_tick_time - self.start_time
+        return {
+            "target_ms": self.period * 1000,
+            "achieved_ms": elapsed / (ticks - 1) * 1000 if ticks > 1 else 0.0,
+            "ticks": ticks,
+            "mean_lateness_ms": self.total_lateness / ticks * 1000 if ticks else 0.0,
+            "max_lateness_ms": self.max_lateness * 1000,
+            "frames_skipped": self.frames_skipped,
+            "ticks_dropped": self.ticks_dropped,
+            "early_ticks": self.early_ticks,
+        }
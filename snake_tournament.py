@@ -0,0 +1,212 @@
+"""Multi-process tournament runner for snake policies.
+
+Plays many seeded headless games (SnakeEngine, i.e. the real game rules) for
+every policy, map size and wrapping setting, spread over one worker process
+per core. Workers send back only a small result tuple per game, which is
+folded into one aggregated report.
+
+    python snake_tournament.py --policies greedy random --games 1000 --out report.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+from collections import Counter
+
+from snake_engine import SnakeEngine, DIRECTION_NAMES, NO_CELL, MIN_MAP_SIZE_N, MAX_MAP_SIZE_N
+from snake_autopilot import Autopilot
+
+OUTCOME_WON = "won"
+OUTCOME_TIMEOUT = "timeout" # max_ticks reached, e.g. a policy circling forever with wrapping on
+
+
+def random_policy(seed):
+    """Picks a random direction every tick (180-degree turns are ignored by the game)."""
+    rng = random.Random(seed)
+    directions = list(DIRECTION_NAMES)
+
+    def policy(engine):
+        return rng.choice(directions)
+    return policy
+
+
+def greedy_policy(seed):
+    """Heads for the food along the shortest (wrap-aware) axis, avoiding immediate death."""
+    rng = random.Random(seed)
+
+    def policy(engine):
+        n = engine.map_size_n
+        food_x, food_y = engine.food_coords
+        tail = engine.body_cell(0)
+        best = None
+        best_distance = None
+        for code in range(4):
+            cell = engine.next_cell_id(code)
+            if cell == NO_CELL or code ^ 1 == engine.direction_code:
+                continue
+            # The tail cell is vacated this tick unless the snake eats
+            if engine.occupancy[cell] and not (cell == tail and cell != engine.food_cell):
+                continue
+            y, x = divmod(cell, n)
+            dx, dy = abs(food_x - x), abs(food_y - y)
+            if engine.screen_wrapping_enabled:
+                dx, dy = min(dx, n - dx), min(dy, n - dy)
+            distance = dx + dy + rng.random() # Random tie-break
+            if best is None or distance < best_distance:
+                best, best_distance = code, distance
+        return DIRECTION_NAMES[best] if best is not None else None
+    return policy
+
+
+def autopilot_policy(seed):
+    """The in-game autopilot: a Hamiltonian cycle with A* shortcuts (deterministic, seed unused)."""
+    planner = None
+
+    def policy(engine):
+        nonlocal planner
+        if planner is None or planner.engine is not engine:
+            planner = Autopilot(engine) # Plans for one game, built on its first tick
+        return DIRECTION_NAMES[planner.next_direction()]
+    return policy
+
+
+POLICIES = {
+    "random": random_policy,
+    "greedy": greedy_policy,
+    "autopilot": autopilot_policy,
+}
+
+
+def play_game(task):
+    """Plays one game in a worker. Returns (policy, map_size_n, wrapping, seed, score, length, ticks, outcome)."""
+    policy_name, map_size_n, wrapping, seed, max_ticks = task
+    engine = SnakeEngine(map_size_n, wrapping, seed=seed)
+    policy = POLICIES[policy_name](seed)
+    while not engine.step(policy(engine)):
+        if engine.ticks >= max_ticks:
+            break
+
+    if engine.won:
+        outcome = OUTCOME_WON
+    elif engine.game_over_flag:
+        outcome = engine.death_cause
+    else:
+        outcome = OUTCOME_TIMEOUT
+    return (policy_name, map_size_n, wrapping, seed,
+            engine.score, len(engine.snake_segments), engine.ticks, outcome)
+
+
+def make_tasks(policies, map_sizes, wrapping_options, games, base_seed=0, max_ticks=None):
+    """Yields one task per game. Every setting plays the same seeds so policies are compared fairly."""
+    for policy_name in policies:
+        for map_size_n in map_sizes:
+            ticks_limit = max_ticks or 100 * map_size_n * map_size_n
+            for wrapping in wrapping_options:
+                for k in range(games):
+                    yield (policy_name, map_size_n, wrapping, base_seed + k, ticks_limit)
+
+
+def new_setting_stats():
+    return {"games": 0, "total_score": 0, "max_score": 0, "total_length": 0, "total_ticks": 0,
+            "outcomes": Counter()}
+
+
+def run_tournament(policies, map_sizes, wrapping_options, games, workers=None, base_seed=0,
+                   max_ticks=None, chunksize=64, on_result=None):
+    """Plays every game on a process pool and returns the aggregated report.
+
+    on_result, if given, is called with each per-game result tuple as it streams in.
+    """
+    for policy_name in policies:
+        if policy_name not in POLICIES:
+            raise ValueError(f"Unknown policy '{policy_name}'. Choose from: {', '.join(POLICIES)}")
+
+    workers = workers or os.cpu_count() or 1
+    tasks = make_tasks(policies, map_sizes, wrapping_options, games, base_seed, max_ticks)
+    stats = {}
+    total_games = 0
+    total_ticks = 0
+    start = time.perf_counter()
+
+    with multiprocessing.Pool(workers) as pool:
+        for result in pool.imap_unordered(play_game, tasks, chunksize):
+            policy_name, map_size_n, wrapping, seed, score, length, ticks, outcome = result
+            setting = stats.setdefault((policy_name, map_size_n, wrapping), new_setting_stats())
+            setting["games"] += 1
+            setting["total_score"] += score
+            setting["max_score"] = max(setting["max_score"], score)
+            setting["total_length"] += length
+            setting["total_ticks"] += ticks
+            setting["outcomes"][outcome] += 1
+            total_games += 1
+            total_ticks += ticks
+            if on_result:
+                on_result(result)
+
+    elapsed = time.perf_counter() - start
+    settings = []
+    for (policy_name, map_size_n, wrapping), setting in sorted(stats.items()):
+        count = setting["games"]
+        settings.append({
+            "policy": policy_name,
+            "map_size_n": map_size_n,
+            "screen_wrapping_enabled": wrapping,
+            "games": count,
+            "mean_score": setting["total_score"] / count,
+            "max_score": setting["max_score"],
+            "mean_length": setting["total_length"] / count,
+            "mean_ticks": setting["total_ticks"] / count,
+            "outcomes": dict(setting["outcomes"]),
+        })
+    return {
+        "workers": workers,
+        "games": total_games,
+        "ticks": total_ticks,
+        "seconds": elapsed,
+        "ticks_per_second": total_ticks / elapsed if elapsed else 0.0,
+        "settings": settings,
+    }
+
+
+def parse_map_sizes(text):
+    """Parses "10-50" (every size), "10-50:5" (every 5th) or "10,25,50"."""
+    if "-" in text:
+        bounds, _, stride = text.partition(":")
+        low, high = (int(v) for v in bounds.split("-"))
+        return list(range(low, high + 1, int(stride or 1)))
+    return [int(v) for v in text.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a multi-process snake policy tournament.")
+    parser.add_argument("--policies", nargs="+", default=["greedy"], choices=sorted(POLICIES))
+    parser.add_argument("--sizes", default=f"{MIN_MAP_SIZE_N}-{MAX_MAP_SIZE_N}", type=parse_map_sizes,
+                        help="Map sizes, e.g. 10-50, 10-50:10 or 10,25,50")
+    parser.add_argument("--wrapping", choices=["on", "off", "both"], default="both")
+    parser.add_argument("--games", type=int, default=100, help="Games per policy, size and wrapping setting")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per core)")
+    parser.add_argument("--seed", type=int, default=0, help="First game seed")
+    parser.add_argument("--max-ticks", type=int, default=None, help="Tick limit per game (default: 100 x board area)")
+    parser.add_argument("--out", default=None, help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    wrapping_options = {"on": [True], "off": [False], "both": [True, False]}[args.wrapping]
+    report = run_tournament(args.policies, args.sizes, wrapping_options, args.games,
+                            workers=args.workers, base_seed=args.seed, max_ticks=args.max_ticks)
+
+    for setting in report["settings"]:
+        print(f"{setting['policy']:>8} n={setting['map_size_n']:<3} wrap={'on ' if setting['screen_wrapping_enabled'] else 'off'}"
+              f" games={setting['games']:<6} mean={setting['mean_score']:7.2f} max={setting['max_score']:<5}"
+              f" ticks={setting['mean_ticks']:9.1f} {setting['outcomes']}")
+    print(f"{report['games']} games, {report['ticks']} ticks in {report['seconds']:.2f}s "
+          f"({report['ticks_per_second']:.0f} ticks/s on {report['workers']} workers)")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
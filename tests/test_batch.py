@@ -0,0 +1,44 @@
+"""BatchSnakeEngine in lockstep with one SnakeEngine per game."""
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from snake_engine import SnakeEngine
+from snake_batch import BatchSnakeEngine, ACTION_NAMES, NO_ACTION, OUTCOME_NAMES
+
+
+def greedy_action(engine):
+    (hx, hy), (fx, fy) = engine.snake_segments[-1], engine.food_coords
+    return 3 if fx > hx else 2 if fx < hx else 1 if fy > hy else 0
+
+
+@pytest.mark.parametrize("n, wrapping", [(10, True), (10, False), (13, True), (6, True)])
+def test_batch_matches_scalar_engines(n, wrapping):
+    num_envs = 16
+    first_seed = 100
+    batch = BatchSnakeEngine(num_envs, n, wrapping, seeds=range(first_seed, first_seed + num_envs))
+    engines = [SnakeEngine(n, wrapping, seed=first_seed + i) for i in range(num_envs)]
+    episodes = [0] * num_envs
+    rng = random.Random(n)
+    finished = 0
+    for tick in range(1500):
+        # Mostly chase the food so games grow long enough to matter, with random turns and no-ops mixed in
+        actions = np.array([greedy_action(engine) if rng.random() < 0.6 else rng.randrange(NO_ACTION, 4)
+                            for engine in engines])
+        ate, done = batch.step(actions)
+        for i, engine in enumerate(engines):
+            over = engine.step(None if actions[i] == NO_ACTION else ACTION_NAMES[actions[i]])
+            assert over == bool(done[i]), (tick, i)
+            if over:
+                outcome = "won" if engine.won else engine.death_cause
+                assert (batch.final_score[i], batch.final_ticks[i], OUTCOME_NAMES[batch.final_outcome[i]]) \
+                    == (engine.score, engine.ticks, outcome), (tick, i)
+                finished += 1
+                # Auto-reset plays seeds[i], seeds[i] + num_envs, ...
+                episodes[i] += 1
+                engine.reset(first_seed + i + episodes[i] * num_envs)
+            assert list(batch.snake_cells(i)) == engine.body_cells(), (tick, i)
+            assert batch.food[i] == engine.food_cell and batch.score[i] == engine.score, (tick, i)
+    assert finished > num_envs
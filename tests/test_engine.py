@@ -0,0 +1,160 @@
+"""SnakeEngine against a list-based reference of the original game's rules."""
+import random
+
+import pytest
+
+from snake_engine import SnakeEngine, DIRECTION_NAMES, DIRECTION_VECTORS, DEATH_WALL, DEATH_SELF, NO_CELL
+from snake_level import Level
+
+
+class ReferenceSnake:
+    """The pre-engine rules, kept deliberately simple: the snake is a list of (x, y), tail first."""
+
+    def __init__(self, n, wrapping, walls=(), start=None):
+        self.n = n
+        self.wrapping = wrapping
+        self.walls = {(cell % n, cell // n) for cell in walls}
+        x, y = start if start is not None else (n // 2, n // 2)
+        self.body = [(x - 2, y), (x - 1, y), (x, y)]
+        self.direction = "Right"
+        self.score = 0
+        self.outcome = None
+
+    def step(self, action, food):
+        """One tick toward action (None keeps going), with food where the engine had it. Returns the outcome."""
+        if action is not None and DIRECTION_VECTORS[action] != tuple(-d for d in DIRECTION_VECTORS[self.direction]):
+            self.direction = action
+        dx, dy = DIRECTION_VECTORS[self.direction]
+        x, y = self.body[-1][0] + dx, self.body[-1][1] + dy
+        if self.wrapping:
+            x, y = x % self.n, y % self.n
+        elif not (0 <= x < self.n and 0 <= y < self.n):
+            self.outcome = DEATH_WALL
+            return self.outcome
+        if (x, y) in self.walls:
+            self.outcome = DEATH_WALL
+            return self.outcome
+        self.body.append((x, y))
+        if (x, y) == food:
+            self.score += 1
+        else:
+            self.body.pop(0)
+        if (x, y) in self.body[:-1]:
+            self.outcome = DEATH_SELF
+        return self.outcome
+
+
+def walled_level(n, seed):
+    rng = random.Random(seed)
+    mid = n // 2
+    start = mid * n + mid
+    walls = [cell for cell in range(n * n) if rng.random() < 0.15 and not start - 2 <= cell <= start + 1]
+    return Level.from_walls(n, walls, start)
+
+
+def engine_state(engine):
+    return (engine.body_cells(), bytes(engine.occupancy), engine.free_cells.tobytes(), engine.free_cell_pos.tobytes(),
+            engine.free_count, engine.food_cell, engine.freed_tail_cell, engine.head_index, engine.length,
+            engine.direction_code, engine.new_direction_code, engine.score, engine.ticks, engine.moves,
+            engine.game_over_flag, engine.death_cause, engine.won, engine.rng.getstate())
+
+
+@pytest.mark.parametrize("n, wrapping, walled", [(10, True, False), (10, False, False), (13, True, False),
+                                                 (12, True, True), (15, False, True)])
+def test_step_matches_reference(n, wrapping, walled):
+    level = walled_level(n, n) if walled else None
+    rng = random.Random(n)
+    engine = SnakeEngine(n, wrapping, seed=1, level=level)
+    for game in range(30):
+        engine.reset(game)
+        reference = ReferenceSnake(n, wrapping, level.wall_cells if level else (),
+                                   engine.cell_coords(level.start_cell) if level else None)
+        while True:
+            food = engine.food_coords
+            assert food not in reference.body and food not in reference.walls
+            action = rng.choice(DIRECTION_NAMES) if rng.random() < 0.3 else None
+            expected = reference.step(action, food)
+            over = engine.step(action)
+            assert engine.score == reference.score
+            if over:
+                assert engine.death_cause == expected
+                break
+            assert expected is None
+            assert list(engine.snake_segments) == reference.body
+
+
+def test_make_and_unmake_round_trip_exactly():
+    rng = random.Random(3)
+    for level in (None, walled_level(12, 5)):
+        engine = SnakeEngine(12, True, seed=7, level=level)
+        for game in range(20):
+            engine.reset(game)
+            while not engine.game_over_flag:
+                before = engine_state(engine)
+                mark = engine.snapshot()
+                for _ in range(rng.randrange(1, 40)):
+                    # Every third eat uses a caller-chosen spawn, like a search enumerating them
+                    next_food = None
+                    if rng.random() < 0.3 and engine.free_count > 1:
+                        next_food = engine.free_cells[rng.randrange(engine.free_count)]
+                    if engine.make_move(rng.randrange(4), next_food):
+                        break
+                engine.restore(mark)
+                assert engine_state(engine) == before
+                engine.step(rng.choice(DIRECTION_NAMES))
+            assert engine.undo_log == []
+
+
+def test_nested_snapshots_restore_each_level():
+    engine = SnakeEngine(10, True, seed=2)
+    rng = random.Random(4)
+    states = []
+    for _ in range(5):
+        states.append((engine.snapshot(), engine_state(engine)))
+        for _ in range(6):
+            engine.make_move(rng.randrange(4))
+    for mark, state in reversed(states):
+        engine.restore(mark)
+        assert engine_state(engine) == state
+
+
+def test_free_list_matches_occupancy():
+    engine = SnakeEngine(10, False, seed=5, level=walled_level(10, 1))
+    rng = random.Random(6)
+    for tick in range(3000):
+        if engine.step(rng.choice(DIRECTION_NAMES)):
+            engine.reset(tick)
+        free = engine.free_cells[:engine.free_count]
+        assert sorted(free) == [cell for cell in range(engine.cell_count)
+                                if not engine.occupancy[cell] and not engine.is_wall(cell)]
+        assert all(engine.free_cell_pos[cell] == pos for pos, cell in enumerate(free))
+
+
+def serpentine(n):
+    """Every cell of an n x n board as one path (row by row, alternating direction)."""
+    return [y * n + (x if y % 2 == 0 else n - 1 - x) for y in range(n) for x in range(n)]
+
+
+def test_filling_the_board_wins():
+    n = 10
+    engine = SnakeEngine(n, False, seed=0)
+    path = serpentine(n)
+    engine.load_body(path[:-1]) # Head on the second to last cell, one free cell left
+    engine.direction = engine.new_direction = "Left" # The last row runs right to left
+    engine.create_food()
+    assert engine.food_cell == path[-1] and engine.free_count == 1
+    assert engine.step() is True
+    assert engine.won and engine.death_cause is None and engine.score == 1
+    assert engine.free_count == 0 and engine.length == n * n
+
+
+def test_filling_a_level_wins():
+    n = 10
+    start = 5 * n + 5
+    floor = set(range(start - 2, start + 2))
+    level = Level.from_walls(n, [cell for cell in range(n * n) if cell not in floor], start)
+    engine = SnakeEngine(n, True, seed=0, level=level)
+    assert engine.free_count == 1 and engine.food_cell == start + 1
+    assert engine.step() is True
+    assert engine.won and engine.death_cause is None
+    assert engine.neighbor(start + 1, 3) == NO_CELL # Into a wall
@@ -0,0 +1,94 @@
+"""InputQueue turn buffering and TickClock early ticks, on a fake clock."""
+import pytest
+
+from snake_engine import UP, DOWN, LEFT, RIGHT
+from snake_input import InputQueue, INPUT_QUEUE_SIZE
+from snake_timing import TickClock
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_turns_come_out_in_press_order():
+    queue = InputQueue()
+    assert queue.push(UP, RIGHT) and queue.push(LEFT, RIGHT)
+    assert queue.pop() == UP
+    assert queue.pop() == LEFT
+    assert queue.pop() is None
+
+
+def test_queue_holds_three_turns():
+    assert INPUT_QUEUE_SIZE == 3
+    queue = InputQueue()
+    for code in (UP, LEFT, DOWN):
+        assert queue.push(code, RIGHT)
+    assert not queue.push(RIGHT, RIGHT) # Full, although Right is a valid turn after Down
+    assert [queue.pop() for _ in range(4)] == [UP, LEFT, DOWN, None]
+    assert queue.stats()["dropped"] == 1
+
+
+@pytest.mark.parametrize("first, second", [(UP, DOWN), (DOWN, UP), (LEFT, RIGHT), (RIGHT, LEFT)])
+def test_reversals_of_the_last_queued_turn_are_dropped(first, second):
+    current = LEFT if first in (UP, DOWN) else UP
+    queue = InputQueue()
+    assert queue.push(first, current)
+    assert not queue.push(second, current)
+    assert list(code for code, _ in queue.pending) == [first]
+
+
+def test_reversals_and_repeats_of_the_current_direction_are_dropped():
+    queue = InputQueue()
+    assert not queue.push(LEFT, RIGHT)
+    assert not queue.push(RIGHT, RIGHT)
+    assert queue.pop() is None
+    # Against the queued turn, not the snake: Right is fine once Up is queued
+    assert queue.push(UP, RIGHT) and not queue.push(UP, RIGHT) and queue.push(RIGHT, RIGHT)
+    stats = queue.stats()
+    assert (stats["presses"], stats["dropped"]) == (5, 3)
+
+
+def test_latency_runs_from_press_to_frame():
+    clock = FakeClock()
+    queue = InputQueue(clock=clock)
+    queue.push(UP, RIGHT)
+    clock.now = 0.010
+    queue.pop()
+    clock.now = 0.012
+    queue.frame_shown()
+    stats = queue.stats()
+    assert stats["shown"] == 1 and stats["max_latency_ms"] == pytest.approx(12)
+
+
+def test_pull_forward_keeps_the_period():
+    clock = FakeClock()
+    ticks = TickClock(100, clock=clock)
+    ticks.start()
+    assert ticks.due_ticks() == 1
+    clock.now = 0.030
+    assert ticks.due_ticks() == 0
+    ticks.pull_forward()
+    assert ticks.due_ticks() == 1 and ticks.early_ticks == 1
+    # The next deadline is one full period after the early tick, not after the original schedule
+    assert ticks.delay_ms() == 100
+    clock.now = 0.129
+    assert ticks.due_ticks() == 0
+    clock.now = 0.130
+    assert ticks.due_ticks() == 1
+    clock.now = 0.230
+    assert ticks.due_ticks() == 1
+
+
+def test_pull_forward_when_already_due_changes_nothing():
+    clock = FakeClock()
+    ticks = TickClock(100, clock=clock)
+    ticks.start()
+    ticks.due_ticks()
+    clock.now = 0.150
+    ticks.pull_forward()
+    assert ticks.early_ticks == 0
+    assert ticks.due_ticks() == 1 and ticks.delay_ms() == 50
@@ -0,0 +1,37 @@
+"""Level bitmaps and the free-cell index the engine starts from."""
+import pytest
+
+import snake_level
+from snake_level import random_level
+
+
+def reference_index(level):
+    floor = [cell for cell in range(level.cell_count) if not level.is_wall(cell)]
+    walls = [cell for cell in range(level.cell_count) if level.is_wall(cell)]
+    free_cell_pos = [0] * level.cell_count
+    for pos, cell in enumerate(floor):
+        free_cell_pos[cell] = pos
+    # A wall's entry is the number of floor cells before it, like the index's running count
+    for cell in walls:
+        free_cell_pos[cell] = sum(1 for floor_cell in floor if floor_cell < cell)
+    return floor + walls, free_cell_pos, len(floor)
+
+
+@pytest.mark.parametrize("n, density, chunk", [(10, 0.2, 8), (37, 0.3, 64), (60, 0.5, 1 << 15), (45, 0.1, 200)])
+def test_chunked_free_cell_index_matches_per_cell_build(monkeypatch, n, density, chunk):
+    monkeypatch.setattr(snake_level, "INDEX_CHUNK_CELLS", chunk)
+    level = random_level(n, density, seed=n)
+    free_cells, free_cell_pos, free_count = level.free_cell_index()
+    expected_cells, expected_pos, expected_count = reference_index(level)
+    assert free_count == expected_count
+    assert list(free_cells) == expected_cells
+    assert list(free_cell_pos) == expected_pos
+
+
+def test_cell_flags_of_unaligned_ranges():
+    level = random_level(23, 0.4, seed=1)
+    flags = level.cell_flags()
+    assert len(flags) == level.cell_count
+    assert list(flags) == [int(level.is_wall(cell)) for cell in range(level.cell_count)]
+    for start, stop in [(0, 5), (3, 17), (9, 9), (100, 529), (517, 529)]:
+        assert level.cell_flags(start, stop) == flags[start:stop]
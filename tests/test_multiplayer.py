@@ -0,0 +1,80 @@
+"""Multiplayer delta protocol: clients replaying DELTA messages keep the server's board."""
+import random
+
+from snake_engine import LEFT, RIGHT
+from snake_multiplayer import (MultiSnakeEngine, MultiplayerBoard, Player, FRAME_HEADER,
+                               EVENT_SPAWN, EVENT_GROW, EVENT_FOOD, EVENT_DIED)
+
+
+def payload(message):
+    return message[FRAME_HEADER.size:]
+
+
+def join(engine, player_id):
+    client, your_id = MultiplayerBoard.from_state(payload(engine.encode_state(player_id)))
+    assert your_id == player_id
+    return client
+
+
+def test_delta_stream_rebuilds_the_server_board():
+    engine = MultiSnakeEngine(24, True, seed=3)
+    rng = random.Random(3)
+    player_ids = [engine.add_player() for _ in range(6)]
+    engine.take_events() # Joins are covered by the STATE message
+    initial_state = payload(engine.encode_state(player_ids[0]))
+    clients = [join(engine, player_ids[0])]
+    stream = []
+    for tick in range(600):
+        for player_id in player_ids:
+            if rng.random() < 0.3:
+                engine.change_direction_code(player_id, rng.randrange(4))
+        if tick == 200:
+            engine.remove_player(player_ids.pop())
+        if tick == 300:
+            player_ids.append(engine.add_player())
+        delta = payload(engine.encode_delta(engine.tick()))
+        stream.append(delta)
+        for client in clients:
+            client.apply_delta(delta)
+            assert client.matches(engine), tick
+            assert client.ticks == engine.ticks
+        if tick == 400:
+            clients.append(join(engine, player_ids[-1])) # Joining mid-game
+
+    # Replaying the recorded stream offline from the first STATE ends on the same board
+    replayed, _ = MultiplayerBoard.from_state(initial_state)
+    for delta in stream:
+        replayed.apply_delta(delta)
+    assert replayed.matches(engine)
+
+
+def place_snake(engine, player_id, cells, code):
+    """Lays a snake on the given cells (tail first) heading in direction code."""
+    player = engine.players[player_id] = Player()
+    engine.emit(EVENT_SPAWN, player_id, cells[0])
+    for cell in cells[1:]:
+        engine.emit(EVENT_GROW, player_id, cell)
+    player.alive = True
+    player.direction_code = player.new_direction_code = code
+
+
+def test_lowest_player_id_eats_contested_food():
+    n = 10
+    row = 2 * n
+    engine = MultiSnakeEngine(n, True, seed=0)
+    # Player 5 joins before player 2, so dict order alone would let 5 eat first
+    place_snake(engine, 5, [row + 7, row + 6, row + 5], LEFT)
+    place_snake(engine, 2, [row + 1, row + 2, row + 3], RIGHT)
+    food = row + 4
+    engine.emit(EVENT_FOOD, 0, food)
+    engine.take_events()
+    client = join(engine, 2)
+
+    events = engine.tick()
+    assert engine.players[2].score == 1 and engine.players[5].score == 0
+    assert (EVENT_GROW, 2, food) in events
+    # Both heads end on the same cell, so both snakes die
+    assert (EVENT_DIED, 2, 0) in events and (EVENT_DIED, 5, 0) in events
+
+    client.apply_delta(payload(engine.encode_delta(events)))
+    assert client.matches(engine)
@@ -0,0 +1,98 @@
+"""Incremental Tk drawing, on a recording stand-in for the canvas (no display needed)."""
+import random
+
+import pytest
+
+pytest.importorskip("tkinter")
+
+import snake
+from snake_engine import SnakeEngine, DIRECTION_NAMES
+
+
+class FakeCanvas:
+    """Keeps each item's coords, options and tags; enough of tk.Canvas for the snake's drawing code."""
+
+    def __init__(self):
+        self.items = {}
+        self.next_id = 1
+
+    def create_rectangle(self, *coords, tags=(), **options):
+        item = self.next_id
+        self.next_id += 1
+        self.items[item] = {"coords": list(coords), "tags": (tags,) if isinstance(tags, str) else tuple(tags), **options}
+        return item
+
+    def find(self, tag_or_id):
+        if isinstance(tag_or_id, int):
+            return [tag_or_id] if tag_or_id in self.items else []
+        return [item for item, options in self.items.items() if tag_or_id in options["tags"]]
+
+    def coords(self, item, *coords):
+        self.items[item]["coords"] = list(coords)
+
+    def itemconfig(self, tag_or_id, **options):
+        for item in self.find(tag_or_id):
+            self.items[item].update(options)
+
+    def delete(self, *tags):
+        for tag in tags:
+            for item in self.find(tag):
+                del self.items[item]
+
+    def tag_raise(self, *args):
+        pass
+
+    def tag_lower(self, *args):
+        pass
+
+
+class FakeTickClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def fraction(self):
+        return self.now
+
+
+def smooth_game(engine):
+    # Only the state draw_game and the smooth movement helpers read; no Tk window
+    game = snake.SnakeGame.__new__(snake.SnakeGame)
+    game.engine = engine
+    game.canvas = FakeCanvas()
+    game.tick_clock = FakeTickClock()
+    game.scrolling_viewport = False
+    game.smooth_movement = True
+    game.current_snake_color_name = "Green"
+    game.current_snake_color_hex = snake.SNAKE_COLOR_PALETTES["Green"]["body"]
+    game.current_food_color_hex = snake.SNAKE_COLOR_PALETTES["Green"]["food"]
+    game.segment_items = None
+    game.tail_items = None
+    game.rendered_fraction = None
+    return game
+
+
+def test_body_stays_on_the_grid_after_partial_renders():
+    engine = SnakeEngine(15, True, seed=4)
+    game = smooth_game(engine)
+    game.redraw_game()
+    rng = random.Random(4)
+    for tick in range(400):
+        # A tick, then a render partway through it. Early ticks land on small fractions.
+        game.tick_clock.now = 0.0
+        if engine.step(rng.choice(DIRECTION_NAMES) if rng.random() < 0.3 else None):
+            engine.reset(tick)
+        game.draw_game()
+        game.start_moving_items()
+        game.place_moving_items(rng.choice([0.05, 0.2, 0.5, 0.9]))
+
+        # Every segment but the sliding head sits exactly on its cell
+        segments = list(engine.snake_segments)
+        assert len(game.segment_items) == len(segments)
+        for cell, (border_id, fill_id) in list(zip(segments, game.segment_items))[:-1]:
+            border_coords, fill_coords = game.segment_pixel_coords(cell)
+            assert game.canvas.items[border_id]["coords"] == list(border_coords), tick
+            assert game.canvas.items[fill_id]["coords"] == list(fill_coords), tick
+
+    game.place_moving_items(1.0)
+    border_coords, _ = game.segment_pixel_coords(engine.snake_segments[-1])
+    assert game.canvas.items[game.segment_items[-1][0]]["coords"] == list(border_coords)
@@ -0,0 +1,137 @@
+"""Replay files: round trips, keyframe seeks and reading older versions."""
+import random
+
+import pytest
+
+from snake_engine import SnakeEngine, DIRECTION_NAMES, DEATH_SELF
+from snake_level import random_level
+from snake_replay import (Replay, ReplayRecorder, ReplayPlayer, ReplayError, verify_replay,
+                          HEADER, LEVEL_FIELD, OUTCOME_UNFINISHED, OUTCOME_SELF)
+
+
+def play(engine, ticks, seed, keyframe_interval):
+    """Plays random turns for up to ticks ticks. Returns the replay and the state after every tick."""
+    rng = random.Random(seed)
+    recorder = ReplayRecorder(engine, 75, keyframe_interval)
+    states = {0: engine_state(engine)}
+    while engine.ticks < ticks:
+        over = engine.step(rng.choice(DIRECTION_NAMES) if rng.random() < 0.2 else None)
+        recorder.record_tick()
+        states[engine.ticks] = engine_state(engine)
+        if over:
+            break
+    return recorder.finish(), states
+
+
+def engine_state(engine):
+    return engine.body_cells(), engine.food_cell, engine.score, engine.direction_code, engine.rng.getstate()
+
+
+def long_game(keyframe_interval):
+    # Wrapping lets a random walk run long enough to cross several keyframes
+    engine = SnakeEngine(40, True, seed=11)
+    return play(engine, 2000, 3, keyframe_interval)
+
+
+def test_save_load_verify_round_trip(tmp_path):
+    replay, states = long_game(64)
+    path = str(tmp_path / "game.snkr")
+    replay.save(path)
+    loaded = Replay.load(path)
+    assert loaded.to_bytes() == replay.to_bytes()
+    assert (loaded.ticks, loaded.score) == (replay.ticks, replay.score)
+    ok, message = verify_replay(loaded)
+    assert ok, message
+
+
+def test_verify_catches_a_tampered_score():
+    replay, _ = long_game(64)
+    replay.score += 1
+    ok, _ = verify_replay(replay)
+    assert not ok
+
+
+@pytest.mark.parametrize("keyframe_interval", [1, 7, 64])
+def test_seek_matches_linear_replay(keyframe_interval):
+    replay, states = long_game(keyframe_interval)
+    assert len(replay.keyframes) > 2
+    player = ReplayPlayer(Replay.from_bytes(replay.to_bytes()))
+    rng = random.Random(keyframe_interval)
+    ticks = sorted(states)
+    # Forward and backward seeks, landing on, just before and just after keyframes
+    targets = rng.sample(ticks, min(len(ticks), 60))
+    for tick, _, _ in replay.keyframes:
+        targets += [tick - 1, tick, tick + 1]
+    for tick in targets:
+        tick = max(0, min(tick, replay.ticks))
+        assert engine_state(player.seek(tick)) == states[tick], tick
+
+
+def test_level_replay_round_trip(tmp_path):
+    level = random_level(20, 0.1, seed=4)
+    level_path = str(tmp_path / "maze.lvl")
+    level.save(level_path)
+    level.path = level_path
+    replay, states = play(SnakeEngine(20, False, seed=8, level=level), 500, 5, 16)
+    replay_path = str(tmp_path / "maze.snkr")
+    replay.save(replay_path)
+    loaded = Replay.load(replay_path)
+    assert loaded.level_path == level_path
+    ok, message = verify_replay(loaded)
+    assert ok, message
+    assert engine_state(ReplayPlayer(loaded).seek(replay.ticks)) == states[replay.ticks]
+
+    other = random_level(20, 0.1, seed=5)
+    with pytest.raises(ReplayError):
+        ReplayPlayer(loaded, other)
+
+
+def test_version_1_replays_still_load():
+    replay, _ = long_game(64)
+    data = replay.to_bytes()
+    # Version 1 is the same layout without the level field
+    old = bytearray(data[:HEADER.size] + data[HEADER.size + LEVEL_FIELD.size:])
+    old[4] = 1
+    loaded = Replay.from_bytes(bytes(old))
+    assert loaded.level_path is None
+    assert loaded.input_ticks == replay.input_ticks and loaded.keyframes == replay.keyframes
+    ok, message = verify_replay(loaded)
+    assert ok, message
+
+
+def test_unfinished_replay_seeks_to_its_end():
+    engine = SnakeEngine(30, True, seed=1)
+    recorder = ReplayRecorder(engine, 75, 8)
+    for _ in range(50):
+        engine.step()
+        recorder.record_tick()
+    replay = recorder.finish()
+    assert replay.outcome == OUTCOME_UNFINISHED
+    assert ReplayPlayer(replay).seek(10 ** 6).ticks == 50
+
+
+def test_seek_to_a_self_collision_reports_the_death():
+    # Recorded the way a front end might: moved, recorded, and only then checked for self-collision
+    for seed in range(50):
+        engine = SnakeEngine(10, True, seed=seed)
+        recorder = ReplayRecorder(engine, 75, 1) # A keyframe every tick, including the fatal one
+        rng = random.Random(seed)
+        while not engine.game_over_flag:
+            (head_x, head_y), (food_x, food_y) = engine.snake_segments[-1], engine.food_coords
+            greedy = "Right" if food_x > head_x else "Left" if food_x < head_x else "Down" if food_y > head_y else "Up"
+            engine.change_direction(greedy if rng.random() < 0.7 else rng.choice(DIRECTION_NAMES))
+            engine.move_snake()
+            recorder.record_tick()
+            if not engine.game_over_flag and engine.check_collisions():
+                engine.game_over_flag = True
+                engine.death_cause = DEATH_SELF
+        if engine.death_cause == DEATH_SELF:
+            break
+    replay = recorder.finish()
+    assert replay.outcome == OUTCOME_SELF and replay.keyframes[-1][0] < replay.ticks
+
+    player = ReplayPlayer(replay)
+    for tick in (replay.ticks, replay.ticks - 1, replay.ticks):
+        engine = player.seek(tick)
+        assert engine.game_over_flag == (tick == replay.ticks)
+    assert engine.death_cause == DEATH_SELF and engine.score == replay.score
@@ -0,0 +1,67 @@
+"""Leaderboard queries and the one-time import of the old high score file."""
+import os
+
+from snake_storage import Leaderboard, BackgroundWriter, NO_LEVEL, LEGACY_MAP_SIZE_N, atomic_write
+
+
+def legacy_file(directory, score):
+    path = os.path.join(directory, "highscore.txt")
+    atomic_write(path, str(score))
+    return path
+
+
+def test_legacy_high_score_is_imported_once(tmp_path):
+    path = str(tmp_path / "leaderboard.sqlite3")
+    high_score_file = legacy_file(str(tmp_path), 77)
+    leaderboard = Leaderboard(path, legacy_high_score_file=high_score_file)
+    assert leaderboard.count() == 1 and leaderboard.best_score() == 77
+    assert leaderboard.best_score(LEGACY_MAP_SIZE_N, "", False) == 77
+
+    leaderboard.import_legacy_high_score(high_score_file)
+    assert leaderboard.count() == 1
+    leaderboard.record_run(20, "Normal", True, 5, 100, 1)
+    leaderboard.connection.close()
+
+    # Reopening, even with a higher score in the old file, imports nothing more
+    high_score_file = legacy_file(str(tmp_path), 90)
+    reopened = Leaderboard(path, legacy_high_score_file=high_score_file)
+    assert reopened.count() == 2 and reopened.best_score() == 77
+
+
+def test_legacy_import_is_visible_at_once_with_a_writer(tmp_path):
+    writer = BackgroundWriter()
+    try:
+        leaderboard = Leaderboard(str(tmp_path / "leaderboard.sqlite3"), writer,
+                                  legacy_high_score_file=legacy_file(str(tmp_path), 12))
+        assert leaderboard.best_score() == 12 # No flush needed
+    finally:
+        writer.close()
+
+
+def test_missing_or_empty_legacy_file_imports_nothing(tmp_path):
+    leaderboard = Leaderboard(str(tmp_path / "a.sqlite3"), legacy_high_score_file=str(tmp_path / "missing.txt"))
+    assert leaderboard.count() == 0
+    leaderboard = Leaderboard(str(tmp_path / "b.sqlite3"), legacy_high_score_file=legacy_file(str(tmp_path), 0))
+    assert leaderboard.count() == 0
+
+
+def test_top_runs_are_kept_per_setting_best_first(tmp_path):
+    leaderboard = Leaderboard(str(tmp_path / "leaderboard.sqlite3"))
+    settings = [(level, n, speed, wrapping) for level in (NO_LEVEL, "maze") for n in (20, 30)
+                for speed in ("Slow", "Fast") for wrapping in (False, True)]
+    expected = {}
+    for i, (level, n, speed, wrapping) in enumerate(settings):
+        # Distinct scores per setting, inserted out of order
+        scores = [(i * 7 + k * 13) % 50 + 100 * i for k in range(12)]
+        for score in scores:
+            leaderboard.record_run(n, speed, wrapping, score, score * 3, score, level)
+        expected[level, n, speed, wrapping] = sorted(scores, reverse=True)
+
+    for (level, n, speed, wrapping), scores in expected.items():
+        runs = leaderboard.top_runs(n, speed, wrapping, limit=5, level=level)
+        assert [run[0] for run in runs] == scores[:5]
+        assert all(ticks == score * 3 for score, ticks, _, _ in runs)
+        assert leaderboard.best_score(n, speed, wrapping, level) == scores[0]
+    assert leaderboard.top_runs(40, "Slow", False) == []
+    assert leaderboard.best_score(40, "Slow", False) == 0
+    assert leaderboard.best_score() == max(max(scores) for scores in expected.values())